@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Compare the synchronous and asyncio execution engines against the same stand-in broker.
+
+The stand-in (semp_standin.py) runs in a separate process so it does not compete with
+the engines for the GIL. Both engines send the same tools/call messages with the same
+concurrency; the synchronous engine uses one thread per concurrent call (as the
+concurrent dispatcher does), the asyncio engine uses a single event loop.
+
+    python3 benchmarks/bench_engines.py --calls 2000 --concurrency 200 --latency-ms 50
+
+Results are printed as JSON.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVER_DIR = os.path.dirname(BENCH_DIR)
+
+
+def start_standin_process(latency_ms: float, queues: int, page_size: int = 0):
+    """Start semp_standin.py in a subprocess and return (process, port)."""
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(BENCH_DIR, "semp_standin.py"),
+         "--latency-ms", str(latency_ms), "--queues", str(queues), "--page-size", str(page_size)],
+        stdout=subprocess.PIPE, text=True
+    )
+    ready = process.stdout.readline().split()
+    if len(ready) != 2 or ready[0] != "READY":
+        process.kill()
+        raise RuntimeError("Stand-in broker failed to start")
+    return process, int(ready[1])
+
+
+def create_server(port: int, pool_size: int):
+    """Create a monitoring server pointed at the stand-in broker."""
+    os.environ.update({
+        "MCP_HTTP_POOL_SIZE": str(pool_size),
+        "OPENAPI_SPEC": os.path.join(SERVER_DIR, "semp-v2-swagger-monitor.json"),
+        "SOLACE_SEMPV2_BASE_URL": f"http://127.0.0.1:{port}",
+        "SOLACE_SEMPV2_USERNAME": "admin",
+        "SOLACE_SEMPV2_PASSWORD": "admin",
+        "MCP_API_INCLUDE_TOOLS": "getMsgVpnQueues",
+        "MCP_LOG_DISABLE": "true",
+    })
+    sys.path.insert(0, SERVER_DIR)
+    import solace_monitoring_mcp_server as mcp
+
+    return mcp.SolaceSempv2McpServer(mcp.ServerConfig())
+
+
+def build_messages(calls: int) -> List[str]:
+    return [json.dumps({
+        "jsonrpc": "2.0", "id": i, "method": "tools/call",
+        "params": {"name": "getMsgVpnQueues", "arguments": {"msgVpnName": "default"}}
+    }) for i in range(calls)]
+
+
+def summarize(engine: str, latencies: List[float], elapsed: float, errors: int) -> Dict[str, Any]:
+    latencies = sorted(latencies)
+
+    def percentile(p: float) -> float:
+        return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 2)
+
+    return {
+        "engine": engine,
+        "calls": len(latencies),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_per_s": round(len(latencies) / elapsed, 1),
+        "latency_ms": {"p50": percentile(0.50), "p95": percentile(0.95), "p99": percentile(0.99)}
+    }
+
+
+def run_sync(server, messages: List[str], concurrency: int) -> Dict[str, Any]:
+    def call(message: str):
+        start = time.perf_counter()
+        response = server.handle_message(message)
+        return time.perf_counter() - start, "error" in json.loads(response)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(call, messages))
+    elapsed = time.perf_counter() - start
+    return summarize("sync", [r[0] for r in results], elapsed, sum(r[1] for r in results))
+
+
+async def run_async(server, messages: List[str], concurrency: int) -> Dict[str, Any]:
+    limit = asyncio.Semaphore(concurrency)
+
+    async def call(message: str):
+        async with limit:
+            start = time.perf_counter()
+            response = await server.handle_message_async(message)
+            return time.perf_counter() - start, "error" in json.loads(response)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(call(m) for m in messages))
+    elapsed = time.perf_counter() - start
+    await server.async_session_pool.close_all()
+    return summarize("async", [r[0] for r in results], elapsed, sum(r[1] for r in results))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the sync and asyncio engines")
+    parser.add_argument("--calls", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--queues", type=int, default=10)
+    args = parser.parse_args()
+
+    process, port = start_standin_process(args.latency_ms, args.queues)
+    try:
+        # Size both connection pools to the concurrency so neither engine is pool-bound
+        server = create_server(port, args.concurrency)
+        messages = build_messages(args.calls)
+
+        results = {
+            "settings": vars(args),
+            "results": [
+                run_sync(server, messages, args.concurrency),
+                asyncio.run(run_async(server, messages, args.concurrency))
+            ]
+        }
+        server.close()
+        print(json.dumps(results, indent=2))
+    finally:
+        process.terminate()
+        process.wait()
+
+
+if __name__ == "__main__":
+    main()
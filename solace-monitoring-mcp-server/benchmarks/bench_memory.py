@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Compare the memory held by the eager and lean (MCP_LEAN_REGISTRY=true) tool registries.
+
+Each mode runs in a fresh interpreter against the full SEMP monitor spec, with the
+registry cache disabled so the spec is always parsed. Two numbers are reported at each
+stage:
+
+- ``rss_mb``:      resident set size of the process (VmRSS, Linux only)
+- ``retained_mb``: Python heap still allocated since the module was imported (tracemalloc)
+
+Stages are ``startup`` (server constructed), ``after_call`` (one tool call prepared)
+and ``after_list`` (tools/list served, which builds every schema in the lean mode).
+
+    python3 benchmarks/bench_memory.py
+
+Results are printed as JSON.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, Any
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVER_DIR = os.path.dirname(BENCH_DIR)
+
+# Runs inside the child interpreter and prints its measurements as JSON
+CHILD_SCRIPT = """
+import gc, json, sys, tracemalloc
+
+def rss_mb():
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 2)
+    except OSError:
+        return None
+
+def sample():
+    gc.collect()
+    return {{"rss_mb": rss_mb(), "retained_mb": round(tracemalloc.get_traced_memory()[0] / 1e6, 3)}}
+
+sys.path.insert(0, {server_dir!r})
+import solace_monitoring_mcp_server as mcp
+tracemalloc.start()
+stages = {{"imported": sample()}}
+
+server = mcp.SolaceSempv2McpServer(mcp.ServerConfig())
+stages["startup"] = sample()
+
+tool, arguments, _ = server._resolve_tool_call(1, {{"name": "getMsgVpnQueues", "arguments": {{"msgVpnName": "default"}}}})
+server._input_schema(tool)
+server._prepare_request(tool, dict(arguments))
+stages["after_call"] = sample()
+
+server.handle_message(json.dumps({{"jsonrpc": "2.0", "id": 1, "method": "tools/list"}}))
+stages["after_list"] = sample()
+stages["tools"] = len(server.tools)
+print(json.dumps(stages))
+"""
+
+
+def run_child(env: Dict[str, str]) -> Dict[str, Any]:
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD_SCRIPT.format(server_dir=SERVER_DIR)],
+        env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark registry memory in the eager and lean modes")
+    parser.add_argument("--spec", default=os.path.join(SERVER_DIR, "semp-v2-swagger-monitor.json"))
+    args = parser.parse_args()
+
+    base_env = dict(os.environ, OPENAPI_SPEC=args.spec, MCP_LOG_DISABLE="true", MCP_REGISTRY_CACHE="false")
+    print(json.dumps({
+        "spec": args.spec,
+        "spec_bytes": os.path.getsize(args.spec),
+        "eager": run_child(dict(base_env, MCP_LEAN_REGISTRY="false")),
+        "lean": run_child(dict(base_env, MCP_LEAN_REGISTRY="true"))
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
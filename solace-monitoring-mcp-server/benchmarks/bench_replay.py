@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Replay a recorded agent session through the monitoring server, offline.
+
+The cassette is recorded in production with ``MCP_CASSETTE_MODE=record`` and
+``MCP_CASSETTE=<path>``: it holds every tools/call the server received and every SEMP
+exchange it made, with secrets redacted. This script starts the server as a child process
+in replay mode (``MCP_CASSETTE_MODE=replay``), so broker responses come from the cassette
+with their recorded latency, and sends the recorded tool calls over stdin at their
+recorded offsets. Calls run with ``MCP_DISPATCH_MODE=concurrent``, so calls that overlapped
+in production overlap again.
+
+    python3 benchmarks/bench_replay.py session.jsonl.gz
+    python3 benchmarks/bench_replay.py session.jsonl.gz --time-scale 0.5 --engine async
+
+``--time-scale`` scales both the gaps between calls and the broker latencies; 0 replays
+the session as fast as the server can go. Per-tool latency is printed as JSON (and written
+to ``--output``).
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Any
+
+from bench_suite import SERVER_DIR, SPEC_PATH, StdioServer, latency_summary
+
+sys.path.insert(0, SERVER_DIR)
+from solace_monitoring_mcp_server import Cassette  # noqa: E402
+
+
+def replay_env(cassette: Cassette, cassette_path: str, time_scale: float, engine: str) -> Dict[str, str]:
+    """Environment for a server in replay mode with the recorded broker aliases configured"""
+    env = dict(
+        os.environ,
+        OPENAPI_SPEC=os.environ.get("OPENAPI_SPEC", SPEC_PATH),
+        MCP_LOG_DISABLE="true",
+        MCP_DISPATCH_MODE="concurrent",
+        MCP_ENGINE=engine,
+        MCP_CASSETTE_MODE="replay",
+        MCP_CASSETTE=os.path.abspath(cassette_path),
+        MCP_CASSETTE_TIME_SCALE=str(time_scale)
+    )
+    # Broker URLs are not recorded; the aliases must exist, but nothing is contacted
+    brokers = cassette.header.get("brokers") or ["default"]
+    if brokers == ["default"]:
+        env["SOLACE_SEMPV2_BASE_URL"] = "http://replay.invalid"
+    else:
+        env["SOLACE_BROKERS_ALIAS"] = ",".join(brokers)
+        env["SOLACE_BROKER_DEFAULT"] = cassette.header.get("default_broker") or brokers[0]
+        for alias in brokers:
+            env[f"SOLACE_SEMPV2_BASE_URL_{alias.upper()}"] = "http://replay.invalid"
+    return env
+
+
+def replay(cassette_path: str, time_scale: float, engine: str) -> Dict[str, Any]:
+    cassette = Cassette(cassette_path, "replay")
+    if not cassette.calls:
+        raise SystemExit(f"{cassette_path} has no recorded tool calls to replay")
+
+    env = replay_env(cassette, cassette_path, time_scale, engine)
+    server = StdioServer(env)
+    server.request("initialize")
+
+    sent: Dict[int, tuple] = {}
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    done = threading.Event()
+
+    def read_responses() -> None:
+        for _ in range(len(cassette.calls)):
+            line = server.process.stdout.readline()
+            if not line:
+                break
+            received = time.perf_counter()
+            response = json.loads(line)
+            tool, sent_at = sent.pop(response["id"])
+            latencies[tool].append(received - sent_at)
+            if "error" in response:
+                errors[tool] += 1
+        done.set()
+
+    reader = threading.Thread(target=read_responses, daemon=True)
+    reader.start()
+
+    first = cassette.calls[0]["t"]
+    start = time.perf_counter()
+    for call in cassette.calls:
+        wait = start + (call["t"] - first) * time_scale - time.perf_counter()
+        if wait > 0:
+            time.sleep(wait)
+        msg_id, line = server.message("tools/call", {"name": call["tool"], "arguments": call["arguments"]})
+        sent[msg_id] = (call["tool"], time.perf_counter())
+        server.process.stdin.write(line + "\n")
+        server.process.stdin.flush()
+    done.wait()
+    elapsed = time.perf_counter() - start
+    server.close()
+
+    missing = len(cassette.calls) - sum(len(samples) for samples in latencies.values())
+    result = {
+        "cassette": cassette_path,
+        "engine": engine,
+        "time_scale": time_scale,
+        "calls": len(cassette.calls),
+        "recorded_seconds": round(cassette.calls[-1]["t"] - first, 3),
+        "replayed_seconds": round(elapsed, 3),
+        "unanswered": missing,
+        "errors": sum(errors.values()),
+        "tools": {tool: dict(latency_summary(samples), errors=errors[tool])
+                  for tool, samples in sorted(latencies.items())}
+    }
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay a recorded session through the monitoring server")
+    parser.add_argument("cassette", help="cassette recorded with MCP_CASSETTE_MODE=record")
+    parser.add_argument("--time-scale", type=float, default=1.0,
+                        help="multiplier for call gaps and broker latencies; 0 replays as fast as possible")
+    parser.add_argument("--engine", choices=("sync", "async"), default="sync")
+    parser.add_argument("--output", help="also write the result JSON to this file")
+    args = parser.parse_args()
+
+    result = replay(args.cassette, args.time_scale, args.engine)
+    text = json.dumps(result, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Measure monitoring-server startup time with and without the compiled tool registry cache.
+
+Each sample runs in a fresh interpreter, as an MCP client would spawn it, against the full
+SEMP monitor spec. Three scenarios are measured:
+
+- ``no_cache``: the registry is always built from the spec (MCP_REGISTRY_CACHE=false)
+- ``cold``:     the cache directory is empty, so the registry is built and then written
+- ``warm``:     the registry is loaded from the cache written by a previous start
+
+For each scenario the module import and the registry build are timed in-process, and the
+server script is spawned over stdio, as an MCP host runs it, to time the first response:
+from spawning the process to the ``initialize`` response and to the first ``tools/list``
+response. The modules that are only loaded on first use (``requests``, ``asyncio``,
+``dotenv``) are reported if importing the module loaded them after all.
+
+    python3 benchmarks/bench_startup.py --runs 5
+    python3 benchmarks/bench_startup.py --importtime 15
+
+Results are printed as JSON (milliseconds). ``--importtime N`` also lists the N slowest
+imports of a fresh interpreter, from ``python -X importtime``.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, Any, List
+
+from bench_suite import StdioServer
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVER_DIR = os.path.dirname(BENCH_DIR)
+
+# Modules the server imports on first use rather than at import time
+DEFERRED_MODULES = ("requests", "asyncio", "dotenv", "aiohttp")
+
+# Runs inside the child interpreter and prints its timings as JSON
+CHILD_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {server_dir!r})
+import solace_monitoring_mcp_server as mcp
+imported = time.perf_counter()
+loaded = sorted(name for name in {deferred!r} if name in sys.modules)
+server = mcp.SolaceSempv2McpServer(mcp.ServerConfig())
+ready = time.perf_counter()
+print(json.dumps({{"import_ms": (imported - start) * 1000, "registry_ms": (ready - imported) * 1000,
+                  "total_ms": (ready - start) * 1000, "tools": len(server.tools), "loaded_on_import": loaded}}))
+"""
+
+
+def run_child(env: Dict[str, str]) -> Dict[str, Any]:
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD_SCRIPT.format(server_dir=SERVER_DIR, deferred=DEFERRED_MODULES)],
+        env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def first_responses(env: Dict[str, str]) -> Dict[str, Any]:
+    """Spawn the server over stdio and time its initialize and first tools/list responses"""
+    server = StdioServer(env)
+    try:
+        server.request("initialize")
+        initialized = time.perf_counter()
+        server.request("tools/list")
+        listed = time.perf_counter()
+    finally:
+        server.close()
+    return {"initialize_ms": (initialized - server.started) * 1000,
+            "first_tools_list_ms": (listed - server.started) * 1000}
+
+
+def summarize(samples: List[Dict[str, Any]]) -> Dict[str, Any]:
+    summary = {"tools": samples[0]["tools"], "runs": len(samples),
+               "loaded_on_import": sorted({name for sample in samples for name in sample["loaded_on_import"]})}
+    for metric in ("import_ms", "registry_ms", "total_ms", "initialize_ms", "first_tools_list_ms"):
+        values = [sample[metric] for sample in samples]
+        summary[metric] = {"median": round(statistics.median(values), 2), "min": round(min(values), 2)}
+    return summary
+
+
+def sample(env: Dict[str, str], cache_dir: str = "") -> Dict[str, Any]:
+    """One in-process sample and one stdio sample, each in a fresh interpreter"""
+    if cache_dir:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    result = run_child(env)
+    if cache_dir:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    result.update(first_responses(env))
+    return result
+
+
+def slowest_imports(count: int) -> List[Dict[str, Any]]:
+    """The slowest imports (cumulative) of a fresh interpreter importing the server module"""
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import solace_monitoring_mcp_server"],
+        cwd=SERVER_DIR, capture_output=True, text=True, check=True
+    ).stderr
+    imports = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        imports.append({"module": name.strip(), "self_ms": round(int(self_us) / 1000, 2),
+                        "cumulative_ms": round(int(cumulative_us) / 1000, 2)})
+    return sorted(imports, key=lambda item: item["cumulative_ms"], reverse=True)[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark server startup with the registry cache")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--spec", default=os.path.join(SERVER_DIR, "semp-v2-swagger-monitor.json"))
+    parser.add_argument("--importtime", type=int, default=0, metavar="N",
+                        help="also list the N slowest imports from python -X importtime")
+    args = parser.parse_args()
+
+    cache_dir = tempfile.mkdtemp(prefix="mcp-registry-bench-")
+    base_env = dict(os.environ, OPENAPI_SPEC=args.spec, MCP_LOG_DISABLE="true", MCP_REGISTRY_CACHE_DIR=cache_dir)
+    try:
+        no_cache = [sample(dict(base_env, MCP_REGISTRY_CACHE="false")) for _ in range(args.runs)]
+        cold = [sample(dict(base_env, MCP_REGISTRY_CACHE="true"), cache_dir) for _ in range(args.runs)]
+        warm = [sample(dict(base_env, MCP_REGISTRY_CACHE="true")) for _ in range(args.runs)]
+        cache_bytes = sum(os.path.getsize(os.path.join(cache_dir, name)) for name in os.listdir(cache_dir))
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    result = {
+        "spec": args.spec,
+        "spec_bytes": os.path.getsize(args.spec),
+        "cache_bytes": cache_bytes,
+        "no_cache": summarize(no_cache),
+        "cold": summarize(cold),
+        "warm": summarize(warm)
+    }
+    if args.importtime:
+        result["slowest_imports"] = slowest_imports(args.importtime)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Compare peak memory of buffered and incremental (streaming) parsing of a huge SEMP response.
+
+The stand-in broker (semp_standin.py) serves a synthetic queue collection with ``--queues``
+objects in one response. Each mode runs one tool call in a fresh interpreter and reports:
+
+- ``baseline_rss_mb``: resident set size before the call (server constructed)
+- ``peak_rss_mb``:     peak resident set size of the process (VmHWM, Linux only)
+- ``call_mb``:         peak minus baseline, i.e. the memory the call needed
+- ``elapsed_s``:       wall time of the call
+
+Modes are ``buffered`` (MCP_STREAMING_THRESHOLD=0, the whole body is read and then decoded),
+``streaming`` (the body is parsed item by item as it arrives), ``streaming_strip_links``
+(links are dropped while parsing) and ``streaming_capped`` (reading stops at
+``--max-response-bytes``). With orjson installed ``buffered_orjson`` is added.
+
+    python3 benchmarks/bench_streaming.py --queues 100000
+
+Results are printed as JSON.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, Any
+
+from bench_engines import start_standin_process
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVER_DIR = os.path.dirname(BENCH_DIR)
+
+# Runs inside the child interpreter and prints its measurements as JSON
+CHILD_SCRIPT = """
+import json, sys, time
+
+def status(field):
+    try:
+        with open("/proc/self/status") as lines:
+            for line in lines:
+                if line.startswith(field + ":"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        return None
+
+sys.path.insert(0, {server_dir!r})
+import solace_monitoring_mcp_server as mcp
+server = mcp.SolaceSempv2McpServer(mcp.ServerConfig())
+tool = server.tools["getMsgVpnQueues"]
+baseline = status("VmRSS")
+
+start = time.perf_counter()
+result = server._invoke_tool(tool, {{"msgVpnName": "default"}})
+elapsed = time.perf_counter() - start
+peak = status("VmHWM")
+
+print(json.dumps({{"items": len(result["data"]), "baseline_rss_mb": baseline, "peak_rss_mb": peak,
+                  "call_mb": round(peak - baseline, 1) if peak and baseline else None,
+                  "elapsed_s": round(elapsed, 3)}}))
+"""
+
+
+def run_child(env: Dict[str, str]) -> Dict[str, Any]:
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD_SCRIPT.format(server_dir=SERVER_DIR)],
+        env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark buffered and streaming response parsing")
+    parser.add_argument("--queues", type=int, default=100000)
+    parser.add_argument("--max-response-bytes", type=int, default=8 * 1024 * 1024)
+    args = parser.parse_args()
+
+    process, port = start_standin_process(0, args.queues)
+    try:
+        base_env = dict(
+            os.environ,
+            OPENAPI_SPEC=os.path.join(SERVER_DIR, "semp-v2-swagger-monitor.json"),
+            SOLACE_SEMPV2_BASE_URL=f"http://127.0.0.1:{port}",
+            SOLACE_SEMPV2_USERNAME="admin",
+            SOLACE_SEMPV2_PASSWORD="admin",
+            MCP_API_INCLUDE_TOOLS="getMsgVpnQueues",
+            MCP_REGISTRY_CACHE="false",
+            MCP_LOG_DISABLE="true",
+            MCP_JSON_CODEC="json"
+        )
+        modes = {
+            "buffered": dict(base_env, MCP_STREAMING_THRESHOLD="0"),
+            "streaming": dict(base_env, MCP_STREAMING_THRESHOLD="1"),
+            "streaming_strip_links": dict(base_env, MCP_STREAMING_THRESHOLD="1", MCP_STRIP_LINKS="true"),
+            "streaming_capped": dict(base_env, MCP_STREAMING_THRESHOLD="1",
+                                     MCP_MAX_RESPONSE_BYTES=str(args.max_response_bytes))
+        }
+        try:
+            import orjson  # noqa: F401
+            modes["buffered_orjson"] = dict(base_env, MCP_STREAMING_THRESHOLD="0", MCP_JSON_CODEC="orjson")
+        except ImportError:
+            pass
+
+        print(json.dumps({
+            "settings": vars(args),
+            "results": {name: run_child(env) for name, env in modes.items()}
+        }, indent=2))
+    finally:
+        process.terminate()
+        process.wait()
+
+
+if __name__ == "__main__":
+    main()
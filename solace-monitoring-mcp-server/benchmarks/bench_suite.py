@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark suite for the monitoring server, driven through its stdio loop.
+
+Every measurement speaks JSON-RPC to ``solace_monitoring_mcp_server.py`` running as a
+child process, as an MCP host does, against the local stand-in broker (semp_standin.py)
+with SEMP-style cursor paging. Scenarios:
+
+- ``startup``:     time from spawning the process to the ``initialize`` and first
+                   ``tools/list`` responses, with an empty (cold) and a populated (warm)
+                   registry cache, for the full monitor spec
+- ``tools_list``:  ``tools/list`` latency on a running server with the full monitor spec
+- ``single_call``: sequential ``getMsgVpnQueues`` latency for each collection size, for
+                   one page (``count=100``) and for the whole collection, which the server
+                   pages through itself (``max_items``)
+- ``throughput``:  calls per second and latency with many calls in flight
+                   (``MCP_DISPATCH_MODE=concurrent``), per engine
+
+    python3 benchmarks/bench_suite.py --sizes 10,1000,100000 --output results.json
+    python3 benchmarks/bench_suite.py --compare results.json --tolerance 0.2
+
+Results are printed as JSON (and written to ``--output``). With ``--compare``, every
+latency (``*_ms``) and rate (``*_per_s``) is checked against an earlier result file; the
+exit status is 1 if any of them regressed by more than the tolerance.
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Tuple
+
+from bench_engines import start_standin_process
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVER_DIR = os.path.dirname(BENCH_DIR)
+SERVER_SCRIPT = os.path.join(SERVER_DIR, "solace_monitoring_mcp_server.py")
+SPEC_PATH = os.path.join(SERVER_DIR, "semp-v2-swagger-monitor.json")
+
+# Bump when scenarios or their settings change, so old result files are not compared blindly
+SUITE_VERSION = 1
+
+
+class StdioServer:
+    """The monitoring server as a child process, spoken to over stdin and stdout."""
+
+    def __init__(self, env: Dict[str, str]):
+        self.started = time.perf_counter()
+        self.process = subprocess.Popen(
+            [sys.executable, SERVER_SCRIPT], env=env, text=True, bufsize=1,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        )
+        self._next_id = 0
+
+    def message(self, method: str, params: Optional[Dict[str, Any]] = None) -> Tuple[int, str]:
+        self._next_id += 1
+        return self._next_id, json.dumps({"jsonrpc": "2.0", "id": self._next_id, "method": method,
+                                          "params": params or {}})
+
+    def request(self, method: str, params: Optional[Dict[str, Any]] = None) -> Tuple[Dict[str, Any], int, float]:
+        """Send one request and wait for its response; returns (response, response bytes, seconds)"""
+        _, line = self.message(method, params)
+        start = time.perf_counter()
+        self.process.stdin.write(line + "\n")
+        self.process.stdin.flush()
+        response = self.process.stdout.readline()
+        elapsed = time.perf_counter() - start
+        if not response:
+            raise RuntimeError("The server exited; run it with MCP_LOG_FILE set to see why")
+        return json.loads(response), len(response), elapsed
+
+    def call_tool(self, name: str, arguments: Dict[str, Any]) -> Tuple[Dict[str, Any], int, float]:
+        response, size, elapsed = self.request("tools/call", {"name": name, "arguments": arguments})
+        if "error" in response:
+            raise RuntimeError(f"{name} failed: {response['error']['message']}")
+        return response, size, elapsed
+
+    def close(self) -> None:
+        self.process.stdin.close()
+        try:
+            self.process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+
+def server_env(port: int, **overrides: str) -> Dict[str, str]:
+    """Environment for a monitoring server pointed at the stand-in broker"""
+    env = dict(
+        os.environ,
+        OPENAPI_SPEC=SPEC_PATH,
+        SOLACE_SEMPV2_BASE_URL=f"http://127.0.0.1:{port}",
+        SOLACE_SEMPV2_USERNAME="admin",
+        SOLACE_SEMPV2_PASSWORD="admin",
+        MCP_LOG_DISABLE="true",
+        MCP_REGISTRY_CACHE="false",
+        MCP_PAGINATION_MAX_PAGES="100000"
+    )
+    env.update(overrides)
+    return env
+
+
+def latency_summary(seconds: List[float]) -> Dict[str, Any]:
+    ordered = sorted(seconds)
+
+    def percentile(p: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000, 3)
+
+    return {"samples": len(ordered), "mean_ms": round(statistics.mean(ordered) * 1000, 3),
+            "p50_ms": percentile(0.50), "p95_ms": percentile(0.95), "p99_ms": percentile(0.99)}
+
+
+def bench_startup(port: int, runs: int) -> Dict[str, Any]:
+    cache_dir = tempfile.mkdtemp(prefix="mcp-suite-registry-")
+    env = server_env(port, MCP_REGISTRY_CACHE="true", MCP_REGISTRY_CACHE_DIR=cache_dir)
+
+    def start_once() -> Dict[str, float]:
+        server = StdioServer(env)
+        try:
+            server.request("initialize")
+            initialized = time.perf_counter() - server.started
+            response, _, _ = server.request("tools/list")
+            listed = time.perf_counter() - server.started
+            return {"initialize": initialized, "tools_list": listed, "tools": len(response["result"]["tools"])}
+        finally:
+            server.close()
+
+    def summarize(samples: List[Dict[str, float]]) -> Dict[str, Any]:
+        return {
+            "tools": samples[0]["tools"],
+            "initialize_ms": round(statistics.median(s["initialize"] for s in samples) * 1000, 2),
+            "first_tools_list_ms": round(statistics.median(s["tools_list"] for s in samples) * 1000, 2)
+        }
+
+    try:
+        cold = []
+        for _ in range(runs):
+            shutil.rmtree(cache_dir, ignore_errors=True)
+            cold.append(start_once())
+        warm = [start_once() for _ in range(runs)]
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    return {"runs": runs, "cold": summarize(cold), "warm": summarize(warm)}
+
+
+def bench_tools_list(port: int, runs: int) -> Dict[str, Any]:
+    server = StdioServer(server_env(port))
+    try:
+        server.request("initialize")
+        server.request("tools/list")
+        timings, size = [], 0
+        for _ in range(runs):
+            _, size, elapsed = server.request("tools/list")
+            timings.append(elapsed)
+    finally:
+        server.close()
+    return dict(latency_summary(timings), response_bytes=size)
+
+
+def bench_single_call(sizes: List[int], runs: int, latency_ms: float, page_size: int) -> Dict[str, Any]:
+    results = {}
+    for size in sizes:
+        process, port = start_standin_process(latency_ms, size, page_size)
+        server = StdioServer(server_env(port, MCP_API_INCLUDE_TOOLS="getMsgVpnQueues", MCP_SINGLE_FLIGHT="false"))
+        try:
+            server.request("initialize")
+            cases = {
+                "page": {"msgVpnName": "default", "count": 100},
+                "all": {"msgVpnName": "default", "count": 1000, "max_items": size}
+            }
+            results[str(size)] = {}
+            for case, arguments in cases.items():
+                # The first call also opens the broker connection; it is not measured
+                server.call_tool("getMsgVpnQueues", arguments)
+                timings, response_bytes = [], 0
+                for _ in range(runs):
+                    _, response_bytes, elapsed = server.call_tool("getMsgVpnQueues", arguments)
+                    timings.append(elapsed)
+                results[str(size)][case] = dict(latency_summary(timings), response_bytes=response_bytes)
+        finally:
+            server.close()
+            process.terminate()
+            process.wait()
+    return results
+
+
+def bench_throughput(engines: List[str], calls: int, in_flight: int, latency_ms: float) -> Dict[str, Any]:
+    results = {}
+    process, port = start_standin_process(latency_ms, 100, 100)
+    try:
+        for engine in engines:
+            server = StdioServer(server_env(
+                port, MCP_API_INCLUDE_TOOLS="getMsgVpnQueues", MCP_ENGINE=engine,
+                MCP_DISPATCH_MODE="concurrent", MCP_DISPATCH_WORKERS=str(in_flight),
+                MCP_DISPATCH_MAX_IN_FLIGHT=str(in_flight), MCP_HTTP_POOL_SIZE=str(in_flight)
+            ))
+            try:
+                server.request("initialize")
+                server.call_tool("getMsgVpnQueues", {"msgVpnName": "default"})
+                # Distinct VPN names give distinct URLs, so calls are not coalesced by single-flight
+                messages = [server.message("tools/call", {"name": "getMsgVpnQueues",
+                                                          "arguments": {"msgVpnName": f"vpn{i % 100}"}})
+                            for i in range(calls)]
+                results[engine] = pipeline(server, messages, in_flight)
+            finally:
+                server.close()
+    finally:
+        process.terminate()
+        process.wait()
+    return results
+
+
+def pipeline(server: StdioServer, messages: List[Tuple[int, str]], in_flight: int) -> Dict[str, Any]:
+    """Keep up to in_flight requests outstanding and time each response"""
+    sent: Dict[int, float] = {}
+    timings: List[float] = []
+    errors = [0]
+    slots = threading.Semaphore(in_flight)
+
+    def read_responses() -> None:
+        for _ in messages:
+            line = server.process.stdout.readline()
+            if not line:
+                break
+            response = json.loads(line)
+            timings.append(time.perf_counter() - sent[response["id"]])
+            errors[0] += "error" in response
+            slots.release()
+
+    reader = threading.Thread(target=read_responses)
+    reader.start()
+    start = time.perf_counter()
+    for message_id, line in messages:
+        slots.acquire()
+        sent[message_id] = time.perf_counter()
+        server.process.stdin.write(line + "\n")
+        server.process.stdin.flush()
+    reader.join()
+    elapsed = time.perf_counter() - start
+
+    return dict(latency_summary(timings), calls=len(timings), errors=errors[0], in_flight=in_flight,
+                elapsed_s=round(elapsed, 3), throughput_per_s=round(len(timings) / elapsed, 1))
+
+
+def environment() -> Dict[str, Any]:
+    try:
+        revision = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=SERVER_DIR,
+                                  capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = None
+    return {
+        "git_revision": revision,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "orjson": importlib.util.find_spec("orjson") is not None,
+        "aiohttp": importlib.util.find_spec("aiohttp") is not None
+    }
+
+
+def flatten(value: Any, prefix: str = "") -> Dict[str, float]:
+    if isinstance(value, dict):
+        flat = {}
+        for key, item in value.items():
+            flat.update(flatten(item, f"{prefix}.{key}" if prefix else str(key)))
+        return flat
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return {prefix: value}
+    return {}
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[Dict[str, Any]]:
+    """Return the latencies that grew and the rates that fell by more than the tolerance"""
+    before = flatten(baseline.get("results", {}))
+    regressions = []
+    for metric, value in flatten(current["results"]).items():
+        old = before.get(metric)
+        if not old:
+            continue
+        if (metric.endswith("_ms") and value > old * (1 + tolerance)) or \
+                (metric.endswith("_per_s") and value < old * (1 - tolerance)):
+            regressions.append({"metric": metric, "baseline": old, "current": value,
+                                "change": round(value / old - 1, 3)})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the monitoring server through its stdio loop")
+    parser.add_argument("--scenarios", default="startup,tools_list,single_call,throughput")
+    parser.add_argument("--sizes", default="10,1000,100000", help="Queue collection sizes for single_call")
+    parser.add_argument("--runs", type=int, default=5, help="Repetitions per startup and single_call case")
+    parser.add_argument("--list-runs", type=int, default=50, help="tools/list requests measured")
+    parser.add_argument("--latency-ms", type=float, default=2.0, help="Stand-in broker latency per request")
+    parser.add_argument("--page-size", type=int, default=10,
+                        help="Stand-in page size when a request has no count (SEMP's default is 10)")
+    parser.add_argument("--calls", type=int, default=2000, help="Calls sent in the throughput scenario")
+    parser.add_argument("--in-flight", type=int, default=32, help="Outstanding calls in the throughput scenario")
+    parser.add_argument("--engines", default="sync,async", help="Engines measured in the throughput scenario")
+    parser.add_argument("--output", help="Also write the results to this file")
+    parser.add_argument("--compare", help="Earlier result file to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression")
+    args = parser.parse_args()
+
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    engines = [name.strip() for name in args.engines.split(",") if name.strip()]
+    if "async" in engines and importlib.util.find_spec("aiohttp") is None:
+        # The asyncio engine needs aiohttp
+        engines.remove("async")
+
+    results: Dict[str, Any] = {}
+    if "startup" in scenarios or "tools_list" in scenarios:
+        # Neither scenario calls a tool, but the server still needs a broker URL
+        process, port = start_standin_process(args.latency_ms, 10, args.page_size)
+        try:
+            if "startup" in scenarios:
+                results["startup"] = bench_startup(port, args.runs)
+            if "tools_list" in scenarios:
+                results["tools_list"] = bench_tools_list(port, args.list_runs)
+        finally:
+            process.terminate()
+            process.wait()
+    if "single_call" in scenarios:
+        sizes = [int(size) for size in args.sizes.split(",")]
+        results["single_call"] = bench_single_call(sizes, args.runs, args.latency_ms, args.page_size)
+    if "throughput" in scenarios:
+        results["throughput"] = bench_throughput(engines, args.calls, args.in_flight, args.latency_ms)
+
+    report = {
+        "suite_version": SUITE_VERSION,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "environment": environment(),
+        "settings": vars(args),
+        "results": results
+    }
+
+    regressions = []
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        if baseline.get("suite_version") != SUITE_VERSION:
+            print(f"Warning: {args.compare} was written by suite version {baseline.get('suite_version')}",
+                  file=sys.stderr)
+        regressions = compare(report, baseline, args.tolerance)
+        report["comparison"] = {"baseline": args.compare, "baseline_revision":
+                                baseline.get("environment", {}).get("git_revision"),
+                                "tolerance": args.tolerance, "regressions": regressions}
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text + "\n")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
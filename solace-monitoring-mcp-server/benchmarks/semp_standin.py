@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for a Solace broker's SEMPv2 monitor API.
+
+Serves canned SEMPv2-shaped responses with a configurable artificial latency so the
+MCP server can be benchmarked without a real broker. Collection paths (for example
+``/SEMP/v2/monitor/msgVpns/default/queues``) return ``--queues`` synthetic objects;
+every other path returns a single object.
+
+Collections are paged like SEMP: a ``count`` query parameter (or ``--page-size`` when it
+is absent) limits the objects per response, and ``meta.paging`` carries the cursor of the
+next page, which the client passes back as ``cursor``.
+
+Run standalone:
+    python3 benchmarks/semp_standin.py --port 8080 --latency-ms 20 --queues 100 --page-size 10
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+import urllib.parse
+from functools import lru_cache
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, Any, Tuple
+
+
+def make_queue(index: int, msg_vpn: str = "default") -> Dict[str, Any]:
+    """Build one synthetic MsgVpnQueue object."""
+    return {
+        "msgVpnName": msg_vpn,
+        "queueName": f"q/bench/{index:06d}",
+        "accessType": "exclusive",
+        "bindCount": index % 3,
+        "ingressEnabled": True,
+        "egressEnabled": True,
+        "msgSpoolUsage": (index * 7919) % 1048576,
+        "spooledMsgCount": index * 3,
+        "txMsgRate": index % 100,
+        "rxMsgRate": (index * 2) % 100,
+        "maxMsgSpoolUsage": 5000
+    }
+
+
+class SempStandinHandler(BaseHTTPRequestHandler):
+    """Request handler answering every GET with a SEMPv2-shaped JSON document."""
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; without this, small bodies wait for a delayed ACK
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        settings = self.server.settings
+        if settings["latency"] > 0:
+            time.sleep(settings["latency"])
+
+        status, body = self.server.render(self.path, self.headers.get('Host', ''))
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client stopped reading early (e.g. a response size cap)
+            pass
+
+        with self.server.lock:
+            self.server.request_count += 1
+
+    def log_message(self, format, *args):
+        # Keep benchmark output clean
+        pass
+
+
+def build_response(settings: Dict[str, Any], request_path: str, host: str) -> Tuple[int, Dict[str, Any]]:
+    """Return (status, document) for a request path including its query string."""
+    path, _, query = request_path.partition("?")
+    params = urllib.parse.parse_qs(query)
+    meta = {"request": {"method": "GET", "uri": f"http://{host}{request_path}"}, "responseCode": 200}
+
+    if path.endswith("/queues"):
+        try:
+            count = int(params.get("count", [settings["page_size"]])[0]) or settings["queues"]
+            start = int(params.get("cursor", ["0"])[0])
+        except ValueError:
+            return 400, {"meta": dict(meta, responseCode=400, error={"description": "Invalid count or cursor"})}
+        end = min(start + count, settings["queues"])
+        queues = [make_queue(i) for i in range(start, end)]
+        meta["count"] = settings["queues"]
+        if end < settings["queues"]:
+            # The cursor is opaque to clients; here it is simply the offset of the next page
+            next_query = urllib.parse.urlencode(dict({k: v[0] for k, v in params.items()}, cursor=end))
+            meta["paging"] = {"cursorQuery": str(end), "nextPageUri": f"http://{host}{path}?{next_query}"}
+        return 200, {
+            "data": queues,
+            "links": [{"uri": f"http://localhost{path}/{q['queueName']}"} for q in queues],
+            "meta": meta
+        }
+
+    return 200, {"data": {"name": path.rsplit("/", 1)[-1]}, "links": {"uri": path}, "meta": meta}
+
+
+def start_standin(host: str = "127.0.0.1", port: int = 0, latency_ms: float = 0.0,
+                  queues: int = 10, page_size: int = 0) -> ThreadingHTTPServer:
+    """Start the stand-in broker on a background thread and return the server.
+
+    ``page_size`` 0 returns whole collections unless the request has a ``count``.
+    """
+    ThreadingHTTPServer.request_queue_size = 1024
+    server = ThreadingHTTPServer((host, port), SempStandinHandler)
+    server.daemon_threads = True
+    server.settings = {"latency": latency_ms / 1000.0, "queues": queues, "page_size": page_size}
+    server.lock = threading.Lock()
+    server.request_count = 0
+
+    @lru_cache(maxsize=256)
+    def render(request_path: str, host: str) -> Tuple[int, bytes]:
+        # Responses are deterministic, so repeated requests reuse the encoded body
+        status, document = build_response(server.settings, request_path, host)
+        return status, json.dumps(document).encode("utf-8")
+
+    server.render = render
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local SEMPv2 monitor stand-in broker")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=0, help="Port to listen on (0 picks a free port)")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Artificial latency added to every response")
+    parser.add_argument("--queues", type=int, default=10, help="Number of objects in queue collections")
+    parser.add_argument("--page-size", type=int, default=0,
+                        help="Objects per page when a request has no count (0 returns the whole collection)")
+    args = parser.parse_args()
+
+    server = start_standin(args.host, args.port, args.latency_ms, args.queues, args.page_size)
+    # The first stdout line tells a parent process where to connect
+    print(f"READY {server.server_address[1]}", flush=True)
+
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
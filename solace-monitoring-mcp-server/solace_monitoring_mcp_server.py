@@ -1,13 +1,65 @@
 #!/usr/bin/env python3
 import os
-from dotenv import load_dotenv
+import argparse
+import bisect
+import codecs
+import contextvars
+import fnmatch
+import gzip
+import hashlib
+import importlib
+import io
 import sys
 import json
 import logging
 import logging.handlers
-import requests
-from typing import Dict, Any, List, Optional, Union
-from dataclasses import dataclass, field, asdict
+import math
+import operator
+import random
+import re
+import threading
+import time
+import urllib.parse
+from array import array
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING, Dict, Any, List, Optional, Union, Callable
+from dataclasses import dataclass, field, fields, asdict
+
+
+class _DeferredModule:
+    """A module that is imported on first attribute access.
+
+    The first access also rebinds the module-global of the same name to the real module,
+    so later lookups skip this wrapper; references held elsewhere use the cached module.
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attribute: str) -> Any:
+        module = self._module
+        if module is None:
+            module = self._module = importlib.import_module(self._name)
+            if globals().get(self._name) is self:
+                globals()[self._name] = module
+        return getattr(module, attribute)
+
+
+# requests and asyncio are imported when first used (and dotenv when the configuration is
+# read), so a freshly spawned server can answer the MCP initialize handshake without waiting
+if TYPE_CHECKING:
+    import asyncio
+    import requests
+else:
+    asyncio = _DeferredModule("asyncio")
+    requests = _DeferredModule("requests")
+
+try:
+    import orjson  # Optional: faster JSON encoding and decoding of large SEMP results
+except ImportError:
+    orjson = None
 
 
 @dataclass
@@ -19,21 +71,37 @@ class BrokerConfig:
     password: Optional[str] = None
     auth_method: str = "basic"
     bearer_token: Optional[str] = None
+    rate_limit: float = 0.0  # requests per second, 0 is unlimited
+    max_concurrency: int = 0  # concurrent requests, 0 is unlimited
 
 class LoggingConfig:
     """Encapsulates logging configuration properties."""
     def __init__(self):
+        from dotenv import load_dotenv
         load_dotenv()  # Load variables from .env file
         # Logging configuration
         self.log_level = os.environ.get("MCP_LOG_LEVEL", "INFO").upper()
         self.log_file = os.environ.get("MCP_LOG_FILE", "")
         self.log_disable = os.environ.get("MCP_LOG_DISABLE", "").lower() == "true"
+        # Records are handed to a background writer thread instead of being written by the caller
+        self.log_queue = os.environ.get("MCP_LOG_QUEUE", "true").lower() == "true"
+        self.log_queue_size = os.environ.get("MCP_LOG_QUEUE_SIZE", "10000")
+        # One JSON line per tool call (tool, broker, status, latency, bytes); empty is off
+        self.access_log = os.environ.get("MCP_ACCESS_LOG", "")
 
         # Validate log level
         if self.log_level not in ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"):
             print(f"Warning: Invalid log level {self.log_level}. Using INFO instead.", file=sys.stderr)
             self.log_level = "INFO"
 
+        try:
+            self.log_queue_size = int(self.log_queue_size)
+            if self.log_queue_size < 1:
+                raise ValueError(self.log_queue_size)
+        except ValueError:
+            print(f"Warning: Invalid log queue size {self.log_queue_size}. Using 10000 instead.", file=sys.stderr)
+            self.log_queue_size = 10000
+
     def get_level_num(self) -> int:
         """Convert log level string to numeric value."""
         return getattr(logging, self.log_level, logging.INFO)
@@ -44,45 +112,158 @@ class LoggingConfig:
 
     def __str__(self) -> str:
         """Return string representation for debugging."""
-        return f"LoggingConfig(level={self.log_level}, file={self.log_file}, disabled={self.log_disable})"
+        return (f"LoggingConfig(level={self.log_level}, file={self.log_file}, disabled={self.log_disable}, "
+                f"queue={self.log_queue}, access_log={self.access_log})")
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Hand log records to a bounded queue drained by a background writer.
+
+    The message is merged with its arguments when it is logged, so later changes to those
+    arguments do not show up in the log; formatting the line and writing the file happen on
+    the writer thread. When the queue is full the record is dropped and counted rather than
+    blocking the request that logged it.
+    """
+
+    def __init__(self, record_queue):
+        import queue
+        super().__init__(record_queue)
+        self.full = queue.Full
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except self.full:
+            # Approximate under concurrent drops
+            self.dropped += 1
+
+
+class AccessLogFormatter(logging.Formatter):
+    """Format an access log record, whose `access` attribute holds the entry, as one JSON line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        created = time.gmtime(record.created)
+        entry = {"ts": time.strftime("%Y-%m-%dT%H:%M:%S", created) + f".{int(record.msecs):03d}Z"}
+        entry.update(record.access)
+        return json.dumps(entry, separators=(",", ":"))
+
+
+ACCESS_LOGGER_NAME = "solace-sempv2-mcp.access"
+
+# Writer thread and queue handler installed by setup_logging(), when MCP_LOG_QUEUE is on
+_log_listener = None
+_log_queue_handler: Optional[DroppingQueueHandler] = None
+
+
+def _stop_log_listener() -> None:
+    """Write out the queued records and stop the writer thread"""
+    global _log_listener, _log_queue_handler
+    if _log_listener is not None:
+        _log_listener.stop()
+        for handler in _log_listener.handlers:
+            handler.close()
+        _log_listener = None
+        _log_queue_handler = None
+
+
+def dropped_log_records() -> int:
+    """Number of records dropped because the log queue was full"""
+    return _log_queue_handler.dropped if _log_queue_handler is not None else 0
+
 
 # Configure logging
 def setup_logging():
     """Configure logging with file handler based on LoggingConfig."""
+    global _log_listener, _log_queue_handler
     config = LoggingConfig()
     logger = logging.getLogger("solace-sempv2-mcp")
+    access_logger = logging.getLogger(ACCESS_LOGGER_NAME)
 
     # Set log level
     log_level_num = config.get_level_num()
     logger.setLevel(log_level_num)
+    access_logger.setLevel(logging.INFO)
+    access_logger.propagate = False
 
-    # Remove any existing handlers
-    for handler in logger.handlers[:]:
-        logger.removeHandler(handler)
+    # Remove any existing handlers, writing out what a previous writer thread still holds
+    _stop_log_listener()
+    for configured in (logger, access_logger):
+        for handler in configured.handlers[:]:
+            configured.removeHandler(handler)
+            handler.close()
+        configured.disabled = False
 
+    handlers = []
     # Check if logging is disabled
     if config.log_disable:
         logger.disabled = True
-        return logger
-
     # Add file handler if specified
-    if config.log_file:
+    elif config.log_file:
         try:
             file_handler = logging.FileHandler(config.log_file)
             file_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
-            logger.addHandler(file_handler)
+            file_handler.addFilter(lambda record: record.name != ACCESS_LOGGER_NAME)
+            handlers.append((logger, file_handler))
         except Exception as e:
             # Can't log this error since logger setup failed
             print(f"ERROR: Failed to create log file {config.log_file}: {e}", file=sys.stderr)
             # Continue without logging
+            logger.disabled = True
     else:
         # Disable logging if no file is specified
         logger.disabled = True
 
+    # The access log is independent of MCP_LOG_DISABLE and MCP_LOG_LEVEL
+    access_logger.disabled = True
+    if config.access_log:
+        try:
+            access_handler = logging.FileHandler(config.access_log)
+            access_handler.setFormatter(AccessLogFormatter())
+            access_handler.addFilter(logging.Filter(ACCESS_LOGGER_NAME))
+            handlers.append((access_logger, access_handler))
+            access_logger.disabled = False
+        except Exception as e:
+            print(f"ERROR: Failed to create access log {config.access_log}: {e}", file=sys.stderr)
+
+    if not handlers:
+        return logger
+
+    if not config.log_queue:
+        for configured, handler in handlers:
+            configured.addHandler(handler)
+        return logger
+
+    # Only imported when something is logged
+    import atexit
+    import queue
+    record_queue = queue.Queue(maxsize=config.log_queue_size)
+    _log_queue_handler = DroppingQueueHandler(record_queue)
+    for configured in {configured.name: configured for configured, _ in handlers}.values():
+        configured.addHandler(_log_queue_handler)
+    # Each handler's filter keeps the records of its own logger
+    _log_listener = logging.handlers.QueueListener(record_queue, *(handler for _, handler in handlers),
+                                                   respect_handler_level=True)
+    _log_listener.start()
+    atexit.unregister(_stop_log_listener)
+    atexit.register(_stop_log_listener)
     return logger
 
-# Initialize logger
-logger = setup_logging()
+# The logger is configured by ensure_logging() when the first ServerConfig is created, not at import
+logger = logging.getLogger("solace-sempv2-mcp")
+access_logger = logging.getLogger(ACCESS_LOGGER_NAME)
+# HTTP status of the last SEMP response per broker alias, collected for the access log entry
+# of the tool call being handled ("error" when no response arrived); None outside such a call
+_semp_statuses: contextvars.ContextVar = contextvars.ContextVar("semp_statuses", default=None)
+_logging_ready = False
+
+def ensure_logging() -> logging.Logger:
+    """Run setup_logging() once, on first use; it also loads the .env file"""
+    global _logging_ready
+    if not _logging_ready:
+        setup_logging()
+        _logging_ready = True
+    return logger
 
 # MCP Protocol Constants
 MCP_VERSION = "2024-11-05"
@@ -92,6 +273,65 @@ REQUEST = "request"
 RESPONSE = "response"
 ERROR = "error"
 
+# broker_alias value that targets every configured broker
+FANOUT_ALL_BROKERS = "*"
+
+# Cache TTL rule kinds, in order of precedence
+CACHE_RULE_PRECEDENCE = {"tool": 0, "path": 1, "tag": 2}
+
+# Built-in MCP_AUTO_SELECT profile: glob patterns for the fields kept from each SEMP object,
+# in addition to its identifying attributes. "definitions" and "tools" entries override "default".
+DEFAULT_SELECT_PROFILE = {
+    "default": [
+        "*Name", "enabled", "*State", "*Status", "*Up", "uptime", "accessType",
+        "ingressEnabled", "egressEnabled", "bindCount", "msgSpoolUsage", "maxMsgSpoolUsage",
+        "spooledMsgCount", "txUnackedMsgCount", "rxMsgCount", "txMsgCount", "rxMsgRate", "txMsgRate"
+    ],
+    "definitions": {},
+    "tools": {}
+}
+
+# Default MCP_POLL_FIELDS: glob patterns for the numeric SEMP fields the poller keeps a history of.
+# Nested objects (such as "counter" and "rate") are matched on their field names.
+DEFAULT_POLL_FIELDS = ["*Count", "*Rate", "*Usage", "*Utilization"]
+
+# Polled fields that are cumulative counters, reported with their increase and rate; all other
+# fields are gauges. Many SEMP gauges also end in Count (bindCount, txUnackedMsgCount,
+# msgSpoolMsgCount, maxBindCount), so counters are listed rather than inferred from the name.
+# Fields of SEMP's "counter" objects are always counters.
+COUNTER_FIELDS = [
+    "rxMsgCount", "txMsgCount", "rxByteCount", "txByteCount",
+    "*RxMsgCount", "*TxMsgCount", "*RxByteCount", "*TxByteCount",
+    "*DiscardedMsgCount", "*FailureCount", "*SuccessCount", "*RequestCount",
+    "spooledMsgCount", "spooledByteCount", "deletedMsgCount", "redeliveredMsgCount",
+    "replayStartCount", "transportRetransmitMsgCount"
+]
+
+# Pages followed per polled collection; the page size is set with count= in the polled path
+POLL_MAX_PAGES = 10
+
+# Requests that may be repeated safely, and responses that are worth retrying
+IDEMPOTENT_METHODS = ("GET", "HEAD")
+TRANSIENT_STATUS_CODES = (429, 502, 503, 504)
+
+# Bytes read from the socket per step when a response body is parsed incrementally
+STREAMING_CHUNK_SIZE = 64 * 1024
+
+# Rough size of one model token in bytes of JSON, used for token-denominated response budgets
+BYTES_PER_TOKEN = 4
+
+# Upper bounds, in seconds, of the latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# get_stats() sections whose keys are broker aliases; they become a broker label on exported gauges
+BROKER_KEYED_STATS = ("brokers", "circuit_breakers", "broker_limits")
+
+# MCP methods that get their own metrics label; anything else is counted as "other"
+METERED_METHODS = ("initialize", "tools/list", "mcp.list_tools", "tools/call", "mcp.call_tool")
+
+# Rows of the attribute table in SEMP operation descriptions, e.g. "queueName|x|"
+IDENTIFYING_ATTRIBUTE_ROW = re.compile(r'^(\w+)\|x\|', re.MULTILINE)
+
 # MCP Error Codes
 ERROR_PARSE = -32700
 ERROR_INVALID_REQUEST = -32600
@@ -102,6 +342,9 @@ ERROR_INTERNAL = -32603
 class ServerConfig:
     """Encapsulates configuration properties with default values."""
     def __init__(self):
+        # Settings may come from a .env file, which is loaded along with the logging configuration
+        ensure_logging()
+
         # OpenAPI spec configuration
         self.openapi_spec_path = os.environ.get("OPENAPI_SPEC", "semp-v2-swagger-monitor.json")
 
@@ -110,6 +353,12 @@ class ServerConfig:
         self.broker_aliases: List[str] = self._parse_list(os.environ.get("SOLACE_BROKERS_ALIAS", ""))
         self.default_broker_alias: Optional[str] = os.environ.get("SOLACE_BROKER_DEFAULT")
 
+        # Broker protection defaults, overridable per broker alias
+        self.broker_rate_limit = float(os.environ.get("MCP_BROKER_RATE_LIMIT", "0"))
+        self.broker_burst = int(os.environ.get("MCP_BROKER_BURST", "0"))
+        self.broker_max_concurrency = int(os.environ.get("MCP_BROKER_MAX_CONCURRENCY", "0"))
+        self.broker_latency_target = float(os.environ.get("MCP_BROKER_LATENCY_TARGET", "2"))
+
         if self.broker_aliases:
             # If only one broker alias is defined, make it the default if no explicit default is set
             if len(self.broker_aliases) == 1 and not self.default_broker_alias:
@@ -128,7 +377,10 @@ class ServerConfig:
                     username=os.environ.get(f"SOLACE_SEMPV2_USERNAME{suffix}"),
                     password=os.environ.get(f"SOLACE_SEMPV2_PASSWORD{suffix}"),
                     auth_method=os.environ.get(f"SOLACE_SEMPV2_AUTH_METHOD{suffix}", "basic").lower(),
-                    bearer_token=os.environ.get(f"SOLACE_SEMPV2_BEARER_TOKEN{suffix}", "")
+                    bearer_token=os.environ.get(f"SOLACE_SEMPV2_BEARER_TOKEN{suffix}", ""),
+                    rate_limit=float(os.environ.get(f"SOLACE_SEMPV2_RATE_LIMIT{suffix}", self.broker_rate_limit)),
+                    max_concurrency=int(os.environ.get(f"SOLACE_SEMPV2_MAX_CONCURRENCY{suffix}",
+                                                       self.broker_max_concurrency))
                 )
         else:
             # Single-broker configuration (backward compatibility)
@@ -141,7 +393,9 @@ class ServerConfig:
                 username=os.environ.get("SOLACE_SEMPV2_USERNAME"),
                 password=os.environ.get("SOLACE_SEMPV2_PASSWORD"),
                 auth_method=os.environ.get("SOLACE_SEMPV2_AUTH_METHOD", "basic").lower(),
-                bearer_token=os.environ.get("SOLACE_SEMPV2_BEARER_TOKEN", "")
+                bearer_token=os.environ.get("SOLACE_SEMPV2_BEARER_TOKEN", ""),
+                rate_limit=self.broker_rate_limit,
+                max_concurrency=self.broker_max_concurrency
             )
 
         # API filtering options - by default, include all APIs
@@ -153,6 +407,106 @@ class ServerConfig:
         self.exclude_paths = self._parse_list(os.environ.get("MCP_API_EXCLUDE_PATHS", ""))
         self.include_tools = self._parse_list(os.environ.get("MCP_API_INCLUDE_TOOLS", ""))
         self.exclude_tools = self._parse_list(os.environ.get("MCP_API_EXCLUDE_TOOLS", ""))
+
+        # HTTP connection pool options
+        self.http_pool_size = int(os.environ.get("MCP_HTTP_POOL_SIZE", "10"))
+        self.http_pool_idle_timeout = float(os.environ.get("MCP_HTTP_POOL_IDLE_TIMEOUT", "300"))
+        # Per-request timeouts, so a broker that accepts connections and then hangs fails the call (0 disables)
+        self.http_connect_timeout = float(os.environ.get("MCP_HTTP_CONNECT_TIMEOUT", "5"))
+        self.http_read_timeout = float(os.environ.get("MCP_HTTP_READ_TIMEOUT", "30"))
+
+        # Request dispatch options
+        self.dispatch_mode = os.environ.get("MCP_DISPATCH_MODE", "sequential").lower()
+        self.dispatch_workers = int(os.environ.get("MCP_DISPATCH_WORKERS", "8"))
+        self.dispatch_max_in_flight = int(os.environ.get("MCP_DISPATCH_MAX_IN_FLIGHT", "32"))
+        self.engine = os.environ.get("MCP_ENGINE", "sync").lower()
+
+        # Server-side pagination options
+        self.pagination_max_pages = int(os.environ.get("MCP_PAGINATION_MAX_PAGES", "100"))
+
+        # Multi-broker fan-out options
+        self.fanout_timeout = float(os.environ.get("MCP_FANOUT_TIMEOUT", "30"))
+        self.fanout_workers = int(os.environ.get("MCP_FANOUT_WORKERS", "16"))
+
+        # Response cache options (disabled unless a TTL is configured)
+        self.cache_ttl = float(os.environ.get("MCP_CACHE_TTL", "0"))
+        self.cache_ttl_rules = self._parse_ttl_rules(os.environ.get("MCP_CACHE_TTL_RULES", ""))
+        self.cache_max_bytes = int(os.environ.get("MCP_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+        self.cache_stale_while_revalidate = float(os.environ.get("MCP_CACHE_STALE_WHILE_REVALIDATE", "0"))
+
+        # Coalesce identical in-flight GET requests
+        self.single_flight = os.environ.get("MCP_SINGLE_FLIGHT", "true").lower() == "true"
+
+        # Compiled tool registry cache
+        self.registry_cache_dir = ""
+        if os.environ.get("MCP_REGISTRY_CACHE", "true").lower() == "true":
+            default_cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+            self.registry_cache_dir = os.environ.get("MCP_REGISTRY_CACHE_DIR") or \
+                os.path.join(default_cache_home, "solace-monitoring-mcp")
+
+        # Memory-lean registry: build input schemas on first use and release the raw spec
+        self.lean_registry = os.environ.get("MCP_LEAN_REGISTRY", "false").lower() == "true"
+
+        # Number of tools per tools/list page (0 returns every tool in one page)
+        self.tools_list_page_size = int(os.environ.get("MCP_TOOLS_LIST_PAGE_SIZE", "0"))
+
+        # Response trimming: default select projections and link stripping
+        self.auto_select = os.environ.get("MCP_AUTO_SELECT", "false").lower() == "true"
+        self.select_profile_path = os.environ.get("MCP_SELECT_PROFILE", "")
+        self.select_profile: Optional[Dict[str, Any]] = None
+        if self.auto_select:
+            self.select_profile = self._load_select_profile(self.select_profile_path)
+        self.strip_links = os.environ.get("MCP_STRIP_LINKS", "false").lower() == "true"
+
+        # Response size budget in bytes (0 disables), globally and per tool
+        self.response_budget = self._parse_budget(os.environ.get("MCP_RESPONSE_BUDGET", "0"))
+        self.response_budget_rules: Dict[str, int] = {}
+        for item in self._parse_list(os.environ.get("MCP_RESPONSE_BUDGET_RULES", "")):
+            tool_name, sep, budget = item.partition('=')
+            if not sep or not tool_name.strip():
+                raise ValueError(f"Invalid MCP_RESPONSE_BUDGET_RULES entry '{item}'. Use <tool name>=<budget>.")
+            self.response_budget_rules[tool_name.strip()] = self._parse_budget(budget)
+
+        # Retries of transient failures (idempotent requests only) and per-broker circuit breakers
+        self.retries = int(os.environ.get("MCP_RETRIES", "0"))
+        self.retry_backoff = float(os.environ.get("MCP_RETRY_BACKOFF", "0.2"))
+        self.retry_backoff_max = float(os.environ.get("MCP_RETRY_BACKOFF_MAX", "5"))
+        self.circuit_breaker_threshold = int(os.environ.get("MCP_CIRCUIT_BREAKER_THRESHOLD", "0"))
+        self.circuit_breaker_cooldown = float(os.environ.get("MCP_CIRCUIT_BREAKER_COOLDOWN", "30"))
+
+        # Incremental parsing of large response bodies (0 disables) and the hard cap on body size (0 is unlimited)
+        self.streaming_threshold = int(os.environ.get("MCP_STREAMING_THRESHOLD", str(1024 * 1024)))
+        self.max_response_bytes = int(os.environ.get("MCP_MAX_RESPONSE_BYTES", "0"))
+
+        # Opt-in profiling of tool calls, written to MCP_PROFILE_DIR (disabled when unset)
+        self.profile_dir = os.environ.get("MCP_PROFILE_DIR", "")
+        self.profile_sample_rate = float(os.environ.get("MCP_PROFILE_SAMPLE_RATE", "0"))
+        self.profile_slow_ms = float(os.environ.get("MCP_PROFILE_SLOW_MS", "0"))
+        self.profile_format = os.environ.get("MCP_PROFILE_FORMAT", "collapsed").lower()
+        self.profile_interval_ms = float(os.environ.get("MCP_PROFILE_INTERVAL_MS", "5"))
+
+        # Record SEMP traffic to a cassette file, or replay a recorded one instead of contacting brokers
+        self.cassette_mode = os.environ.get("MCP_CASSETTE_MODE", "off").lower()
+        self.cassette_path = os.environ.get("MCP_CASSETTE", "")
+        self.cassette_time_scale = float(os.environ.get("MCP_CASSETTE_TIME_SCALE", "1"))
+
+        # Metrics registry, exported by the server_metrics tool and optionally over HTTP or to a file
+        self.metrics_port = int(os.environ.get("MCP_METRICS_PORT", "0"))
+        self.metrics_file = os.environ.get("MCP_METRICS_FILE", "")
+        self.metrics_file_interval = float(os.environ.get("MCP_METRICS_FILE_INTERVAL", "60"))
+        self.metrics = os.environ.get("MCP_METRICS", "false").lower() == "true" or \
+            bool(self.metrics_port or self.metrics_file)
+
+        # Background sampling of SEMP paths on every broker into in-memory time series (disabled when unset)
+        self.poll_paths = self._parse_list(os.environ.get("MCP_POLL_PATHS", ""))
+        self.poll_interval = float(os.environ.get("MCP_POLL_INTERVAL", "10"))
+        self.poll_history = int(os.environ.get("MCP_POLL_HISTORY", "360"))
+        self.poll_fields = self._parse_list(os.environ.get("MCP_POLL_FIELDS", "")) or list(DEFAULT_POLL_FIELDS)
+
+        # JSON encoding of tool results
+        self.json_codec = os.environ.get("MCP_JSON_CODEC", "auto").lower()
+        self.json_pretty = os.environ.get("MCP_JSON_PRETTY", "false").lower() == "true"
+        self.structured_content = os.environ.get("MCP_STRUCTURED_CONTENT", "false").lower()
         self.validate()
 
         # Log configuration (masking sensitive data)
@@ -163,12 +517,20 @@ class ServerConfig:
         # Create a dictionary of configuration properties
         config_dict = {
             "OpenAPI Configuration": {
-                "openapi_spec_path": self.openapi_spec_path
+                "openapi_spec_path": self.openapi_spec_path,
+                "registry_cache_dir": self.registry_cache_dir or "<disabled>"
             },
             "Broker Configuration": {
                 "broker_aliases": self.broker_aliases or "<not set>",
                 "default_broker_alias": self.default_broker_alias or "<not set>"
             },
+            "Broker Protection Configuration": {
+                "rate_limits": {alias: broker.rate_limit or "<unlimited>" for alias, broker in self.brokers.items()},
+                "burst": self.broker_burst or "<rate>",
+                "max_concurrency": {alias: broker.max_concurrency or "<unlimited>"
+                                    for alias, broker in self.brokers.items()},
+                "latency_target": self.broker_latency_target
+            },
             "API Filtering Configuration": {
                 "include_methods": self.include_methods or "<not set>",
                 "exclude_methods": self.exclude_methods or "<not set>",
@@ -176,6 +538,84 @@ class ServerConfig:
                 "exclude_tags": self.exclude_tags or "<not set>",
                 "include_paths": self.include_paths or "<not set>",
                 "exclude_paths": self.exclude_paths or "<not set>"
+            },
+            "HTTP Connection Pool Configuration": {
+                "http_pool_size": self.http_pool_size,
+                "http_pool_idle_timeout": self.http_pool_idle_timeout,
+                "http_connect_timeout": self.http_connect_timeout or "<disabled>",
+                "http_read_timeout": self.http_read_timeout or "<disabled>"
+            },
+            "Dispatch Configuration": {
+                "dispatch_mode": self.dispatch_mode,
+                "dispatch_workers": self.dispatch_workers,
+                "dispatch_max_in_flight": self.dispatch_max_in_flight,
+                "engine": self.engine
+            },
+            "Pagination Configuration": {
+                "pagination_max_pages": self.pagination_max_pages
+            },
+            "Fan-out Configuration": {
+                "fanout_timeout": self.fanout_timeout,
+                "fanout_workers": self.fanout_workers
+            },
+            "Response Cache Configuration": {
+                "cache_ttl": self.cache_ttl,
+                "cache_ttl_rules": self.cache_ttl_rules or "<not set>",
+                "cache_max_bytes": self.cache_max_bytes,
+                "cache_stale_while_revalidate": self.cache_stale_while_revalidate,
+                "single_flight": self.single_flight
+            },
+            "Tool Registry Configuration": {
+                "registry_cache_dir": self.registry_cache_dir or "<disabled>",
+                "lean_registry": self.lean_registry,
+                "tools_list_page_size": self.tools_list_page_size or "<all tools>"
+            },
+            "Response Trimming Configuration": {
+                "auto_select": self.auto_select,
+                "select_profile": self.select_profile_path or "<built-in>",
+                "strip_links": self.strip_links,
+                "response_budget": self.response_budget or "<unlimited>",
+                "response_budget_rules": self.response_budget_rules or "<not set>"
+            },
+            "Resilience Configuration": {
+                "retries": self.retries,
+                "retry_backoff": self.retry_backoff,
+                "retry_backoff_max": self.retry_backoff_max,
+                "circuit_breaker_threshold": self.circuit_breaker_threshold or "<disabled>",
+                "circuit_breaker_cooldown": self.circuit_breaker_cooldown
+            },
+            "Response Parsing Configuration": {
+                "streaming_threshold": self.streaming_threshold or "<disabled>",
+                "max_response_bytes": self.max_response_bytes or "<unlimited>"
+            },
+            "Profiling Configuration": {
+                "profile_dir": self.profile_dir or "<disabled>",
+                "profile_sample_rate": self.profile_sample_rate,
+                "profile_slow_ms": self.profile_slow_ms or "<disabled>",
+                "profile_format": self.profile_format,
+                "profile_interval_ms": self.profile_interval_ms
+            },
+            "Cassette Configuration": {
+                "cassette_mode": self.cassette_mode,
+                "cassette": self.cassette_path or "<not set>",
+                "cassette_time_scale": self.cassette_time_scale
+            },
+            "Metrics Configuration": {
+                "metrics": self.metrics,
+                "metrics_port": self.metrics_port or "<disabled>",
+                "metrics_file": self.metrics_file or "<disabled>",
+                "metrics_file_interval": self.metrics_file_interval
+            },
+            "Polling Configuration": {
+                "poll_paths": self.poll_paths or "<disabled>",
+                "poll_interval": self.poll_interval,
+                "poll_history": self.poll_history,
+                "poll_fields": self.poll_fields
+            },
+            "JSON Encoding Configuration": {
+                "json_codec": self.json_codec,
+                "json_pretty": self.json_pretty,
+                "structured_content": self.structured_content
             }
         }
 
@@ -195,6 +635,23 @@ class ServerConfig:
             logger.info(f"    auth_method: {broker_config.auth_method}")
             logger.info(f"    bearer_token: {'********' if broker_config.bearer_token else '<not set>'}")
 
+    def registry_settings(self) -> Dict[str, Any]:
+        """Return every setting that affects which tools are registered and how they are built."""
+        return {
+            "broker_aliases": self.broker_aliases,
+            "default_broker_alias": self.default_broker_alias,
+            "include_methods": self.include_methods,
+            "exclude_methods": self.exclude_methods,
+            "include_tags": self.include_tags,
+            "exclude_tags": self.exclude_tags,
+            "include_paths": self.include_paths,
+            "exclude_paths": self.exclude_paths,
+            "include_tools": self.include_tools,
+            "exclude_tools": self.exclude_tools,
+            "lean_registry": self.lean_registry,
+            "select_profile": self.select_profile
+        }
+
     @staticmethod
     def _parse_list(value: str) -> List[str]:
         """Parse comma-separated string into list of strings."""
@@ -202,6 +659,48 @@ class ServerConfig:
             return []
         return [item.strip() for item in value.split(',') if item.strip()]
 
+    @classmethod
+    def _parse_ttl_rules(cls, value: str) -> List[tuple]:
+        """Parse 'kind:pattern=seconds' cache TTL rules, where kind is tool, path or tag."""
+        rules = []
+        for item in cls._parse_list(value):
+            selector, sep, seconds = item.rpartition('=')
+            kind, _, pattern = selector.partition(':')
+            if not sep or kind not in CACHE_RULE_PRECEDENCE or not pattern:
+                raise ValueError(f"Invalid MCP_CACHE_TTL_RULES entry '{item}'. Use tool:<name>=<seconds>, "
+                                 f"path:<substring>=<seconds> or tag:<tag>=<seconds>.")
+            rules.append((kind, pattern, float(seconds)))
+        return rules
+
+    @staticmethod
+    def _parse_budget(value: str) -> int:
+        """Parse a response budget in bytes, or in estimated tokens with a 't' suffix (e.g. 50000t)."""
+        value = value.strip().lower()
+        try:
+            budget = int(value[:-1]) * BYTES_PER_TOKEN if value.endswith('t') else int(value)
+        except ValueError:
+            raise ValueError(f"Invalid response budget '{value}'. Use a byte count or a token count such as 50000t.")
+        if budget < 0:
+            raise ValueError(f"Response budget '{value}' must not be negative.")
+        return budget
+
+    @staticmethod
+    def _load_select_profile(path: str) -> Dict[str, Any]:
+        """Load an MCP_SELECT_PROFILE file, or return the built-in profile when no path is set."""
+        if not path:
+            return DEFAULT_SELECT_PROFILE
+        try:
+            with open(path, 'r') as file:
+                profile = json.load(file)
+        except (OSError, ValueError) as e:
+            raise ValueError(f"Failed to load MCP_SELECT_PROFILE '{path}': {e}")
+
+        if not isinstance(profile, dict) or not isinstance(profile.get("default", []), list) or \
+                not all(isinstance(profile.get(key, {}), dict) for key in ("definitions", "tools")):
+            raise ValueError(f"Invalid MCP_SELECT_PROFILE '{path}'. Expected "
+                             f"{{\"default\": [...], \"definitions\": {{...}}, \"tools\": {{...}}}}.")
+        return profile
+
     def validate(self):
         """Validate the configuration and raise errors for critical missing properties."""
         if not self.brokers:
@@ -225,6 +724,78 @@ class ServerConfig:
         if self.default_broker_alias and self.default_broker_alias not in self.brokers:
             raise ValueError(f"Default broker alias '{self.default_broker_alias}' not found in configured brokers.")
 
+        if self.http_pool_size < 1:
+            raise ValueError("MCP_HTTP_POOL_SIZE must be at least 1.")
+        if self.http_connect_timeout < 0 or self.http_read_timeout < 0:
+            raise ValueError("MCP_HTTP_CONNECT_TIMEOUT and MCP_HTTP_READ_TIMEOUT must not be negative.")
+        for alias, broker in self.brokers.items():
+            if broker.rate_limit < 0 or broker.max_concurrency < 0:
+                raise ValueError(f"Rate limit and max concurrency for broker '{alias}' must not be negative.")
+        if self.broker_burst < 0 or self.broker_latency_target < 0:
+            raise ValueError("MCP_BROKER_BURST and MCP_BROKER_LATENCY_TARGET must not be negative.")
+
+        if self.dispatch_mode not in ("sequential", "concurrent"):
+            raise ValueError(f"Invalid MCP_DISPATCH_MODE '{self.dispatch_mode}'. Use 'sequential' or 'concurrent'.")
+        if self.dispatch_workers < 1 or self.dispatch_max_in_flight < 1:
+            raise ValueError("MCP_DISPATCH_WORKERS and MCP_DISPATCH_MAX_IN_FLIGHT must be at least 1.")
+        if self.engine not in ("sync", "async"):
+            raise ValueError(f"Invalid MCP_ENGINE '{self.engine}'. Use 'sync' or 'async'.")
+        if self.pagination_max_pages < 1:
+            raise ValueError("MCP_PAGINATION_MAX_PAGES must be at least 1.")
+        if self.fanout_timeout <= 0 or self.fanout_workers < 1:
+            raise ValueError("MCP_FANOUT_TIMEOUT must be positive and MCP_FANOUT_WORKERS at least 1.")
+        if self.cache_ttl < 0 or self.cache_max_bytes < 1 or self.cache_stale_while_revalidate < 0:
+            raise ValueError("MCP_CACHE_TTL and MCP_CACHE_STALE_WHILE_REVALIDATE must not be negative "
+                             "and MCP_CACHE_MAX_BYTES must be positive.")
+        if self.tools_list_page_size < 0:
+            raise ValueError("MCP_TOOLS_LIST_PAGE_SIZE must not be negative.")
+        if self.retries < 0 or self.retry_backoff < 0 or self.retry_backoff_max < 0:
+            raise ValueError("MCP_RETRIES, MCP_RETRY_BACKOFF and MCP_RETRY_BACKOFF_MAX must not be negative.")
+        if self.circuit_breaker_threshold < 0 or self.circuit_breaker_cooldown <= 0:
+            raise ValueError("MCP_CIRCUIT_BREAKER_THRESHOLD must not be negative "
+                             "and MCP_CIRCUIT_BREAKER_COOLDOWN must be positive.")
+        if self.streaming_threshold < 0 or self.max_response_bytes < 0:
+            raise ValueError("MCP_STREAMING_THRESHOLD and MCP_MAX_RESPONSE_BYTES must not be negative.")
+        if not 0 <= self.profile_sample_rate <= 1:
+            raise ValueError("MCP_PROFILE_SAMPLE_RATE must be between 0 and 1.")
+        if self.profile_slow_ms < 0 or self.profile_interval_ms <= 0:
+            raise ValueError("MCP_PROFILE_SLOW_MS must not be negative and MCP_PROFILE_INTERVAL_MS must be positive.")
+        if self.profile_format not in ("collapsed", "pstats"):
+            raise ValueError(f"Invalid MCP_PROFILE_FORMAT '{self.profile_format}'. Use 'collapsed' or 'pstats'.")
+        if self.profile_dir and not self.profile_sample_rate and not self.profile_slow_ms:
+            logger.warning("MCP_PROFILE_DIR is set but neither MCP_PROFILE_SAMPLE_RATE nor MCP_PROFILE_SLOW_MS is; "
+                           "no calls will be profiled.")
+        if self.profile_dir and self.engine == "async":
+            logger.warning("MCP_PROFILE_DIR is ignored with MCP_ENGINE=async: calls share the event loop thread, "
+                           "so its stacks cannot be attributed to one call. Profile with MCP_ENGINE=sync.")
+        if self.cassette_mode not in ("off", "record", "replay"):
+            raise ValueError(f"Invalid MCP_CASSETTE_MODE '{self.cassette_mode}'. Use 'off', 'record' or 'replay'.")
+        if self.cassette_mode != "off" and not self.cassette_path:
+            raise ValueError(f"MCP_CASSETTE_MODE={self.cassette_mode} requires MCP_CASSETTE to be set.")
+        if self.cassette_mode == "replay" and not os.path.exists(self.cassette_path):
+            raise ValueError(f"Cassette file not found: {self.cassette_path}")
+        if self.cassette_time_scale < 0:
+            raise ValueError("MCP_CASSETTE_TIME_SCALE must not be negative.")
+        if not 0 <= self.metrics_port <= 65535:
+            raise ValueError("MCP_METRICS_PORT must be between 0 and 65535.")
+        if self.metrics_file_interval <= 0:
+            raise ValueError("MCP_METRICS_FILE_INTERVAL must be positive.")
+        for path in self.poll_paths:
+            if not path.startswith("/"):
+                raise ValueError(f"Invalid MCP_POLL_PATHS entry '{path}'. Paths are relative to the SEMP base URL "
+                                 f"and start with '/'.")
+        if self.poll_interval <= 0:
+            raise ValueError("MCP_POLL_INTERVAL must be positive.")
+        if self.poll_history < 2:
+            raise ValueError("MCP_POLL_HISTORY must be at least 2 samples.")
+        if self.json_codec not in ("auto", "orjson", "json"):
+            raise ValueError(f"Invalid MCP_JSON_CODEC '{self.json_codec}'. Use 'auto', 'orjson' or 'json'.")
+        if self.json_codec == "orjson" and orjson is None:
+            raise ValueError("MCP_JSON_CODEC=orjson requires the orjson package to be installed.")
+        if self.structured_content not in ("false", "true", "only"):
+            raise ValueError(f"Invalid MCP_STRUCTURED_CONTENT '{self.structured_content}'. "
+                             f"Use 'false', 'true' or 'only'.")
+
 @dataclass
 class McpMessage:
     """Base class for MCP messages"""
@@ -242,34 +813,2524 @@ class McpResponse(McpMessage):
     """MCP response message"""
     result: Dict[str, Any] = field(default_factory=dict)
 
-@dataclass
-class McpError(McpMessage):
-    """MCP error message"""
-    error: Dict[str, Any] = field(default_factory=dict)
+@dataclass
+class McpError(McpMessage):
+    """MCP error message"""
+    error: Dict[str, Any] = field(default_factory=dict)
+
+@dataclass
+class Tool:
+    """Represents an MCP tool"""
+    name: str
+    description: str
+    input_schema: Optional[Dict[str, Any]]  # None until first needed in the lean registry mode
+    path: str
+    method: str
+    parameters: List[Dict[str, Any]] = field(default_factory=list)
+    request_body: Optional[Dict[str, Any]] = None
+    tags: List[str] = field(default_factory=list)
+    # Default SEMP select projection (MCP_AUTO_SELECT) and the field count of the returned object
+    default_select: Optional[List[str]] = None
+    object_field_count: int = 0
+    # Compiled request layout; derived from the fields above, so it is not persisted
+    plan: Optional["RequestPlan"] = field(default=None, compare=False, repr=False, metadata={"transient": True})
+    # Built-in tools answer from the server itself rather than a broker; they are never persisted
+    handler: Optional[Callable[[Dict[str, Any]], Any]] = field(default=None, compare=False, repr=False,
+                                                               metadata={"transient": True})
+
+class PatternMatcher:
+    """Matches names against plain, glob and 're:'-prefixed regex patterns, compiled once.
+
+    Plain patterns keep their original meaning: substrings for paths, exact names for tools.
+    Glob patterns ('*', '?', '[...]') must match the whole value; regexes may match anywhere.
+    """
+
+    def __init__(self, patterns: List[str], substring: bool):
+        self.patterns = patterns
+        self.exact = set()
+        # User regexes are compiled one by one: joined into one alternation, inline global
+        # flags such as (?i) and numbered backreferences would refer to the wrong pattern
+        self.regexes = []
+        alternatives = []
+        for pattern in patterns:
+            if pattern.startswith("re:"):
+                try:
+                    self.regexes.append(re.compile(pattern[3:]))
+                except re.error as e:
+                    raise ValueError(f"Invalid filter pattern '{pattern}': {e}")
+            elif any(char in pattern for char in "*?["):
+                alternatives.append(f"(?:^{fnmatch.translate(pattern)})")
+            elif substring:
+                alternatives.append(re.escape(pattern))
+            else:
+                self.exact.add(pattern)
+
+        # Globs and substrings are joined into one alternation, a single scan per value
+        self.regex = re.compile("|".join(alternatives)) if alternatives else None
+
+    def __bool__(self) -> bool:
+        return bool(self.patterns)
+
+    def matches(self, value: str) -> bool:
+        if value in self.exact or (self.regex is not None and self.regex.search(value) is not None):
+            return True
+        return any(regex.search(value) is not None for regex in self.regexes)
+
+class ApiFilter:
+    """The MCP_API_* include/exclude rules, compiled into sets and matchers"""
+
+    def __init__(self, config: "ServerConfig"):
+        self.include_methods = frozenset(method.upper() for method in config.include_methods)
+        self.exclude_methods = frozenset(method.upper() for method in config.exclude_methods)
+        self.include_tags = frozenset(config.include_tags)
+        self.exclude_tags = frozenset(config.exclude_tags)
+        self.include_paths = PatternMatcher(config.include_paths, substring=True)
+        self.exclude_paths = PatternMatcher(config.exclude_paths, substring=True)
+        self.include_tools = PatternMatcher(config.include_tools, substring=False)
+        self.exclude_tools = PatternMatcher(config.exclude_tools, substring=False)
+
+    def rejection(self, method: str, tags: List[str], path: str, tool_name: str) -> Optional[str]:
+        """Return why an operation is filtered out, or None when it should be registered"""
+        if self.include_methods and method not in self.include_methods:
+            return "method not in include list"
+        if method in self.exclude_methods:
+            return "method in exclude list"
+
+        if self.include_tools and not self.include_tools.matches(tool_name):
+            return "tool not in include list"
+        if self.exclude_tools and self.exclude_tools.matches(tool_name):
+            return "tool in exclude list"
+
+        if self.include_tags and self.include_tags.isdisjoint(tags):
+            return "no matching tags in include list"
+        if self.exclude_tags and not self.exclude_tags.isdisjoint(tags):
+            return "tag in exclude list"
+
+        if self.include_paths and not self.include_paths.matches(path):
+            return "path not matching any pattern in include list"
+        if self.exclude_paths and self.exclude_paths.matches(path):
+            return "path matching pattern in exclude list"
+
+        return None
+
+class ToolRegistryCache:
+    """On-disk cache of the compiled tool registry.
+
+    Entries are keyed by a hash of the OpenAPI spec file and every setting that affects
+    tool registration, so a changed spec or filter configuration simply misses the cache.
+    """
+
+    # Bump when the Tool layout or registration logic changes
+    FORMAT_VERSION = 3
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+
+    def make_key(self, spec_path: str, settings: Dict[str, Any]) -> Optional[str]:
+        """Hash the spec file contents and registration settings; None if the spec cannot be read"""
+        try:
+            with open(spec_path, 'rb') as file:
+                digest = hashlib.sha256(file.read())
+        except OSError:
+            return None
+        digest.update(json.dumps({"version": self.FORMAT_VERSION, "settings": settings},
+                                 sort_keys=True).encode("utf-8"))
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"tools-{key[:32]}.json")
+
+    def load(self, key: str) -> Optional[Dict[str, Tool]]:
+        """Return the cached tools for a key, or None on a miss or unreadable entry"""
+        try:
+            with open(self._path(key), 'r', encoding="utf-8") as file:
+                payload = json.load(file)
+            if payload.get("key") != key:
+                return None
+
+            shared = payload["shared"]
+            tools = {}
+            for entry in payload["tools"]:
+                entry["parameters"] = [shared[index] for index in entry["parameters"]]
+                schema = entry["input_schema"]
+                if schema is not None:
+                    schema["properties"] = {name: shared[index] for name, index in schema["properties"].items()}
+                tools[entry["name"]] = Tool(**entry)
+            return tools
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable registry cache entry {self._path(key)}: {e}")
+            return None
+
+    def save(self, key: str, tools: Dict[str, Tool]) -> None:
+        """Write the compiled tools atomically; failures only cost the next start its warm path"""
+        # SEMP operations repeat the same parameter definitions (count, cursor, where, select, ...),
+        # so parameters and schema properties are stored once in a shared table and referenced by index
+        shared: List[Any] = []
+        shared_index: Dict[str, int] = {}
+        shared_by_id: Dict[int, int] = {}
+
+        def share(value: Any) -> int:
+            # Resolved $refs are often the same object, which saves re-encoding them
+            if id(value) in shared_by_id:
+                return shared_by_id[id(value)]
+            encoded = json.dumps(value, sort_keys=True)
+            if encoded not in shared_index:
+                shared_index[encoded] = len(shared)
+                shared.append(value)
+            shared_by_id[id(value)] = shared_index[encoded]
+            return shared_index[encoded]
+
+        entries = []
+        for tool in tools.values():
+            entry = {f.name: getattr(tool, f.name) for f in fields(Tool) if not f.metadata.get("transient")}
+            entry["parameters"] = [share(param) for param in tool.parameters]
+            if tool.input_schema is not None:
+                entry["input_schema"] = dict(tool.input_schema, properties={
+                    name: share(value) for name, value in tool.input_schema.get("properties", {}).items()
+                })
+            entries.append(entry)
+
+        path = self._path(key)
+        payload = {"key": key, "shared": shared, "tools": entries}
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding="utf-8") as file:
+                file.write(json.dumps(payload, separators=(",", ":")))
+            os.replace(tmp_path, path)
+            logger.info(f"Saved tool registry cache to {path}")
+        except OSError as e:
+            logger.warning(f"Failed to write registry cache {path}: {e}")
+
+class JsonCodec:
+    """JSON encoding and decoding, using orjson when it is installed and the stdlib otherwise.
+
+    Values orjson cannot encode (for example dicts with non-string keys) fall back to the stdlib.
+    """
+
+    def __init__(self, preference: str = "auto"):
+        self.name = "orjson" if orjson is not None and preference in ("auto", "orjson") else "json"
+
+    def dumps(self, value: Any, pretty: bool = False) -> str:
+        """Encode a value as compact (or indented) JSON text"""
+        if self.name == "orjson":
+            try:
+                return orjson.dumps(value, option=orjson.OPT_INDENT_2 if pretty else 0).decode("utf-8")
+            except TypeError:
+                pass
+        if pretty:
+            return json.dumps(value, indent=2)
+        return json.dumps(value, separators=(",", ":"))
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        """Decode JSON text or bytes; raises a json.JSONDecodeError subclass on invalid input"""
+        if self.name == "orjson":
+            return orjson.loads(data)
+        return json.loads(data)
+
+    def decode_response(self, response: "requests.Response") -> Any:
+        """Decode a requests response body, skipping the text decoding step where possible"""
+        if self.name == "orjson":
+            return orjson.loads(response.content)
+        return response.json()
+
+class StreamingJsonParser:
+    """Incremental parser for SEMP response bodies, fed chunk by chunk as they are received.
+
+    The top-level object is read member by member and the elements of its arrays (data, links,
+    collections) are decoded one at a time, so only the decoded elements and one partial element
+    are held in memory. Object keys are interned across elements, arrays named in `skip` are
+    scanned but never kept, and once `max_bytes` of body have been read the parser stops asking
+    for input and returns the elements completed so far. With a `data_budget`, each data element
+    is measured with `dumps` as it is decoded and reading stops at the first one that no longer
+    fits, so a response budget also bounds how much of a page is read. Bodies that are not JSON
+    objects are buffered and decoded whole.
+    """
+
+    _WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+    def __init__(self, max_bytes: int = 0, skip: tuple = (), data_budget: Optional[int] = None,
+                 dumps: Optional[Callable[[Any], Any]] = None):
+        self.max_bytes = max_bytes
+        self.skip = skip
+        self.data_budget = data_budget
+        self.dumps = dumps
+        self.data_bytes = 0
+        self.bytes_read = 0
+        self.skipped_bytes = 0
+        self.truncated = False
+        self.budget_spent = False
+        self.result: Dict[str, Any] = {}
+        self._scan = json.scanner.make_scanner(json.JSONDecoder())
+        self._text = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._pos = 0
+        self._retry_at = 0
+        self._state = "start"
+        self._key: Optional[str] = None
+        self._array: Optional[list] = None
+        self._keys: Dict[str, str] = {}
+
+    def feed(self, chunk: bytes) -> bool:
+        """Parse a chunk of the body; returns False once no further input is wanted"""
+        if self.truncated:
+            return False
+        if self.max_bytes and self.bytes_read + len(chunk) > self.max_bytes:
+            chunk = chunk[:self.max_bytes - self.bytes_read]
+            self.truncated = True
+        self.bytes_read += len(chunk)
+        self._buffer += self._text.decode(chunk)
+        # A value split across chunks is retried only once the pending text has doubled,
+        # which keeps the cost of repeated attempts linear in the size of the value
+        if len(self._buffer) - self._pos >= self._retry_at:
+            self._parse(final=False)
+        if self._pos > 65536:
+            self._buffer = self._buffer[self._pos:]
+            self._pos = 0
+        return not self.truncated
+
+    def close(self) -> Any:
+        """Finish parsing and return the decoded body"""
+        self._buffer += self._text.decode(b"", final=not self.truncated)
+        self._parse(final=True)
+        if self._state == "raw":
+            return json.loads(self._buffer)
+        if self._state != "done" and not self.truncated:
+            raise json.JSONDecodeError("Incomplete JSON response", self._buffer, self._pos)
+        return self.result
+
+    @property
+    def text(self) -> Optional[str]:
+        """The body as text if it is not a JSON object (such as an empty 204 body), otherwise None"""
+        return self._buffer if self._state in ("start", "raw") else None
+
+    def _decode_value(self, final: bool) -> tuple:
+        """Decode the value at the current position; returns (value, end) or None if it is incomplete"""
+        try:
+            value, end = self._scan(self._buffer, self._pos)
+        except (StopIteration, json.JSONDecodeError):
+            if final and not self.truncated:
+                raise json.JSONDecodeError("Invalid JSON response", self._buffer, self._pos)
+            return None
+        # A number at the end of the buffer may continue in the next chunk
+        if end == len(self._buffer) and not final:
+            return None
+        return value, end
+
+    def _parse(self, final: bool) -> None:
+        buffer = self._buffer
+        while True:
+            self._pos = self._WHITESPACE.match(buffer, self._pos).end()
+            if self._pos >= len(buffer):
+                self._retry_at = 0
+                return
+            char = buffer[self._pos]
+
+            if self._state == "start":
+                if char != '{':
+                    self._state = "raw"
+                    return
+                self._pos += 1
+                self._state = "key"
+            elif self._state == "key":
+                if char == '}':
+                    self._pos += 1
+                    self._state = "done"
+                    return
+                if char == ',':
+                    self._pos += 1
+                    continue
+                decoded = self._decode_value(final)
+                if decoded is None:
+                    break
+                key, self._pos = decoded
+                self._key = self._keys.setdefault(key, key)
+                self._state = "colon"
+            elif self._state == "colon":
+                if char != ':':
+                    raise json.JSONDecodeError("Expecting ':' delimiter", buffer, self._pos)
+                self._pos += 1
+                self._state = "value"
+            elif self._state == "value":
+                if char == '[':
+                    self._pos += 1
+                    self._array = [] if self._key not in self.skip else None
+                    if self._array is not None:
+                        self.result[self._key] = self._array
+                    self._state = "array"
+                    continue
+                decoded = self._decode_value(final)
+                if decoded is None:
+                    break
+                self.result[self._key], self._pos = decoded
+                self._state = "key"
+            elif self._state == "array":
+                if char == ']':
+                    self._pos += 1
+                    self._state = "key"
+                    continue
+                if not self._parse_elements(final):
+                    break
+            else:
+                return
+        self._retry_at = 2 * (len(buffer) - self._pos)
+
+    def _parse_elements(self, final: bool) -> bool:
+        """Decode array elements up to the closing bracket; returns False if an element is incomplete"""
+        buffer, pos, array, keys = self._buffer, self._pos, self._array, self._keys
+        scan, whitespace, length = self._scan, self._WHITESPACE.match, len(buffer)
+        budget = self.data_budget if self._key == 'data' and array is not None else None
+        try:
+            while True:
+                if buffer[pos] == ',':
+                    pos += 1
+                    if buffer[pos] in ' \t\n\r':
+                        pos = whitespace(buffer, pos).end()
+                try:
+                    item, end = scan(buffer, pos)
+                except (StopIteration, json.JSONDecodeError):
+                    if final and not self.truncated:
+                        raise json.JSONDecodeError("Invalid JSON response", buffer, pos)
+                    return False
+                if end == length and not final:
+                    return False
+                if budget is not None:
+                    # Measured as ResponseBudget.fit() measures a row, so the rows kept here still fit there
+                    size = len(self.dumps(item)) + 1
+                    if self.data_bytes + size > budget:
+                        self.truncated = self.budget_spent = True
+                        self._state = "stopped"
+                        return False
+                    self.data_bytes += size
+                if array is None:
+                    self.skipped_bytes += end - pos
+                elif type(item) is dict:
+                    array.append({keys.setdefault(key, key): value for key, value in item.items()})
+                else:
+                    array.append(item)
+                pos = end
+                if buffer[pos] in ' \t\n\r':
+                    pos = whitespace(buffer, pos).end()
+                if buffer[pos] == ']':
+                    return True
+                if buffer[pos] != ',':
+                    raise json.JSONDecodeError("Expecting ',' delimiter", buffer, pos)
+        except IndexError:
+            # The buffer ends between elements
+            return False
+        finally:
+            self._pos = pos
+
+@dataclass
+class PreparedRequest:
+    """An HTTP request built from a tool call, independent of the engine that sends it"""
+    broker_config: BrokerConfig
+    method: str
+    url: str
+    params: Dict[str, Any] = field(default_factory=dict)
+    body: Optional[Any] = None
+    tool: Optional[Tool] = None
+    # True when the tool's default select projection was added to params
+    projected: bool = False
+    # Keep SEMP links despite MCP_STRIP_LINKS; the poller names collection items by them
+    keep_links: bool = False
+
+# Separators for swagger 2.0 array collection formats; "multi" repeats the parameter instead
+COLLECTION_SEPARATORS = {"csv": ",", "ssv": " ", "tsv": "\t", "pipes": "|"}
+
+# Path values made only of URL-unreserved characters (most SEMP names) need no quoting
+_is_unreserved = re.compile(r'[A-Za-z0-9_.~-]*\Z').match
+
+@dataclass
+class RequestPlan:
+    """A tool's request layout, compiled once so that each call does constant work per argument"""
+    # Path template as a positional format string ("/msgVpns/{0}/queues") and the matching parameter names
+    path_format: str
+    path_names: List[str]
+    # Query parameter name -> separator used to join list values (None sends lists as repeated parameters)
+    query_params: Dict[str, Optional[str]]
+    has_body: bool = False
+
+    @classmethod
+    def compile(cls, tool: Tool) -> "RequestPlan":
+        query_params = {}
+        for param in tool.parameters:
+            if param.get('in') != 'query':
+                continue
+            separator = None
+            if param.get('type') == 'array':
+                separator = COLLECTION_SEPARATORS.get(param.get('collectionFormat', 'csv'))
+            query_params[param.get('name')] = separator
+
+        parts = re.split(r'\{([^}]+)\}', tool.path)
+        literals = [part.replace('{', '{{').replace('}', '}}') for part in parts[0::2]]
+        path_format = literals[0] + "".join(f"{{{index}}}{literal}" for index, literal in enumerate(literals[1:]))
+
+        return cls(
+            path_format=path_format,
+            path_names=parts[1::2],
+            query_params=query_params,
+            has_body=tool.request_body is not None
+        )
+
+    def build_url(self, base_url: str, arguments: Dict[str, Any]) -> str:
+        """Substitute URL-encoded path parameters; SEMP object names may contain '/' or '#'"""
+        values = []
+        for name in self.path_names:
+            if name not in arguments:
+                raise ValueError(f"Missing required path parameter '{name}'")
+            value = str(arguments[name])
+            values.append(value if _is_unreserved(value) else urllib.parse.quote(value, safe=""))
+        return base_url + self.path_format.format(*values)
+
+    def build_query_params(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """Pick the query parameters out of the arguments, joining list values where required"""
+        query_params = {}
+        for name, value in arguments.items():
+            if name not in self.query_params:
+                continue
+            separator = self.query_params[name]
+            if separator is not None and isinstance(value, (list, tuple)):
+                value = separator.join(str(item) for item in value)
+            query_params[name] = value
+        return query_params
+
+@dataclass
+class PaginationOptions:
+    """Limits for server-side SEMP cursor pagination"""
+    max_pages: int
+    max_items: Optional[int] = None
+
+class ResponseBudget:
+    """Byte budget for one tool result, filled row by row as collection pages arrive.
+
+    Rows are measured as they are added, so rows past the budget are never serialized
+    and no further pages are requested once the budget is spent.
+    """
+
+    def __init__(self, max_bytes: int, codec: "JsonCodec"):
+        self.max_bytes = max_bytes
+        self.codec = codec
+        self.used = 0
+
+    @property
+    def remaining(self) -> int:
+        """Bytes still available; the streaming parser stops reading a page's rows past them"""
+        return max(0, self.max_bytes - self.used)
+
+    def fit(self, page: Dict[str, Any], limit: int) -> int:
+        """Return how many of the first `limit` rows (data plus matching links/collections) still fit"""
+        columns = [page[name] for name in ('data', 'links', 'collections') if isinstance(page.get(name), list)]
+        for index in range(limit):
+            size = sum(len(self.codec.dumps(column[index])) + 1 for column in columns if index < len(column))
+            if self.used + size > self.max_bytes:
+                return index
+            self.used += size
+        return limit
+
+class PageAggregator:
+    """Merges SEMP collection pages into one result while holding at most max_items objects.
+
+    Each page is folded in as soon as it arrives and then dropped, so memory is bounded by
+    the item limit rather than by the number of pages fetched.
+    """
+
+    def __init__(self, options: PaginationOptions, budget: Optional[ResponseBudget] = None):
+        self.options = options
+        self.budget = budget
+        self.truncation: Optional[Dict[str, Any]] = None
+        self.cursor: Optional[str] = None
+        self.pages = 0
+        self.data: List[Any] = []
+        self.links: List[Any] = []
+        self.collections: List[Any] = []
+        self.meta: Dict[str, Any] = {}
+        self.stop_reason = "complete"
+
+    @staticmethod
+    def _cursor(meta: Dict[str, Any]) -> Optional[str]:
+        """Extract the next-page cursor from SEMP paging metadata"""
+        paging = meta.get('paging') or {}
+        cursor = paging.get('cursorQuery')
+        if not cursor and paging.get('nextPageUri'):
+            query = urllib.parse.urlsplit(paging['nextPageUri']).query
+            cursor = urllib.parse.parse_qs(query).get('cursor', [None])[0]
+        return cursor
+
+    def add_page(self, page: Dict[str, Any]) -> Optional[str]:
+        """Fold one page into the result and return the cursor to fetch next, or None to stop"""
+        self.pages += 1
+        self.meta = page.get('meta', {}) if isinstance(page, dict) else {}
+        data = page.get('data') if isinstance(page, dict) else None
+        if not isinstance(data, list):
+            # Not a collection response; return it unchanged
+            self.data = data
+            self.stop_reason = "not_a_collection"
+            return None
+
+        remaining = None
+        if self.options.max_items is not None:
+            remaining = self.options.max_items - len(self.data)
+        limit = len(data) if remaining is None else min(remaining, len(data))
+        fitting = self.budget.fit(page, limit) if self.budget is not None else limit
+        for name in ('data', 'links', 'collections'):
+            values = page.get(name)
+            if isinstance(values, list):
+                getattr(self, name).extend(values[:fitting])
+
+        page_cursor, cursor = self.cursor, self._cursor(self.meta)
+        self.cursor = cursor
+        # The streaming parser stops at the first row past the budget, leaving the rest of the page unread
+        unread = self.meta.get('truncation', {}).get('reason') == "budget"
+        if fitting < limit or unread:
+            self._truncate(None if unread else len(data) - fitting,
+                           page_cursor if fitting == 0 and self.pages > 1 else None)
+            return None
+        if 'truncation' in self.meta:
+            # The page body was cut while it was read (MCP_MAX_RESPONSE_BYTES), so there is nothing to follow
+            self.truncation = dict(self.meta['truncation'], returnedItems=len(self.data))
+            self.stop_reason = self.truncation['reason']
+            return None
+        if remaining is not None and len(data) > remaining:
+            self._truncate_at_max_items(len(data) - remaining)
+            return None
+        if not cursor:
+            return None
+        if remaining is not None and len(data) == remaining:
+            self.stop_reason = "max_items"
+            return None
+        if self.pages >= self.options.max_pages:
+            self.stop_reason = "max_pages"
+            return None
+        return cursor
+
+    def _truncate_at_max_items(self, omitted: int) -> None:
+        """Record that max_items cut the current page; its cursor would skip the omitted rows, so it is dropped"""
+        self.stop_reason = "max_items"
+        self.meta = {key: value for key, value in self.meta.items() if key != 'paging'}
+        self.truncation = {
+            "reason": "max_items",
+            "returnedItems": len(self.data),
+            "omittedItems": omitted
+        }
+        if isinstance(self.meta.get('count'), int):
+            self.truncation["totalItems"] = self.meta['count']
+
+    def _truncate(self, omitted: Optional[int], cursor: Optional[str]) -> None:
+        """Record that the response budget cut the current page after the rows already kept.
+
+        `omitted` is None when the rest of the page was not read, so its size is unknown.
+        """
+        self.stop_reason = "budget"
+        self.truncation = {
+            "reason": "budget",
+            "budgetBytes": self.budget.max_bytes,
+            "returnedItems": len(self.data)
+        }
+        if omitted is not None:
+            self.truncation["omittedItems"] = omitted
+        if isinstance(self.meta.get('count'), int):
+            self.truncation["totalItems"] = self.meta['count']
+        if cursor:
+            # Nothing from this page was kept, so fetching it again with its cursor continues the listing
+            self.truncation["cursor"] = cursor
+        else:
+            self.truncation["hint"] = (f"The result exceeded the response budget. Request smaller pages "
+                                       f"(e.g. count={max(1, len(self.data))}), fewer fields with select, "
+                                       f"or narrow the result with where.")
+
+    def result(self, paginated: bool = True) -> Dict[str, Any]:
+        """Return the aggregated SEMP-shaped response"""
+        meta = dict(self.meta)
+        if paginated:
+            meta['pagination'] = {
+                "pages": self.pages,
+                "items": len(self.data) if isinstance(self.data, list) else None,
+                "complete": self.stop_reason in ("complete", "not_a_collection"),
+                "stopReason": self.stop_reason
+            }
+        if self.stop_reason in ("complete", "not_a_collection", "budget", "max_response_bytes"):
+            # The paging block describes the next page, which has already been consumed,
+            # or, after a cut, one that would skip the omitted rows
+            meta.pop('paging', None)
+        if self.truncation:
+            meta['truncation'] = self.truncation
+
+        result = {"data": self.data}
+        if self.links:
+            result["links"] = self.links
+        if self.collections:
+            result["collections"] = self.collections
+        result["meta"] = meta
+        return result
+
+@dataclass
+class CacheEntry:
+    """A cached SEMP response"""
+    value: Any
+    size: int
+    expires_at: float
+    stale_until: float
+
+class ResponseCache:
+    """TTL + LRU cache for SEMP GET responses, bounded by the encoded size of the cached values.
+
+    Cached values are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, max_bytes: int, stale_while_revalidate: float = 0.0):
+        self.max_bytes = max_bytes
+        self.stale_while_revalidate = stale_while_revalidate
+        self._entries: "OrderedDict[tuple, CacheEntry]" = OrderedDict()
+        self._refreshing = set()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.refreshes = 0
+
+    @staticmethod
+    def make_key(broker_alias: str, method: str, url: str, params: Optional[Dict[str, Any]],
+                 body: Any = None) -> tuple:
+        """Build a hashable key from the resolved request"""
+        frozen = tuple(sorted(
+            (name, tuple(value) if isinstance(value, list) else value)
+            for name, value in (params or {}).items()
+        ))
+        if body is None:
+            return broker_alias, method, url, frozen
+        return broker_alias, method, url, frozen, json.dumps(body, sort_keys=True)
+
+    def lookup(self, key: tuple) -> tuple:
+        """Return (hit, value, needs_refresh); stale entries are served while a refresh is pending"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if now < entry.expires_at:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, entry.value, False
+                if now < entry.stale_until:
+                    self._entries.move_to_end(key)
+                    self.stale_hits += 1
+                    return True, entry.value, True
+                self._remove(key)
+            self.misses += 1
+            return False, None, False
+
+    def store(self, key: tuple, value: Any, ttl: float) -> None:
+        """Cache a value, evicting least recently used entries to stay within the byte budget"""
+        size = len(json.dumps(value, separators=(',', ':')))
+        if size > self.max_bytes:
+            return
+
+        now = time.monotonic()
+        entry = CacheEntry(value=value, size=size, expires_at=now + ttl,
+                           stale_until=now + ttl + self.stale_while_revalidate)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def begin_refresh(self, key: tuple) -> bool:
+        """Claim the background refresh of a stale entry; False if one is already running"""
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            self.refreshes += 1
+            return True
+
+    def end_refresh(self, key: tuple) -> None:
+        with self._lock:
+            self._refreshing.discard(key)
+
+    def _remove(self, key: tuple) -> None:
+        """Drop an entry (lock must be held)"""
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "hit_ratio": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "background_refreshes": self.refreshes
+            }
+
+class InFlightCall:
+    """A request in progress whose outcome is shared with every caller waiting on it"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+class SingleFlight:
+    """Coalesces identical concurrent requests so that only one reaches the broker.
+
+    The first caller for a key performs the request; callers arriving while it is in flight
+    wait for and share its result (or exception). Nothing is remembered once the call completes.
+    """
+
+    def __init__(self):
+        self._calls: Dict[tuple, InFlightCall] = {}
+        self._async_calls: Dict[tuple, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+
+    def do(self, key: tuple, fn: Callable[[], Any]) -> Any:
+        """Run fn for the first caller of key and share its outcome with concurrent callers"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = InFlightCall()
+                self._calls[key] = call
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = fn()
+            return call.value
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def do_async(self, key: tuple, fn: Callable[[], Any]) -> Any:
+        """asyncio variant of do(); fn is a coroutine function"""
+        future = self._async_calls.get(key)
+        if future is not None:
+            self.coalesced += 1
+            # Shield the shared future so one cancelled waiter does not cancel the others
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._async_calls[key] = future
+        self.leaders += 1
+        try:
+            value = await fn()
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved in case nobody else was waiting
+            future.exception()
+            raise
+        finally:
+            del self._async_calls[key]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "in_flight": len(self._calls) + len(self._async_calls),
+                "requests_sent": self.leaders,
+                "requests_coalesced": self.coalesced
+            }
+
+class LimiterWaiter:
+    """A request waiting in a BrokerLimiter line, woken from any thread"""
+
+    def __init__(self):
+        self.event = threading.Event()
+
+    def wake(self) -> None:
+        self.event.set()
+
+    def wait(self, timeout: Optional[float]) -> None:
+        self.event.wait(timeout)
+        self.event.clear()
+
+class AsyncLimiterWaiter(LimiterWaiter):
+    """A waiting asyncio request; wake() may be called from another thread"""
+
+    def __init__(self):
+        self.loop = asyncio.get_running_loop()
+        self.event = asyncio.Event()
+
+    def wake(self) -> None:
+        self.loop.call_soon_threadsafe(self.event.set)
+
+    async def wait(self, timeout: Optional[float]) -> None:
+        try:
+            await asyncio.wait_for(self.event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self.event.clear()
+
+class BrokerLimiter:
+    """Admission control for one broker: a token bucket on the request rate plus an AIMD concurrency limit.
+
+    Requests are admitted in arrival order. The concurrency limit starts at its maximum, is halved
+    when the broker answers 429/503 or a request takes longer than the latency target (at most once
+    per request duration), and grows back by one for each limit's worth of successful requests.
+    """
+
+    def __init__(self, alias: str, rate: float, burst: int, max_concurrency: int, latency_target: float):
+        self.alias = alias
+        self.rate = rate
+        self.burst = burst or max(1, math.ceil(rate))
+        self.tokens = float(self.burst)
+        self.max_concurrency = max_concurrency
+        self.limit = float(max_concurrency) if max_concurrency else math.inf
+        self.latency_target = latency_target
+        self.in_flight = 0
+        self._refilled = time.monotonic()
+        self._decreased = 0.0
+        self._line: deque = deque()
+        self._lock = threading.Lock()
+        self.admitted = 0
+        self.delayed = 0
+        self.wait_seconds = 0.0
+        self.decreases = 0
+
+    def _admit(self, now: float) -> float:
+        """Take a slot and a token; returns 0 on success, else the seconds to wait (inf until a slot frees)"""
+        if self.max_concurrency and self.in_flight >= max(1, int(self.limit)):
+            return math.inf
+        if self.rate:
+            self.tokens = min(self.burst, self.tokens + (now - self._refilled) * self.rate)
+            self._refilled = now
+            if self.tokens < 1:
+                return (1 - self.tokens) / self.rate
+            self.tokens -= 1
+        self.in_flight += 1
+        self.admitted += 1
+        return 0.0
+
+    def _poll(self, waiter: LimiterWaiter) -> Optional[float]:
+        """Admit the waiter if it is first in line; returns None once admitted, else the time to wait"""
+        with self._lock:
+            if self._line[0] is not waiter:
+                return math.inf
+            delay = self._admit(time.monotonic())
+            if delay:
+                return delay
+            self._line.popleft()
+            if self._line:
+                # The next request may fit as well
+                self._line[0].wake()
+            return None
+
+    def _leave(self, waiter: LimiterWaiter) -> None:
+        """Remove a waiter that gave up, letting the next one move up"""
+        with self._lock:
+            first = self._line[0] is waiter
+            self._line.remove(waiter)
+            if first and self._line:
+                self._line[0].wake()
+
+    def _try_enter(self, waiter_factory: Callable[[], LimiterWaiter]) -> Optional[LimiterWaiter]:
+        """Admit immediately if nobody is waiting; otherwise join the line and return the waiter"""
+        with self._lock:
+            if not self._line and self._admit(time.monotonic()) == 0:
+                return None
+            waiter = waiter_factory()
+            self._line.append(waiter)
+            self.delayed += 1
+            return waiter
+
+    def acquire(self) -> None:
+        """Block until a request to the broker may be sent"""
+        waiter = self._try_enter(LimiterWaiter)
+        if waiter is None:
+            return
+        start = time.monotonic()
+        delay = math.inf
+        try:
+            delay = self._poll(waiter)
+            while delay is not None:
+                waiter.wait(None if delay == math.inf else delay)
+                delay = self._poll(waiter)
+        finally:
+            if delay is not None:
+                self._leave(waiter)
+            self._waited(time.monotonic() - start)
+
+    async def acquire_async(self) -> None:
+        """asyncio variant of acquire()"""
+        waiter = self._try_enter(AsyncLimiterWaiter)
+        if waiter is None:
+            return
+        start = time.monotonic()
+        delay = math.inf
+        try:
+            delay = self._poll(waiter)
+            while delay is not None:
+                await waiter.wait(None if delay == math.inf else delay)
+                delay = self._poll(waiter)
+        finally:
+            if delay is not None:
+                self._leave(waiter)
+            self._waited(time.monotonic() - start)
+
+    def _waited(self, seconds: float) -> None:
+        with self._lock:
+            self.wait_seconds += seconds
+
+    def release(self, latency: float, status: Optional[int]) -> None:
+        """Return the request's slot and adapt the concurrency limit to how the broker coped"""
+        with self._lock:
+            self.in_flight -= 1
+            if self.max_concurrency:
+                now = time.monotonic()
+                overloaded = status in (429, 503) or (self.latency_target and latency > self.latency_target)
+                if overloaded and now - self._decreased >= latency:
+                    self.limit = max(1.0, self.limit / 2)
+                    self._decreased = now
+                    self.decreases += 1
+                    logger.warning(f"Broker '{self.alias}' is overloaded (status {status}, {latency:.2f}s); "
+                                   f"concurrency limit lowered to {int(self.limit)}")
+                elif not overloaded:
+                    self.limit = min(float(self.max_concurrency), self.limit + 1 / self.limit)
+            if self._line:
+                self._line[0].wake()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "rate_limit": self.rate or None,
+                "tokens": round(self.tokens, 2) if self.rate else None,
+                "concurrency_limit": int(self.limit) if self.max_concurrency else None,
+                "max_concurrency": self.max_concurrency or None,
+                "in_flight": self.in_flight,
+                "queue_depth": len(self._line),
+                "admitted": self.admitted,
+                "delayed": self.delayed,
+                "wait_seconds_total": round(self.wait_seconds, 3),
+                "limit_decreases": self.decreases
+            }
+
+class BrokerUnavailableError(RuntimeError):
+    """Raised without contacting a broker while its circuit breaker is open"""
+
+class CircuitBreaker:
+    """Per-broker circuit breaker.
+
+    The circuit opens after `threshold` consecutive broker failures (connection errors, timeouts
+    and 5xx responses) and requests then fail fast. After `cooldown` seconds it is half-open: one
+    probe request is let through, and its outcome closes the circuit or opens it again.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, alias: str, threshold: int, cooldown: float):
+        self.alias = alias
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probe_started: Optional[float] = None
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.rejected = 0
+
+    def before_request(self) -> None:
+        """Let a request through, or raise BrokerUnavailableError while the circuit is open"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            now = time.monotonic()
+            if self.state == self.OPEN and now - self._opened_at >= self.cooldown:
+                self.state = self.HALF_OPEN
+                self._probe_started = None
+            if self.state == self.HALF_OPEN:
+                # A probe that never reported back (e.g. a cancelled task) is replaced after the cooldown
+                if self._probe_started is None or now - self._probe_started >= self.cooldown:
+                    self._probe_started = now
+                    logger.info(f"Circuit breaker for broker '{self.alias}' is half-open; sending a probe request")
+                    return
+                self.rejected += 1
+                raise BrokerUnavailableError(f"Broker '{self.alias}' is unavailable: circuit breaker is half-open "
+                                             f"and a probe request is in progress")
+            self.rejected += 1
+            raise BrokerUnavailableError(
+                f"Broker '{self.alias}' is unavailable: circuit breaker is open after {self.failures} "
+                f"consecutive failures; next probe in {self.cooldown - (now - self._opened_at):.0f}s")
+
+    def record(self, failure: bool) -> None:
+        """Record the outcome of a request that reached the broker"""
+        with self._lock:
+            if not failure:
+                if self.state != self.CLOSED:
+                    logger.info(f"Circuit breaker for broker '{self.alias}' closed")
+                self.state = self.CLOSED
+                self.failures = 0
+                return
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.threshold:
+                if self.state != self.OPEN:
+                    self.opened += 1
+                    logger.warning(f"Circuit breaker for broker '{self.alias}' opened after "
+                                   f"{self.failures} consecutive failures")
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.failures,
+                "times_opened": self.opened,
+                "requests_rejected": self.rejected
+            }
+
+class MetricsRegistry:
+    """In-process counters and latency histograms, rendered in the Prometheus text format.
+
+    Series are keyed by metric name and a tuple of (label, value) pairs. Recording a sample
+    takes one lock and, for histograms, a bisect over the bucket bounds.
+    """
+
+    HELP = {
+        "mcp_messages_total": "MCP messages handled, by method",
+        "mcp_message_duration_seconds": "Time to answer an MCP message, by method",
+        "mcp_message_bytes_total": "Bytes of MCP messages received (in) and sent (out)",
+        "mcp_errors_total": "JSON-RPC error responses, by error code",
+        "mcp_tool_calls_total": "Tool calls, by tool, broker and outcome",
+        "mcp_tool_call_duration_seconds": "Tool call latency, by tool and broker",
+        "mcp_json_duration_seconds": "JSON encoding and decoding time, by operation",
+        "semp_requests_total": "HTTP requests sent to SEMP, by broker and response status",
+        "semp_request_duration_seconds": "SEMP HTTP request latency, by broker",
+        "semp_response_bytes_total": "Bytes of SEMP response bodies read, by broker"
+    }
+
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.started = time.time()
+        self._counters: Dict[str, Dict[tuple, float]] = {}
+        # Per series: one count per bucket, then the +Inf bucket, then the sum of observations
+        self._histograms: Dict[str, Dict[tuple, List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, labels: tuple = (), value: float = 1) -> None:
+        """Add a value to a counter"""
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[labels] = series.get(labels, 0) + value
+
+    def observe(self, name: str, labels: tuple, seconds: float) -> None:
+        """Record one latency sample in a histogram"""
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            state = series.get(labels)
+            if state is None:
+                state = series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            state[index] += 1
+            state[-1] += seconds
+
+    def _copy(self) -> tuple:
+        with self._lock:
+            counters = {name: dict(series) for name, series in self._counters.items()}
+            histograms = {name: {labels: list(state) for labels, state in series.items()}
+                          for name, series in self._histograms.items()}
+        return counters, histograms
+
+    def _quantile(self, state: List[float], q: float) -> Optional[float]:
+        """Estimate a quantile as the upper bound of the bucket that contains it"""
+        count = sum(state[:-1])
+        if not count:
+            return None
+        rank, seen = q * count, 0
+        for bound, bucket_count in zip(self.buckets, state):
+            seen += bucket_count
+            if seen >= rank:
+                return bound
+        return math.inf
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return every series as plain data, with estimated p50/p95/p99 latencies per histogram"""
+        counters, histograms = self._copy()
+        result: Dict[str, Any] = {"uptime_seconds": round(time.time() - self.started, 3),
+                                  "counters": {}, "histograms": {}}
+        for name, series in sorted(counters.items()):
+            result["counters"][name] = [{"labels": dict(labels), "value": value}
+                                        for labels, value in sorted(series.items())]
+        for name, series in sorted(histograms.items()):
+            entries = []
+            for labels, state in sorted(series.items()):
+                count = int(sum(state[:-1]))
+                quantiles = {f"p{int(q * 100)}": self._quantile(state, q) for q in (0.5, 0.95, 0.99)}
+                entries.append(dict({"labels": dict(labels), "count": count, "sum": round(state[-1], 6),
+                                     "mean": round(state[-1] / count, 6) if count else None},
+                                    **{key: None if value == math.inf else value for key, value in quantiles.items()}))
+            result["histograms"][name] = entries
+        return result
+
+    @staticmethod
+    def _labels(labels: tuple) -> str:
+        if not labels:
+            return ""
+        escaped = (str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, value in labels)
+        return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + "}"
+
+    @staticmethod
+    def _number(value: float) -> str:
+        return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+    def render(self, gauges: Optional[Dict[str, Dict[tuple, float]]] = None) -> str:
+        """Render every series, plus point-in-time gauges, in the Prometheus text exposition format"""
+        counters, histograms = self._copy()
+        lines = []
+        for name, series in sorted(counters.items()):
+            lines.append(f"# HELP {name} {self.HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} counter")
+            lines.extend(f"{name}{self._labels(labels)} {self._number(value)}"
+                         for labels, value in sorted(series.items()))
+        for name, series in sorted(histograms.items()):
+            lines.append(f"# HELP {name} {self.HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} histogram")
+            for labels, state in sorted(series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (math.inf,), state):
+                    cumulative += count
+                    le = "+Inf" if bound == math.inf else repr(bound)
+                    lines.append(f"{name}_bucket{self._labels(labels + (('le', le),))} {int(cumulative)}")
+                lines.append(f"{name}_sum{self._labels(labels)} {self._number(round(state[-1], 6))}")
+                lines.append(f"{name}_count{self._labels(labels)} {int(cumulative)}")
+        for name, series in sorted((gauges or {}).items()):
+            lines.append(f"# TYPE {name} gauge")
+            lines.extend(f"{name}{self._labels(labels)} {self._number(value)}"
+                         for labels, value in sorted(series.items()))
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def stats_gauges(stats: Dict[str, Any], prefix: str = "mcp") -> Dict[str, Dict[tuple, float]]:
+        """Flatten a get_stats() dict into gauges named <prefix>_<section>_<key>.
+
+        Per-broker sub-dicts become a broker label, strings (such as a circuit state) become a
+        value label on a gauge of 1, and unset (None) values are left out.
+        """
+        gauges: Dict[str, Dict[tuple, float]] = {}
+
+        def walk(name: str, labels: tuple, value: Any, keyed_by_broker: bool) -> None:
+            if isinstance(value, dict):
+                for key, item in value.items():
+                    if keyed_by_broker:
+                        walk(name, labels + (("broker", str(key)),), item, False)
+                    else:
+                        walk(f"{name}_{re.sub(r'[^a-zA-Z0-9_]', '_', str(key))}", labels, item,
+                             key in BROKER_KEYED_STATS)
+            elif isinstance(value, (bool, int, float)):
+                gauges.setdefault(name, {})[labels] = int(value) if isinstance(value, bool) else value
+            elif isinstance(value, str):
+                gauges.setdefault(name, {})[labels + (("value", value),)] = 1
+
+        walk(prefix, (), stats, False)
+        return gauges
+
+@dataclass
+class ProfiledCall:
+    """One tool call being profiled"""
+    tool_name: str
+    broker_alias: str
+    thread_id: int
+    started: float
+    sampled: bool
+    profile: Any = None  # cProfile.Profile in the pstats format
+    stacks: Counter = field(default_factory=Counter)  # collapsed stack -> samples
+
+class StackSampler:
+    """Samples the Python stacks of the threads running profiled calls from one background thread.
+
+    Samples are wall-clock: a thread blocked on a socket is sampled inside the socket read,
+    so network waits show up next to JSON decoding and logging. The thread sleeps while no
+    call is being profiled.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._calls: Dict[int, ProfiledCall] = {}
+        self._labels: Dict[Any, str] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, call: ProfiledCall) -> None:
+        with self._lock:
+            self._calls[id(call)] = call
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="mcp-profiler", daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+
+    def remove(self, call: ProfiledCall) -> None:
+        with self._lock:
+            self._calls.pop(id(call), None)
+
+    def _collapse(self, frame) -> str:
+        """Render a stack, outermost frame first, as 'function (file:line);...'"""
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            label = self._labels.get(code)
+            if label is None:
+                label = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+                self._labels[code] = label
+            names.append(label)
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                if not self._calls:
+                    self._wakeup.clear()
+            self._wakeup.wait()
+            with self._lock:
+                if self._calls:
+                    frames = sys._current_frames()
+                    for call in self._calls.values():
+                        frame = frames.get(call.thread_id)
+                        if frame is not None:
+                            call.stacks[self._collapse(frame)] += 1
+            time.sleep(self.interval)
+
+class CallProfiler:
+    """Profiles a sampled fraction of tool calls, and every call slower than a threshold.
+
+    With a slow-call threshold every call is profiled and only slow (or sampled) ones are
+    written, one file per call, named after the time, duration, tool and broker alias.
+    The collapsed format (for flamegraph.pl or speedscope) comes from a stack sampler; the
+    pstats format uses cProfile, which is more precise but slows profiled calls down.
+    """
+
+    def __init__(self, directory: str, sample_rate: float, slow_ms: float, output_format: str, interval: float):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.output_format = output_format
+        self.sampler = StackSampler(interval) if output_format == "collapsed" else None
+        self._cprofile = None
+        if output_format == "pstats":
+            import cProfile  # Only needed in the pstats format
+            self._cprofile = cProfile
+        self._cprofiled_threads = set()
+        self._lock = threading.Lock()
+        self._sequence = 0
+        self.calls_profiled = 0
+        self.profiles_written = 0
+
+    def begin(self, tool_name: str, broker_alias: str) -> Optional[ProfiledCall]:
+        """Start profiling a call if it is sampled or may turn out slow; None when it is not profiled"""
+        sampled = self.sample_rate > 0 and random.random() < self.sample_rate
+        if not sampled and not self.slow_ms:
+            return None
+        call = ProfiledCall(tool_name, broker_alias, threading.get_ident(), time.perf_counter(), sampled)
+        if self.sampler is not None:
+            self.sampler.add(call)
+        else:
+            with self._lock:
+                # cProfile can only profile one call per thread at a time
+                if call.thread_id in self._cprofiled_threads:
+                    return None
+                self._cprofiled_threads.add(call.thread_id)
+            call.profile = self._cprofile.Profile()
+            try:
+                call.profile.enable()
+            except ValueError as e:
+                # Another profiler (or debugger) is already active
+                logger.debug(f"Not profiling {tool_name}: {e}")
+                with self._lock:
+                    self._cprofiled_threads.discard(call.thread_id)
+                return None
+        return call
+
+    def end(self, call: ProfiledCall) -> Optional[str]:
+        """Stop profiling a call and write its profile if it was sampled or slow; returns the path written"""
+        elapsed_ms = (time.perf_counter() - call.started) * 1000
+        if self.sampler is not None:
+            self.sampler.remove(call)
+        else:
+            call.profile.disable()
+            with self._lock:
+                self._cprofiled_threads.discard(call.thread_id)
+        with self._lock:
+            self.calls_profiled += 1
+            if not call.sampled and elapsed_ms < self.slow_ms:
+                return None
+            self._sequence += 1
+            sequence = self._sequence
+
+        name = "-".join(re.sub(r'[^A-Za-z0-9_.-]', '_', part) for part in (
+            time.strftime("%Y%m%d-%H%M%S"), f"{elapsed_ms:.0f}ms", call.tool_name, call.broker_alias, str(sequence)))
+        path = os.path.join(self.directory, f"{name}.{self.output_format}")
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            if call.profile is not None:
+                call.profile.dump_stats(path)
+            else:
+                with open(path, 'w', encoding="utf-8") as file:
+                    file.writelines(f"{stack} {count}\n" for stack, count in call.stacks.items())
+        except OSError as e:
+            logger.warning(f"Failed to write profile {path}: {e}")
+            return None
+        with self._lock:
+            self.profiles_written += 1
+        logger.info(f"Profiled {call.tool_name} on broker '{call.broker_alias}' ({elapsed_ms:.0f} ms): {path}")
+        return path
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"calls_profiled": self.calls_profiled, "profiles_written": self.profiles_written}
+
+class RingBuffer:
+    """A fixed number of (time, value) samples in two preallocated float arrays; the oldest is overwritten.
+
+    Values are stored as doubles, so integer counters are exact up to 2**53.
+    """
+
+    __slots__ = ("times", "values", "next", "size")
+
+    def __init__(self, capacity: int):
+        self.times = array('d', bytes(8 * capacity))
+        self.values = array('d', bytes(8 * capacity))
+        self.next = 0
+        self.size = 0
+
+    def append(self, timestamp: float, value: float) -> None:
+        index = self.next
+        self.times[index] = timestamp
+        self.values[index] = value
+        self.next = (index + 1) % len(self.times)
+        if self.size < len(self.times):
+            self.size += 1
+
+    def last_time(self) -> float:
+        return self.times[self.next - 1] if self.size else 0.0
+
+    def _window(self, since: Optional[float]) -> tuple:
+        """Return the array slices, oldest first, holding the samples taken at or after `since`"""
+        capacity = len(self.times)
+        start = (self.next - self.size) % capacity
+        # Samples are appended in time order, so the window start is found by binary search
+        low, high = 0, self.size
+        while since is not None and low < high:
+            middle = (low + high) // 2
+            if self.times[(start + middle) % capacity] < since:
+                low = middle + 1
+            else:
+                high = middle
+        first, count = (start + low) % capacity, self.size - low
+        if not count:
+            return ()
+        if first + count <= capacity:
+            return (slice(first, first + count),)
+        return slice(first, capacity), slice(0, first + count - capacity)
+
+    def samples(self, since: Optional[float] = None) -> List[tuple]:
+        """Return the samples taken at or after `since`, oldest first"""
+        samples = []
+        for part in self._window(since):
+            samples.extend(zip(self.times[part], self.values[part]))
+        return samples
+
+    def summary(self, since: Optional[float] = None, counter: bool = False) -> Optional[Dict[str, Any]]:
+        """Summarize the samples since `since`: last/min/max of a gauge, or also first/avg, increase and rate of a counter.
+
+        A counter that drops was reset (for example by a broker restart or clear-stats) and counted
+        up again from zero, so the increase adds its value after the reset instead of the drop.
+        """
+        parts = self._window(since)
+        if not parts:
+            return None
+        # Array slices are copied and reduced in C, without building a tuple per sample
+        values = self.values[parts[0]] + self.values[parts[1]] if len(parts) == 2 else self.values[parts[0]]
+        first_time, last_time = self.times[parts[0].start], self.times[parts[-1].stop - 1]
+        first, last = values[0], values[-1]
+        summary = {
+            "samples": len(values),
+            "from": _iso_time(first_time),
+            "to": _iso_time(last_time),
+            "last": _sample_value(last),
+            "min": _sample_value(min(values)),
+            "max": _sample_value(max(values))
+        }
+        if not counter:
+            return summary
+        summary["first"] = _sample_value(first)
+        summary["avg"] = round(sum(values) / len(values), 6)
+        steps = list(map(operator.sub, values[1:], values[:-1]))
+        increase = sum(step for step in steps if step > 0)
+        # After a reset the counter restarted from zero, so its whole new value is an increase
+        reset_values = [value for value, step in zip(values[1:], steps) if step < 0]
+        increase += sum(reset_values)
+        resets = len(reset_values)
+        summary["delta"] = _sample_value(increase)
+        if resets:
+            summary["resets"] = resets
+        if last_time > first_time:
+            summary["rate_per_second"] = round(increase / (last_time - first_time), 6)
+        return summary
+
+
+def _sample_value(value: float) -> Union[int, float]:
+    """Return whole values as ints, as SEMP reports counters"""
+    return int(value) if value.is_integer() else value
+
+
+def _iso_time(timestamp: float) -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(timestamp))
+
+
+class MetricPoller:
+    """Samples SEMP paths on every broker at a fixed interval into in-memory time series.
+
+    Each numeric field of each returned object becomes one RingBuffer, keyed by
+    (broker, path, object, field). Objects are named by the identifying keys in
+    their SEMP URI (for example "default/orders" for a queue), so renaming a
+    profile or other attribute does not start a new series. Series not updated
+    for a whole history length, such as those of deleted queues, are dropped.
+    Queries are answered from memory and never reach the broker.
+    """
+
+    def __init__(self, fetch: Callable[[str, str], Any], brokers: List[str], paths: List[str],
+                 interval: float, history: int, fields: List[str], base_paths: Optional[Dict[str, str]] = None):
+        self.fetch = fetch  # (broker alias, path) -> SEMP response
+        self.brokers = brokers
+        # Path of each broker's SEMP base URL (such as /SEMP/v2/monitor), stripped from object URIs
+        self.base_paths = base_paths or {}
+        self.paths = paths
+        self.interval = interval
+        self.history = history
+        self.fields = PatternMatcher(fields, substring=False)
+        self.counters = PatternMatcher(COUNTER_FIELDS, substring=False)
+        self.series: Dict[tuple, RingBuffer] = {}
+        self.errors: Dict[tuple, str] = {}
+        self.polls = 0
+        self.failures = 0
+        self.evicted = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="mcp-poller", daemon=True)
+            self._thread.start()
+            logger.info(f"Polling {len(self.paths)} SEMP paths on {len(self.brokers)} brokers "
+                        f"every {self.interval} seconds")
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            started = time.monotonic()
+            self.poll()
+            # Fixed interval between poll starts, however long the poll took
+            self._stop.wait(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def poll(self) -> None:
+        """Sample every path on every broker once"""
+        for broker in self.brokers:
+            for path in self.paths:
+                try:
+                    response = self.fetch(broker, path)
+                except Exception as e:
+                    with self._lock:
+                        self.failures += 1
+                        self.errors[(broker, path)] = str(e)
+                    logger.warning(f"Polling {path} on broker '{broker}' failed: {e}")
+                    continue
+                self.ingest(broker, path, response, time.time())
+        with self._lock:
+            self.polls += 1
+            self._evict(time.time())
+
+    def ingest(self, broker: str, path: str, response: Any, timestamp: float) -> None:
+        """Append the numeric fields of a SEMP response to their series"""
+        data = response.get('data') if isinstance(response, dict) else None
+        if isinstance(data, list):
+            links = response.get('links')
+            links = links if isinstance(links, list) else []
+            objects = [(self._object_name(broker, links[index] if index < len(links) else None, index), item)
+                       for index, item in enumerate(data)]
+        else:
+            # A single object is the one the polled path names
+            objects = [(self._path_name(path.partition("?")[0]), data)]
+        with self._lock:
+            self.errors.pop((broker, path), None)
+            for name, item in objects:
+                if not isinstance(item, dict):
+                    continue
+                for field_name, value in self._numeric_fields(item):
+                    key = (broker, path, name, field_name)
+                    buffer = self.series.get(key)
+                    if buffer is None:
+                        buffer = self.series[key] = RingBuffer(self.history)
+                    buffer.append(timestamp, value)
+
+    @staticmethod
+    def _path_name(path: str) -> str:
+        """Name an object by the identifying keys in its SEMP path: /msgVpns/default/queues/orders -> default/orders"""
+        segments = path.strip("/").split("/")
+        return "/".join(urllib.parse.unquote(segment) for segment in segments[1::2])
+
+    def _object_name(self, broker: str, link: Any, index: int) -> str:
+        """Name a collection item by its links.uri, which holds exactly its identifying keys"""
+        uri = link.get('uri') if isinstance(link, dict) else None
+        if not isinstance(uri, str):
+            return str(index)
+        path = urllib.parse.urlsplit(uri).path
+        base_path = self.base_paths.get(broker, "")
+        if base_path and path.startswith(base_path):
+            path = path[len(base_path):]
+        return self._path_name(path)
+
+    def _numeric_fields(self, item: Dict[str, Any], prefix: str = ""):
+        """Yield (dotted name, value) for the numeric fields whose name matches MCP_POLL_FIELDS"""
+        for key, value in item.items():
+            if isinstance(value, dict):
+                yield from self._numeric_fields(value, f"{prefix}{key}.")
+            elif isinstance(value, (int, float)) and not isinstance(value, bool) and self.fields.matches(key):
+                yield prefix + key, float(value)
+
+    def _is_counter(self, field_name: str) -> bool:
+        """Return whether a field only grows between resets (see COUNTER_FIELDS)"""
+        return field_name.startswith("counter.") or self.counters.matches(field_name.rsplit(".", 1)[-1])
+
+    def _evict(self, now: float) -> None:
+        horizon = now - self.interval * self.history
+        stale = [key for key, buffer in self.series.items() if buffer.last_time() < horizon]
+        for key in stale:
+            del self.series[key]
+        self.evicted += len(stale)
+
+    def _select(self, broker: Optional[str], path: Optional[str], object_pattern: Optional[str],
+                fields: Optional[List[str]]):
+        """Yield the series matching the query filters; the caller holds the lock"""
+        objects = PatternMatcher([object_pattern], substring=False) if object_pattern else None
+        field_matcher = PatternMatcher(fields, substring=False) if fields else None
+        for key, buffer in self.series.items():
+            series_broker, series_path, name, field_name = key
+            if broker and series_broker != broker or path and series_path != path:
+                continue
+            if objects is not None and not objects.matches(name):
+                continue
+            if field_matcher is not None and not (field_matcher.matches(field_name)
+                                                  or field_matcher.matches(field_name.rsplit(".", 1)[-1])):
+                continue
+            yield key, buffer
+
+    @staticmethod
+    def _nest(entries: Dict[tuple, Any]) -> Dict[str, Any]:
+        """Turn {(broker, path, object, field): value} into {broker: {path: {object: {field: value}}}}"""
+        nested: Dict[str, Any] = {}
+        for (broker, path, name, field_name), value in sorted(entries.items()):
+            nested.setdefault(broker, {}).setdefault(path, {}).setdefault(name, {})[field_name] = value
+        return nested
+
+    def query(self, broker: Optional[str] = None, path: Optional[str] = None, object_pattern: Optional[str] = None,
+              fields: Optional[List[str]] = None, window: Optional[float] = None) -> Dict[str, Any]:
+        """Summarize the matching series over the last `window` seconds (the whole history when None)"""
+        since = time.time() - window if window else None
+        with self._lock:
+            summaries = {}
+            for key, buffer in self._select(broker, path, object_pattern, fields):
+                summary = buffer.summary(since, counter=self._is_counter(key[3]))
+                if summary is not None:
+                    summaries[key] = summary
+            errors = self._errors(broker, path)
+        return self._result(window, self._nest(summaries), errors)
+
+    def samples(self, broker: Optional[str] = None, path: Optional[str] = None, object_pattern: Optional[str] = None,
+                fields: Optional[List[str]] = None, window: Optional[float] = None,
+                max_samples: Optional[int] = None) -> Dict[str, Any]:
+        """Return the matching series as [unix time, value] pairs, oldest first"""
+        since = time.time() - window if window else None
+        with self._lock:
+            series = {}
+            for key, buffer in self._select(broker, path, object_pattern, fields):
+                samples = buffer.samples(since)
+                if max_samples:
+                    samples = samples[-max_samples:]
+                if samples:
+                    series[key] = [[round(timestamp, 3), _sample_value(value)] for timestamp, value in samples]
+            errors = self._errors(broker, path)
+        return self._result(window, self._nest(series), errors)
+
+    def _errors(self, broker: Optional[str], path: Optional[str]) -> Dict[str, Any]:
+        errors = {key: message for key, message in self.errors.items()
+                  if (not broker or key[0] == broker) and (not path or key[1] == path)}
+        nested: Dict[str, Any] = {}
+        for (error_broker, error_path), message in sorted(errors.items()):
+            nested.setdefault(error_broker, {})[error_path] = message
+        return nested
+
+    def _result(self, window: Optional[float], series: Dict[str, Any], errors: Dict[str, Any]) -> Dict[str, Any]:
+        result = {
+            "interval_seconds": self.interval,
+            "window_seconds": window or self.interval * self.history,
+            "series": series
+        }
+        if errors:
+            # The last poll of these paths failed; their series stop at the previous sample
+            result["poll_errors"] = errors
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "series": len(self.series),
+                "samples": sum(buffer.size for buffer in self.series.values()),
+                "memory_bytes": len(self.series) * self.history * 16,
+                "polls": self.polls,
+                "failures": self.failures,
+                "evicted": self.evicted
+            }
+
+
+class CassetteMissError(LookupError):
+    """Raised in replay mode for a request that is not in the cassette"""
+
+class Cassette:
+    """SEMP traffic recorded to, or replayed from, a JSON-lines file (gzip-compressed when it ends in .gz).
+
+    Every broker exchange is stored with its offset from the start of recording, its latency, status
+    and body, and every tools/call with its arguments, so a captured session can be replayed offline.
+    Credentials are never written: headers and broker URLs are left out, and string values under keys
+    that name a secret are redacted. In replay mode requests are matched on broker, method, path, query
+    and body; repeated requests get the recorded responses in order, then the last one again.
+    """
+
+    VERSION = 1
+    REDACTED = "<redacted>"
+    # Keys whose string values are redacted; SEMP counters such as invalidTokenCount are kept
+    SECRET_KEYS = re.compile(r"(password|secret|passphrase|privatekey|credential|authorization|token)$", re.IGNORECASE)
+
+    def __init__(self, path: str, mode: str, time_scale: float = 1.0, brokers: Optional[List[str]] = None,
+                 default_broker: Optional[str] = None):
+        self.path = path
+        self.mode = mode
+        self.time_scale = time_scale
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+        self._file = None
+        self._interactions: Dict[tuple, deque] = {}
+        self.header: Dict[str, Any] = {"type": "cassette", "version": self.VERSION,
+                                       "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                                       "brokers": brokers or [], "default_broker": default_broker}
+        self.calls: List[Dict[str, Any]] = []
+        self.recorded = 0
+        self.replayed = 0
+        self.misses = 0
+        if mode == "record":
+            self._file = gzip.open(path, "wt", encoding="utf-8") if path.endswith(".gz") \
+                else open(path, "w", encoding="utf-8")
+            self._write(self.header)
+        else:
+            self._load()
+
+    def _load(self) -> None:
+        """Index the recorded exchanges by request and collect the recorded tool calls"""
+        opener = gzip.open if self.path.endswith(".gz") else open
+        with opener(self.path, "rt", encoding="utf-8") as file:
+            try:
+                for line in file:
+                    if not line.strip():
+                        continue
+                    entry = json.loads(line)
+                    if entry.get("type") == "cassette":
+                        if entry.get("version") != self.VERSION:
+                            raise ValueError(f"Unsupported cassette version {entry.get('version')} in {self.path}")
+                        self.header = entry
+                    elif entry.get("type") == "http":
+                        key = (entry["broker"], entry["method"], entry["path"], entry.get("body"))
+                        self._interactions.setdefault(key, deque()).append(entry)
+                    elif entry.get("type") == "call":
+                        self.calls.append(entry)
+            except EOFError:
+                # A gzip cassette whose recording was not closed cleanly; keep what was flushed
+                logger.warning(f"Cassette {self.path} is truncated; replaying the entries before the cut")
+        logger.info(f"Loaded cassette {self.path}: {sum(len(q) for q in self._interactions.values())} exchanges, "
+                    f"{len(self.calls)} tool calls")
+
+    def _write(self, entry: Dict[str, Any]) -> None:
+        line = json.dumps(entry, separators=(",", ":"))
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(line + "\n")
+            # Flushed per entry so a recording survives the server being killed
+            self._file.flush()
+
+    def _offset(self) -> float:
+        return round(time.monotonic() - self._started, 4)
+
+    @classmethod
+    def redact(cls, value: Any) -> Any:
+        """Return a copy of a JSON value with the string values of secret-named keys replaced"""
+        if isinstance(value, dict):
+            return {key: cls.REDACTED if isinstance(item, str) and item and cls.SECRET_KEYS.search(key)
+                    else cls.redact(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [cls.redact(item) for item in value]
+        return value
+
+    @classmethod
+    def request_key(cls, broker_config: BrokerConfig, method: str, url: str, body: Any = None) -> tuple:
+        """Key a request on broker, method, path relative to the broker's base URL, sorted query and body"""
+        if url.startswith(broker_config.base_url):
+            url = url[len(broker_config.base_url):]
+        path, _, query = url.partition("?")
+        if query:
+            path += "?" + urllib.parse.urlencode(sorted(urllib.parse.parse_qsl(query, keep_blank_values=True)))
+        if isinstance(body, (bytes, str)):
+            try:
+                body = json.loads(body)
+            except ValueError:
+                body = body.decode("utf-8", errors="replace") if isinstance(body, bytes) else body
+        if body is not None:
+            body = json.dumps(cls.redact(body), sort_keys=True, separators=(",", ":"))
+        return broker_config.alias, method.upper(), path, body
+
+    def record_exchange(self, key: tuple, status: int, content_type: Optional[str],
+                        latency: float, content: bytes) -> None:
+        """Append one broker response"""
+        entry = {"type": "http", "t": self._offset(), "broker": key[0], "method": key[1], "path": key[2],
+                 "body": key[3], "status": status, "latency": round(latency, 4), "content_type": content_type}
+        try:
+            entry["json"] = self.redact(json.loads(content)) if content else None
+        except ValueError:
+            entry["text"] = content.decode("utf-8", errors="replace")
+        self._write(entry)
+        with self._lock:
+            self.recorded += 1
+
+    def record_error(self, key: tuple, latency: float, error: Exception) -> None:
+        """Append a request that failed without an HTTP response, such as a refused connection"""
+        self._write({"type": "http", "t": self._offset(), "broker": key[0], "method": key[1], "path": key[2],
+                     "body": key[3], "latency": round(latency, 4), "error": str(error)})
+        with self._lock:
+            self.recorded += 1
+
+    def record_call(self, tool_name: str, arguments: Dict[str, Any]) -> None:
+        """Append an incoming tool call, so the session can be replayed through the server"""
+        self._write({"type": "call", "t": self._offset(), "tool": tool_name, "arguments": self.redact(arguments)})
+
+    def replay(self, key: tuple) -> Dict[str, Any]:
+        """Return the next recorded exchange for a request; raises CassetteMissError if there is none"""
+        with self._lock:
+            recorded = self._interactions.get(key)
+            if not recorded:
+                self.misses += 1
+                raise CassetteMissError(f"No recorded response for {key[1]} {key[2]} on broker '{key[0]}' "
+                                        f"in cassette {self.path}")
+            self.replayed += 1
+            return recorded.popleft() if len(recorded) > 1 else recorded[0]
+
+    def delay(self, entry: Dict[str, Any]) -> float:
+        """The recorded latency of an exchange, scaled by the time scale"""
+        return entry.get("latency", 0.0) * self.time_scale
+
+    @staticmethod
+    def build_response(entry: Dict[str, Any], request: Union["requests.PreparedRequest", str]) -> "requests.Response":
+        """Rebuild a requests.Response from a recorded exchange; recorded connection failures are raised"""
+        import http.client
+        if "error" in entry:
+            raise requests.exceptions.ConnectionError(f"{entry['error']} (replayed)")
+        if "json" in entry:
+            content = json.dumps(entry["json"], separators=(",", ":")).encode("utf-8")
+        else:
+            content = entry.get("text", "").encode("utf-8")
+        response = requests.Response()
+        response.status_code = entry["status"]
+        response.reason = http.client.responses.get(entry["status"], "")
+        response.headers["Content-Length"] = str(len(content))
+        if entry.get("content_type"):
+            response.headers["Content-Type"] = entry["content_type"]
+        response.encoding = "utf-8"
+        response.raw = io.BytesIO(content)
+        if isinstance(request, str):
+            response.url = request
+        else:
+            response.url = request.url
+            response.request = request
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"mode": self.mode, "path": self.path, "recorded": self.recorded,
+                    "replayed": self.replayed, "misses": self.misses}
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+@dataclass
+class PooledSession:
+    """A keep-alive HTTP session bound to a single broker"""
+    session: "requests.Session"
+    created_at: float
+    last_used: float
+    requests: int = 0
+    # Requests currently using the session; a session in use is never evicted
+    in_use: int = 0
+
+class CassetteAdapter:
+    """Transport adapter that records a broker's responses to a cassette, or serves them from it.
+
+    It wraps the session's HTTPAdapter. Working at the transport level keeps limiters, retries,
+    streaming and metrics on their normal path.
+    """
+
+    def __init__(self, cassette: Cassette, broker_config: BrokerConfig, adapter: Any):
+        self.cassette = cassette
+        self.broker_config = broker_config
+        self.adapter = adapter
+
+    @property
+    def poolmanager(self) -> Any:
+        return self.adapter.poolmanager
+
+    def send(self, request: "requests.PreparedRequest", stream: bool = False, **kwargs) -> "requests.Response":
+        key = self.cassette.request_key(self.broker_config, request.method, request.url, request.body)
+        if self.cassette.mode == "replay":
+            entry = self.cassette.replay(key)
+            time.sleep(self.cassette.delay(entry))
+            return self.cassette.build_response(entry, request)
+
+        start = time.monotonic()
+        try:
+            response = self.adapter.send(request, stream=stream, **kwargs)
+            # Read the whole body so it can be recorded; iter_content() then serves it from memory
+            content = response.content
+        except requests.exceptions.RequestException as e:
+            self.cassette.record_error(key, time.monotonic() - start, e)
+            raise
+        self.cassette.record_exchange(key, response.status_code, response.headers.get("Content-Type"),
+                                      time.monotonic() - start, content)
+        return response
+
+    def close(self) -> None:
+        self.adapter.close()
+
+class BrokerSessionPool:
+    """Keeps one keep-alive requests.Session per broker, with idle eviction."""
+
+    def __init__(self, pool_size: int = 10, idle_timeout: float = 300.0, cassette: Optional[Cassette] = None):
+        self.pool_size = pool_size
+        self.idle_timeout = idle_timeout
+        self.cassette = cassette
+        self._sessions: Dict[str, PooledSession] = {}
+        self._lock = threading.Lock()
+        self._sessions_created = 0
+        self._sessions_evicted = 0
+        # Connection counters carried over from sessions that have been closed
+        self._closed_connections = 0
+        self._closed_requests = 0
+
+    def _create_session(self, broker_config: BrokerConfig) -> "requests.Session":
+        """Create a session with connection pooling and the broker's auth applied once"""
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+        if self.cassette is not None:
+            adapter = CassetteAdapter(self.cassette, broker_config, adapter)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers.update({"Content-Type": "application/json"})
+
+        if broker_config.auth_method == "basic" and broker_config.username and broker_config.password:
+            session.auth = (broker_config.username, broker_config.password)
+        elif broker_config.auth_method == "bearer" and broker_config.bearer_token:
+            session.headers["Authorization"] = f"Bearer {broker_config.bearer_token}"
+
+        return session
+
+    def get_session(self, broker_config: BrokerConfig) -> "requests.Session":
+        """Return the pooled session for a broker, creating it on first use"""
+        return self._checkout(broker_config, 0)
+
+    def acquire(self, broker_config: BrokerConfig) -> "requests.Session":
+        """Return the broker's session for one request; it is not evicted until release() is called"""
+        return self._checkout(broker_config, 1)
+
+    def release(self, broker_config: BrokerConfig, session: "requests.Session") -> None:
+        """Mark a request on an acquired session as finished; its idle time starts now"""
+        with self._lock:
+            pooled = self._sessions.get(broker_config.alias)
+            # A session closed by close_all() in the meantime has nothing left to track
+            if pooled is not None and pooled.session is session:
+                pooled.in_use -= 1
+                pooled.last_used = time.monotonic()
+
+    def _checkout(self, broker_config: BrokerConfig, hold: int) -> "requests.Session":
+        now = time.monotonic()
+        with self._lock:
+            self._evict_idle(now)
+            pooled = self._sessions.get(broker_config.alias)
+            if pooled is None:
+                pooled = PooledSession(
+                    session=self._create_session(broker_config),
+                    created_at=now,
+                    last_used=now
+                )
+                self._sessions[broker_config.alias] = pooled
+                self._sessions_created += 1
+                logger.debug(f"Created HTTP session for broker '{broker_config.alias}'")
+            pooled.last_used = now
+            pooled.requests += 1
+            pooled.in_use += hold
+            return pooled.session
+
+    def _evict_idle(self, now: float) -> None:
+        """Close sessions that have not been used within the idle timeout (lock must be held)"""
+        if self.idle_timeout <= 0:
+            return
+        for alias, pooled in list(self._sessions.items()):
+            if not pooled.in_use and now - pooled.last_used > self.idle_timeout:
+                self._close(alias)
+                self._sessions_evicted += 1
+                logger.debug(f"Evicted idle HTTP session for broker '{alias}'")
+
+    def _close(self, alias: str) -> None:
+        """Close and forget a session, keeping its connection counters (lock must be held)"""
+        pooled = self._sessions.pop(alias)
+        connections, requests_sent = self._connection_counts(pooled.session)
+        self._closed_connections += connections
+        self._closed_requests += requests_sent
+        pooled.session.close()
+
+    @staticmethod
+    def _connection_counts(session: "requests.Session") -> tuple:
+        """Return (connections opened, requests sent) across the session's urllib3 pools"""
+        connections = 0
+        requests_sent = 0
+        for adapter in set(session.adapters.values()):
+            pools = getattr(getattr(adapter, "poolmanager", None), "pools", None)
+            if pools is None:
+                continue
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is not None:
+                    connections += getattr(pool, "num_connections", 0)
+                    requests_sent += getattr(pool, "num_requests", 0)
+        return connections, requests_sent
+
+    def stats(self) -> Dict[str, Any]:
+        """Return pool statistics, including the connection reuse ratio"""
+        with self._lock:
+            brokers = {}
+            total_connections = self._closed_connections
+            total_requests = self._closed_requests
+            now = time.monotonic()
+            for alias, pooled in self._sessions.items():
+                connections, requests_sent = self._connection_counts(pooled.session)
+                total_connections += connections
+                total_requests += requests_sent
+                brokers[alias] = {
+                    "requests": pooled.requests,
+                    "connections_opened": connections,
+                    "idle_seconds": round(now - pooled.last_used, 3)
+                }
+
+            reuse_ratio = 0.0
+            if total_requests:
+                reuse_ratio = max(0.0, 1.0 - total_connections / total_requests)
+
+            return {
+                "pool_size": self.pool_size,
+                "idle_timeout": self.idle_timeout,
+                "sessions_active": len(self._sessions),
+                "sessions_created": self._sessions_created,
+                "sessions_evicted": self._sessions_evicted,
+                "connections_opened": total_connections,
+                "requests_sent": total_requests,
+                "connection_reuse_ratio": round(reuse_ratio, 4),
+                "brokers": brokers
+            }
+
+    def close_all(self) -> None:
+        """Close every pooled session"""
+        with self._lock:
+            for alias in list(self._sessions):
+                self._close(alias)
+
+class AsyncBrokerSessionPool:
+    """Keeps one keep-alive aiohttp.ClientSession per broker for the asyncio engine.
+
+    aiohttp is an optional dependency and is only imported when the asyncio engine is used.
+    """
+
+    def __init__(self, pool_size: int = 10, idle_timeout: float = 300.0,
+                 connect_timeout: float = 0.0, read_timeout: float = 0.0):
+        self.pool_size = pool_size
+        self.idle_timeout = idle_timeout
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self._sessions: Dict[str, Any] = {}
+        self._loops: Dict[str, asyncio.AbstractEventLoop] = {}
+        self._requests: Dict[str, int] = {}
+        self._sessions_created = 0
+
+    async def get_session(self, broker_config: BrokerConfig):
+        """Return the pooled session for a broker, creating it on first use"""
+        session = self._sessions.get(broker_config.alias)
+        # Sessions are bound to the event loop that created them
+        if session is None or session.closed or self._loops.get(broker_config.alias) is not asyncio.get_running_loop():
+            if session is not None and not session.closed:
+                await self._close_stale(session, self._loops[broker_config.alias])
+            session = self._create_session(broker_config)
+            self._sessions[broker_config.alias] = session
+            self._loops[broker_config.alias] = asyncio.get_running_loop()
+            self._sessions_created += 1
+            logger.debug(f"Created async HTTP session for broker '{broker_config.alias}'")
+        self._requests[broker_config.alias] = self._requests.get(broker_config.alias, 0) + 1
+        return session
+
+    @staticmethod
+    async def _close_stale(session, loop: "asyncio.AbstractEventLoop") -> None:
+        """Close the session of a broker that was used from another event loop"""
+        if loop.is_running():
+            # Still serving another thread: its connections are closed on that loop
+            asyncio.run_coroutine_threadsafe(session.close(), loop)
+            return
+        # aiohttp cannot shut down connections of a closed loop, but the session is marked
+        # closed rather than left for the garbage collector to warn about
+        await session.close()
+
+    def _create_session(self, broker_config: BrokerConfig):
+        """Create a session with connection pooling and the broker's auth applied once"""
+        try:
+            import aiohttp
+        except ImportError:
+            raise RuntimeError("The asyncio engine requires the 'aiohttp' package (pip install aiohttp)")
+
+        headers = {"Content-Type": "application/json"}
+        auth = None
+        if broker_config.auth_method == "basic" and broker_config.username and broker_config.password:
+            auth = aiohttp.BasicAuth(broker_config.username, broker_config.password)
+        elif broker_config.auth_method == "bearer" and broker_config.bearer_token:
+            headers["Authorization"] = f"Bearer {broker_config.bearer_token}"
+
+        connector = aiohttp.TCPConnector(
+            limit=self.pool_size,
+            keepalive_timeout=self.idle_timeout if self.idle_timeout > 0 else None
+        )
+        # No total limit: a long paged listing is fine as long as the broker keeps sending.
+        # sock_connect rather than connect, so waiting for a free pooled connection is not a timeout.
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=self.connect_timeout or None,
+                                        sock_read=self.read_timeout or None)
+        return aiohttp.ClientSession(connector=connector, headers=headers, auth=auth, timeout=timeout)
+
+    @staticmethod
+    def encode_params(params: Optional[Dict[str, Any]]) -> List[tuple]:
+        """Convert query parameters to the string pairs aiohttp expects, matching requests' encoding"""
+        encoded = []
+        for name, value in (params or {}).items():
+            values = value if isinstance(value, (list, tuple)) else [value]
+            for item in values:
+                if item is None:
+                    continue
+                if isinstance(item, bool):
+                    item = "true" if item else "false"
+                encoded.append((name, str(item)))
+        return encoded
+
+    def stats(self) -> Dict[str, Any]:
+        """Return pool statistics"""
+        return {
+            "pool_size": self.pool_size,
+            "sessions_active": sum(1 for session in self._sessions.values() if not session.closed),
+            "sessions_created": self._sessions_created,
+            "brokers": {alias: {"requests": count} for alias, count in self._requests.items()}
+        }
+
+    async def close_all(self) -> None:
+        """Close every pooled session"""
+        for session in self._sessions.values():
+            await session.close()
+        self._sessions.clear()
+        self._loops.clear()
+
+class ConcurrentDispatcher:
+    """Runs tools/call requests on a bounded worker pool and writes each response when it is ready.
+
+    Other MCP methods are cheap and are answered inline on the reader thread, so they are
+    never queued behind a slow broker call. Responses carry their request id, which lets
+    the client match them regardless of completion order.
+    """
+
+    CONCURRENT_METHODS = ("tools/call", "mcp.call_tool")
+
+    def __init__(self, server: "SolaceSempv2McpServer", write: Callable[[str], None],
+                 max_workers: int = 8, max_in_flight: int = 32):
+        self.server = server
+        self.write = write
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="mcp-dispatch")
+        self._in_flight = threading.BoundedSemaphore(max_in_flight)
+
+    def dispatch(self, line: str) -> None:
+        """Handle one input line, blocking the reader while the in-flight limit is reached"""
+        try:
+            message = self.server._decode_message(line)
+        except json.JSONDecodeError:
+            self.write(self.server._create_error_response(None, ERROR_PARSE, "Parse error"))
+            return
+
+        if not isinstance(message, dict) or message.get('method') not in self.CONCURRENT_METHODS:
+            self.write(self.server._handle_request(message))
+            return
+
+        self._in_flight.acquire()
+        try:
+            self.executor.submit(self._run, message)
+        except Exception:
+            self._in_flight.release()
+            raise
+
+    def _run(self, message: Dict[str, Any]) -> None:
+        """Handle a request on a worker thread and write its response"""
+        try:
+            self.write(self.server._handle_request(message))
+        except Exception as e:
+            logger.error(f"Error dispatching request {message.get('id')}: {e}")
+        finally:
+            self._in_flight.release()
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop accepting work, optionally waiting for in-flight requests to complete"""
+        self.executor.shutdown(wait=wait)
+
+class SolaceSempv2McpServer:
+    """MCP Server for the Solace SEMPv2 API"""
+
+    def __init__(self, config: ServerConfig, background_registration: bool = False):
+        """Initialize the server with the OpenAPI spec.
+
+        With background_registration the tools are registered on a separate thread, so the server can
+        answer initialize straight away; tools/list and tools/call wait until registration is done.
+        """
+        self.config = config
+        self.codec = JsonCodec(config.json_codec)
+        self.api_filter = ApiFilter(config)
+        self.registration_stats: Dict[str, Any] = {}
+        self.trim_stats = {"responses": 0, "links_bytes_removed": 0, "select_bytes_saved_estimate": 0}
+        self._trim_lock = threading.Lock()
+        self.tools: Dict[str, Tool] = {}
+        self.openapi_path = config.openapi_spec_path
+        self.openapi_spec: Optional[Dict[str, Any]] = None
+        self.cassette: Optional[Cassette] = None
+        if config.cassette_mode != "off":
+            self.cassette = Cassette(config.cassette_path, config.cassette_mode, config.cassette_time_scale,
+                                     config.broker_aliases, config.default_broker_alias)
+        self.session_pool = BrokerSessionPool(
+            pool_size=config.http_pool_size,
+            idle_timeout=config.http_pool_idle_timeout,
+            cassette=self.cassette
+        )
+        # (connect, read) seconds for requests; None leaves that phase unbounded
+        self.http_timeout = (config.http_connect_timeout or None, config.http_read_timeout or None)
+        self.async_session_pool: Optional[AsyncBrokerSessionPool] = None
+        self._fanout_executor: Optional[ThreadPoolExecutor] = None
+        # Set on fan-out worker threads, whose requests must not outlive the fan-out timeout
+        self._fanout_thread = threading.local()
+        self.response_cache: Optional[ResponseCache] = None
+        if config.cache_ttl > 0 or config.cache_ttl_rules:
+            self.response_cache = ResponseCache(
+                max_bytes=config.cache_max_bytes,
+                stale_while_revalidate=config.cache_stale_while_revalidate
+            )
+        self._cache_ttls: Dict[str, float] = {}
+        self.single_flight: Optional[SingleFlight] = SingleFlight() if config.single_flight else None
+        self._refresh_executor: Optional[ThreadPoolExecutor] = None
+        self._background_tasks = set()
+        self._stdout_lock = threading.Lock()
+        # Per-broker admission control, only for brokers with a rate or concurrency limit
+        self.broker_limiters: Dict[str, BrokerLimiter] = {
+            alias: BrokerLimiter(alias, broker.rate_limit, config.broker_burst, broker.max_concurrency,
+                                 config.broker_latency_target)
+            for alias, broker in config.brokers.items() if broker.rate_limit or broker.max_concurrency
+        }
+        self.circuit_breakers: Dict[str, CircuitBreaker] = {}
+        if config.circuit_breaker_threshold:
+            self.circuit_breakers = {
+                alias: CircuitBreaker(alias, config.circuit_breaker_threshold, config.circuit_breaker_cooldown)
+                for alias in config.brokers
+            }
+        self.retry_stats = {"retries": 0, "recovered": 0, "exhausted": 0}
+        self._retry_lock = threading.Lock()
+        self.metrics: Optional[MetricsRegistry] = MetricsRegistry() if config.metrics else None
+        self._metrics_http_server = None
+        self._metrics_file_stop: Optional[threading.Event] = None
+        # Not on the asyncio engine, where concurrent calls share one thread (see ServerConfig.validate)
+        self.profiler: Optional[CallProfiler] = None
+        if config.profile_dir and config.engine != "async":
+            self.profiler = CallProfiler(config.profile_dir, config.profile_sample_rate, config.profile_slow_ms,
+                                         config.profile_format, config.profile_interval_ms / 1000)
+
+        # Started with the server; answers the polled_metrics tools from memory
+        self.poller: Optional[MetricPoller] = None
+        if config.poll_paths:
+            self.poller = MetricPoller(self._poll_path, list(config.brokers), config.poll_paths,
+                                       config.poll_interval, config.poll_history, config.poll_fields,
+                                       {alias: urllib.parse.urlsplit(broker.base_url).path.rstrip("/")
+                                        for alias, broker in config.brokers.items()})
+
+        self.registry_cache: Optional[ToolRegistryCache] = None
+        if config.registry_cache_dir:
+            self.registry_cache = ToolRegistryCache(config.registry_cache_dir)
+        # Serialized tools/list result pages, rebuilt lazily after the registry changes
+        self._tools_list_pages: Optional[List[str]] = None
+        self._tools_ready = threading.Event()
+        self.registration_error: Optional[Exception] = None
+        if background_registration:
+            threading.Thread(target=self._register_in_background, name="mcp-registration", daemon=True).start()
+        else:
+            self._load_tools()
+            self._tools_ready.set()
+
+    def _register_in_background(self) -> None:
+        start = time.perf_counter()
+        try:
+            self._load_tools()
+            logger.info(f"Registered {len(self.tools)} tools in the background in "
+                        f"{(time.perf_counter() - start) * 1000:.1f} ms")
+        except Exception as e:
+            self.registration_error = e
+            logger.critical(f"Tool registration failed: {e}")
+        finally:
+            self._invalidate_tools_list()
+            self._tools_ready.set()
+
+        # Load the HTTP client now rather than on the first tool call
+        try:
+            importlib.import_module("aiohttp" if self.config.engine == "async" else "requests")
+        except ImportError:
+            pass
+
+    def wait_for_tools(self, timeout: Optional[float] = None) -> bool:
+        """Wait until tool registration has finished; returns False if it failed or timed out"""
+        return self._tools_ready.wait(timeout) and self.registration_error is None
+
+    def _registration_failed_response(self, msg_id: Any) -> str:
+        return self._create_error_response(msg_id, ERROR_INTERNAL,
+                                           f"Tool registration failed: {self.registration_error}")
+
+    def _load_tools(self) -> None:
+        """Load the tool registry from the on-disk cache, or build it from the OpenAPI spec"""
+        cache_key = None
+        if self.registry_cache is not None:
+            cache_key = self.registry_cache.make_key(self.openapi_path, self.config.registry_settings())
+            cached_tools = self.registry_cache.load(cache_key) if cache_key else None
+            if cached_tools is not None:
+                # The raw spec is not needed when the compiled registry is reused
+                self.tools = cached_tools
+                self._compile_request_plans()
+                self._invalidate_tools_list()
+                logger.info(f"Loaded {len(self.tools)} tools from registry cache")
+                self._register_builtin_tools()
+                return
+
+        self.openapi_spec = self._load_openapi_spec(self.openapi_path)
+        self._register_tools()
+        self._compile_request_plans()
+        self._invalidate_tools_list()
+
+        if self.config.lean_registry:
+            # Tools only reference the shared parameter definitions they use, so the
+            # rest of the parsed spec (response models, long descriptions) can go
+            self.openapi_spec = None
+
+        if cache_key:
+            self.registry_cache.save(cache_key, self.tools)
+        self._register_builtin_tools()
+
+    def _register_builtin_tools(self) -> None:
+        """Add the tools the server answers itself; they are registered after the registry is cached"""
+        if self.metrics is not None:
+            self._register_metrics_tool()
+        if self.poller is not None:
+            self._register_polling_tools()
+        self._invalidate_tools_list()
+
+    def _register_metrics_tool(self) -> None:
+        self.tools["server_metrics"] = Tool(
+            name="server_metrics",
+            description="Return the monitoring server's own metrics: per-tool and per-broker latency histograms, "
+                        "request and response bytes, JSON encoding time, error counts by status, and cache, "
+                        "connection pool and broker protection statistics.",
+            input_schema={
+                "type": "object",
+                "properties": {
+                    "format": {
+                        "type": "string",
+                        "enum": ["prometheus", "json"],
+                        "description": "prometheus (default) returns the Prometheus text format; json returns "
+                                       "counters and histograms with estimated p50/p95/p99 latencies"
+                    }
+                }
+            },
+            path="",
+            method="",
+            tags=["server"],
+            handler=self._server_metrics_tool
+        )
+
+    def _register_polling_tools(self) -> None:
+        filters = {
+            "broker_alias": {
+                "type": "string",
+                "enum": list(self.config.brokers),
+                "description": "Only this broker; default is every broker"
+            },
+            "path": {
+                "type": "string",
+                "enum": list(self.config.poll_paths),
+                "description": "Only this polled SEMP path; default is every polled path"
+            },
+            "object": {
+                "type": "string",
+                "description": "Object name or glob, such as 'default/orders*'. Objects are named by the "
+                               "identifying keys in their SEMP URI joined with '/', e.g. 'default/orders' "
+                               "for /msgVpns/default/queues/orders"
+            },
+            "fields": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": "Field names or globs, such as ['rxMsgCount', '*Rate']"
+            },
+            "window_seconds": {
+                "type": "number",
+                "description": "Only samples from the last N seconds; default is the whole history"
+            }
+        }
+        self.tools["polled_metrics"] = Tool(
+            name="polled_metrics",
+            description="Summarize the broker counters sampled in the background every "
+                        f"{self.config.poll_interval:g} seconds from {', '.join(self.config.poll_paths)}: "
+                        "last, min and max over a time window, plus first, avg, the increase (delta) and the "
+                        "per-second rate of cumulative counters such as rxMsgCount, per broker, path, object and "
+                        "field. Gauges such as bindCount have no delta. Counter resets are detected and not "
+                        "counted as decreases. Answered from memory without querying the broker.",
+            input_schema={"type": "object", "properties": filters},
+            path="",
+            method="",
+            tags=["server"],
+            handler=self._polled_metrics_tool
+        )
+        self.tools["polled_metric_samples"] = Tool(
+            name="polled_metric_samples",
+            description="Return the raw background samples of broker counters as [unix time, value] pairs, "
+                        "oldest first, for trend analysis. Narrow the result with object and fields. "
+                        "Answered from memory without querying the broker.",
+            input_schema={
+                "type": "object",
+                "properties": dict(filters, max_samples={
+                    "type": "integer",
+                    "description": "Only the most recent N samples of each series"
+                })
+            },
+            path="",
+            method="",
+            tags=["server"],
+            handler=self._polled_metric_samples_tool
+        )
+
+    def _polling_filters(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """Validate the filter arguments shared by the polled_metrics tools"""
+        window = arguments.get("window_seconds")
+        if window is not None and (not isinstance(window, (int, float)) or window <= 0):
+            raise ValueError("window_seconds must be a positive number.")
+        fields = arguments.get("fields")
+        if isinstance(fields, str):
+            fields = [fields]
+        return {
+            "broker": arguments.get("broker_alias"),
+            "path": arguments.get("path"),
+            "object_pattern": arguments.get("object"),
+            "fields": fields,
+            "window": window
+        }
 
-@dataclass
-class Tool:
-    """Represents an MCP tool"""
-    name: str
-    description: str
-    input_schema: Dict[str, Any]
-    path: str
-    method: str
-    parameters: List[Dict[str, Any]] = field(default_factory=list)
-    request_body: Optional[Dict[str, Any]] = None
-    tags: List[str] = field(default_factory=list)
+    def _polled_metrics_tool(self, arguments: Dict[str, Any]) -> Any:
+        """Handle a polled_metrics tool call"""
+        return self.poller.query(**self._polling_filters(arguments))
 
-class SolaceSempv2McpServer:
-    """MCP Server for the Solace SEMPv2 API"""
+    def _polled_metric_samples_tool(self, arguments: Dict[str, Any]) -> Any:
+        """Handle a polled_metric_samples tool call"""
+        max_samples = arguments.get("max_samples")
+        if max_samples is not None and (not isinstance(max_samples, int) or max_samples < 1):
+            raise ValueError("max_samples must be a positive integer.")
+        return self.poller.samples(max_samples=max_samples, **self._polling_filters(arguments))
 
-    def __init__(self, config: ServerConfig):
-        """Initialize the server with the OpenAPI spec"""
-        self.config = config
-        self.tools: Dict[str, Tool] = {}
-        self.openapi_path = config.openapi_spec_path
-        self.openapi_spec = self._load_openapi_spec(self.openapi_path)
+    def _poll_path(self, broker_alias: str, path: str) -> Any:
+        """Fetch one polled path through the same limits, circuit breaker and retries as tool calls"""
+        broker_config = self.config.brokers[broker_alias]
+        path, _, query = path.partition("?")
+        request = PreparedRequest(
+            broker_config=broker_config,
+            method="GET",
+            url=broker_config.base_url + path,
+            params=dict(urllib.parse.parse_qsl(query)),
+            keep_links=True
+        )
+        return self._fetch_pages(request, PaginationOptions(max_pages=POLL_MAX_PAGES))
 
-        self._register_tools()
+    def _server_metrics_tool(self, arguments: Dict[str, Any]) -> Any:
+        """Handle a server_metrics tool call"""
+        output_format = arguments.get("format", "prometheus")
+        if output_format == "json":
+            return {"metrics": self.metrics.snapshot(), "stats": self.get_stats()}
+        if output_format != "prometheus":
+            raise ValueError(f"Invalid format '{output_format}'. Use 'prometheus' or 'json'.")
+        return self.render_metrics()
+
+    def render_metrics(self) -> str:
+        """Render the metrics registry and the runtime statistics in the Prometheus text format"""
+        gauges = MetricsRegistry.stats_gauges(self.get_stats())
+        gauges["mcp_tools_registered"] = {(): len(self.tools)}
+        gauges["mcp_uptime_seconds"] = {(): round(time.time() - self.metrics.started, 3)}
+        return self.metrics.render(gauges)
+
+    def _compile_request_plans(self) -> None:
+        """Compile every tool's request plan; the lean registry compiles them on first call instead"""
+        if not self.config.lean_registry:
+            for tool in self.tools.values():
+                tool.plan = RequestPlan.compile(tool)
 
     def _load_openapi_spec(self, path: str) -> Dict[str, Any]:
         """Load and parse the OpenAPI specification"""
@@ -277,52 +3338,19 @@ class SolaceSempv2McpServer:
             with open(path, 'r') as file:
                 return json.load(file)
         except Exception as e:
+            # Raised rather than exiting, so a failure during background registration is reported to the client
             logger.error(f"Failed to load OpenAPI spec: {e}")
-            sys.exit(1)
+            raise ValueError(f"Failed to load OpenAPI spec {path}: {e}") from e
 
     def _should_register(self, method: str, tags: List[str], path: str, tool_name: str) -> bool:
         """Determine if a given API operation should be registered as a tool based on filtering rules"""
-        method = method.upper()
-
-        # Filter by HTTP method
-        if self.config.include_methods and method not in self.config.include_methods:
-            logger.debug(f"Filtering out {method} {path}: method not in include list")
-            return False
-        if self.config.exclude_methods and method in self.config.exclude_methods:
-            logger.debug(f"Filtering out {method} {path}: method in exclude list")
-            return False
-
-        # Filter by tools
-        if self.config.include_tools and tool_name not in self.config.include_tools:
-            logger.debug(f"Filtering out {method} {tool_name}: tool not in include list")
-            return False
-        if self.config.exclude_tools and tool_name in self.config.exclude_tools:
-            logger.debug(f"Filtering out {method} {tool_name}: tools in exclude list")
-            return False
-
-        # Filter by tags
-        if self.config.include_tags:
-            # Only apply tag inclusion filter if tags are specified
-            if not any(tag in self.config.include_tags for tag in tags):
-                logger.debug(f"Filtering out {method} {path}: no matching tags in include list")
-                return False
-
-        if self.config.exclude_tags and any(tag in self.config.exclude_tags for tag in tags):
-            logger.debug(f"Filtering out {method} {path}: tag in exclude list")
-            return False
-
-        # Filter by path
-        if self.config.include_paths:
-            # Only apply path inclusion filter if paths are specified
-            if not any(pattern in path for pattern in self.config.include_paths):
-                logger.debug(f"Filtering out {method} {path}: path not matching any pattern in include list")
-                return False
-
-        if self.config.exclude_paths and any(pattern in path for pattern in self.config.exclude_paths):
-            logger.debug(f"Filtering out {method} {path}: path matching pattern in exclude list")
-            return False
+        reason = self.api_filter.rejection(method.upper(), tags, path, tool_name)
+        if reason is None:
+            return True
 
-        return True
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Filtering out {method.upper()} {path} ({tool_name}): {reason}")
+        return False
 
     def _register_tools(self) -> None:
         """Dynamically register tools based on the OpenAPI spec"""
@@ -331,6 +3359,7 @@ class SolaceSempv2McpServer:
 
         registered_count = 0
         filtered_count = 0
+        filter_seconds = 0.0
 
         for path, methods in paths.items():
             for method, details in methods.items():
@@ -343,8 +3372,10 @@ class SolaceSempv2McpServer:
                 tags = details.get('tags', [])
 
                 # Apply filtering rules
-                if not self._should_register(method, tags, path, tool_name):
-                    logger.debug(f"Filtering out API: {method} {path} with tags {tags}")
+                filter_start = time.perf_counter()
+                allowed = self._should_register(method, tags, path, tool_name)
+                filter_seconds += time.perf_counter() - filter_start
+                if not allowed:
                     filtered_count += 1
                     continue
 
@@ -385,8 +3416,15 @@ class SolaceSempv2McpServer:
                         'schema': details.get('requestBody', {}).get('content', {}).get('application/json', {}).get('schema', {})
                     }
 
-                # Build input schema
-                input_schema = self._build_input_schema(parameters, request_body)
+                # Build input schema, deferred to first use in the lean registry mode
+                input_schema = None
+                if not self.config.lean_registry:
+                    input_schema = self._build_input_schema(parameters, request_body)
+
+                default_select, object_field_count = None, 0
+                if self.config.select_profile and method.upper() == "GET" and \
+                        any(param.get('in') == 'query' and param.get('name') == 'select' for param in parameters):
+                    default_select, object_field_count = self._default_select(tool_name, details)
 
                 # Create and register the tool
                 tool = Tool(
@@ -397,14 +3435,22 @@ class SolaceSempv2McpServer:
                     method=method.upper(),
                     parameters=parameters,
                     request_body=request_body,
-                    tags=tags
+                    tags=tags,
+                    default_select=default_select,
+                    object_field_count=object_field_count
                 )
 
                 self.tools[tool_name] = tool
                 registered_count += 1
-                logger.info(f"Registered tool: {tool_name}")
+                logger.info("Registered tool: %s", tool_name)
 
-        logger.info(f"Registered {registered_count} tools, filtered out {filtered_count} APIs")
+        self.registration_stats = {
+            "registered": registered_count,
+            "filtered": filtered_count,
+            "filter_ms": round(filter_seconds * 1000, 3)
+        }
+        logger.info(f"Registered {registered_count} tools, filtered out {filtered_count} APIs "
+                    f"(filtering took {self.registration_stats['filter_ms']} ms)")
 
     def _resolve_parameter_reference(self, ref_path: str) -> Dict[str, Any]:
         """Resolve a parameter reference in the OpenAPI spec"""
@@ -423,6 +3469,42 @@ class SolaceSempv2McpServer:
 
         return current
 
+    def _default_select(self, tool_name: str, details: Dict[str, Any]) -> tuple:
+        """Derive a tool's default select projection from the response object definition.
+
+        Returns (fields, field_count); fields is None when the profile keeps every field or none.
+        """
+        schema = details.get('responses', {}).get('200', {}).get('schema', {})
+        if '$ref' in schema:
+            schema = self._resolve_parameter_reference(schema['$ref'])
+        data = schema.get('properties', {}).get('data', {})
+        data = data.get('items', data)
+        if '$ref' not in data:
+            return None, 0
+        definition_name = data['$ref'].rsplit('/', 1)[-1]
+        properties = list(self._resolve_parameter_reference(data['$ref']).get('properties', {}))
+
+        profile = self.config.select_profile
+        patterns = profile.get("tools", {}).get(tool_name)
+        if patterns is None:
+            patterns = profile.get("definitions", {}).get(definition_name, profile.get("default", []))
+        if not patterns:
+            return None, len(properties)
+
+        # Identifying attributes are always kept so that objects can still be told apart
+        identifying = set(IDENTIFYING_ATTRIBUTE_ROW.findall(details.get('description', '')))
+        selected = [name for name in properties
+                    if name in identifying or any(fnmatch.fnmatchcase(name, pattern) for pattern in patterns)]
+        if not selected or len(selected) == len(properties):
+            return None, len(properties)
+        return selected, len(properties)
+
+    def _input_schema(self, tool: Tool) -> Dict[str, Any]:
+        """Return the tool's input schema, building and memoizing it on first use"""
+        if tool.input_schema is None:
+            tool.input_schema = self._build_input_schema(tool.parameters, tool.request_body)
+        return tool.input_schema
+
     def _build_input_schema(self, parameters: List[Dict[str, Any]], request_body: Optional[Dict[str, Any]]) -> Dict[str, Any]:
         """Build JSON Schema for tool input based on OpenAPI parameters"""
         properties = {}
@@ -431,9 +3513,13 @@ class SolaceSempv2McpServer:
         # Add broker_alias parameter if multiple brokers are configured
         if len(self.config.broker_aliases) > 1:
             properties['broker_alias'] = {
-                "type": "string",
-                "description": f"The alias of the broker to target. Available aliases: {', '.join(self.config.broker_aliases)}",
-                "enum": self.config.broker_aliases
+                "description": f"The alias of the broker to target. Available aliases: {', '.join(self.config.broker_aliases)}. "
+                               f"Use '*' or a list of aliases to run the call on several brokers concurrently; "
+                               f"the result is then keyed by alias.",
+                "anyOf": [
+                    {"type": "string", "enum": self.config.broker_aliases + [FANOUT_ALL_BROKERS]},
+                    {"type": "array", "items": {"type": "string", "enum": self.config.broker_aliases}}
+                ]
             }
             if not self.config.default_broker_alias:
                 required.append('broker_alias')
@@ -459,6 +3545,19 @@ class SolaceSempv2McpServer:
                 if param_required:
                     required.append(param_name)
 
+        # Collection GETs that support SEMP cursors can be paged through by the server
+        if 'cursor' in properties:
+            properties['max_pages'] = {
+                "type": "integer",
+                "description": "Follow SEMP paging cursors server-side and return up to this many pages "
+                               "merged into one result. Enables automatic pagination."
+            }
+            properties['max_items'] = {
+                "type": "integer",
+                "description": "Follow SEMP paging cursors server-side and stop once this many objects "
+                               "have been collected. Enables automatic pagination."
+            }
+
         # Process request body if present
         if request_body:
             body_schema = request_body.get('schema', {})
@@ -483,8 +3582,44 @@ class SolaceSempv2McpServer:
     def handle_message(self, message_str: str) -> str:
         """Handle an incoming MCP message"""
         try:
-            message = json.loads(message_str)
+            message = self._decode_message(message_str)
+        except json.JSONDecodeError:
+            return self._create_error_response(None, ERROR_PARSE, "Parse error")
+
+        return self._handle_request(message)
+
+    def _decode_message(self, message_str: str) -> Any:
+        """Decode one JSON-RPC input line; raises json.JSONDecodeError on invalid input"""
+        if self.metrics is None:
+            return self.codec.loads(message_str)
+        self.metrics.inc("mcp_message_bytes_total", (("direction", "in"),), len(message_str.encode("utf-8")))
+        start = time.perf_counter()
+        try:
+            return self.codec.loads(message_str)
+        finally:
+            self.metrics.observe("mcp_json_duration_seconds", (("operation", "decode_message"),),
+                                 time.perf_counter() - start)
+
+    def _record_message(self, message: Any, response: str, seconds: float) -> None:
+        """Count one answered MCP message and its response size"""
+        method = message.get('method') if isinstance(message, dict) else None
+        labels = (("method", method if method in METERED_METHODS else "other"),)
+        self.metrics.inc("mcp_messages_total", labels)
+        self.metrics.observe("mcp_message_duration_seconds", labels, seconds)
+        self.metrics.inc("mcp_message_bytes_total", (("direction", "out"),), len(response.encode("utf-8")))
 
+    def _handle_request(self, message: Any) -> str:
+        """Handle an already decoded MCP message"""
+        if self.metrics is None:
+            return self._route_request(message)
+        start = time.perf_counter()
+        response = self._route_request(message)
+        self._record_message(message, response, time.perf_counter() - start)
+        return response
+
+    def _route_request(self, message: Any) -> str:
+        """Validate a decoded MCP message and answer it with the handler for its method"""
+        try:
             # Validate message format
             if not isinstance(message, dict) or 'jsonrpc' not in message or message['jsonrpc'] != '2.0':
                 return self._create_error_response(None, ERROR_INVALID_REQUEST, "Invalid request format")
@@ -499,14 +3634,14 @@ class SolaceSempv2McpServer:
             if method == "initialize":
                 return self._handle_initialize(msg_id, message.get('params', {}))
             elif method == "mcp.list_tools" or method == "tools/list":
-                return self._handle_list_tools(msg_id)
+                if not self.wait_for_tools():
+                    return self._registration_failed_response(msg_id)
+                return self._handle_list_tools(msg_id, message.get('params') or {})
             elif method == "mcp.call_tool" or method == "tools/call":
                 return self._handle_call_tool(msg_id, message.get('params', {}))
             else:
                 return self._create_error_response(msg_id, ERROR_METHOD_NOT_FOUND, f"Method not found: {method}")
 
-        except json.JSONDecodeError:
-            return self._create_error_response(None, ERROR_PARSE, "Parse error")
         except Exception as e:
             logger.error(f"Error handling message: {e}")
             return self._create_error_response(None, ERROR_INTERNAL, f"Internal error: {str(e)}")
@@ -538,63 +3673,162 @@ class SolaceSempv2McpServer:
 
         return json.dumps(asdict(response))
 
-    def _handle_list_tools(self, msg_id: str) -> str:
-        """Handle mcp.list_tools request"""
-        tools_list = []
+    def _invalidate_tools_list(self) -> None:
+        """Drop the serialized tools/list pages; call whenever self.tools changes"""
+        self._tools_list_pages = None
 
-        for name, tool in self.tools.items():
-            tools_list.append({
+    def _serialized_tools_list(self) -> List[str]:
+        """Return the tools/list result pages as JSON, serializing the registry once"""
+        pages = self._tools_list_pages
+        if pages is None:
+            tools_list = [{
                 "name": tool.name,
                 "description": tool.description,
-                "inputSchema": tool.input_schema,
+                "inputSchema": self._input_schema(tool),
                 "tags": tool.tags
-            })
+            } for tool in self.tools.values()]
 
-        response = McpResponse(
-            id=msg_id,
-            result={"tools": tools_list}
-        )
+            page_size = self.config.tools_list_page_size or len(tools_list) or 1
+            pages = []
+            for start in range(0, max(len(tools_list), 1), page_size):
+                result = {"tools": tools_list[start:start + page_size]}
+                if start + page_size < len(tools_list):
+                    # Cursors are opaque to clients; they are simply the next page number
+                    result["nextCursor"] = str(len(pages) + 1)
+                pages.append(json.dumps(result))
+            self._tools_list_pages = pages
+        return pages
 
-        return json.dumps(asdict(response))
+    def _handle_list_tools(self, msg_id: str, params: Optional[Dict[str, Any]] = None) -> str:
+        """Handle mcp.list_tools request"""
+        pages = self._serialized_tools_list()
+
+        cursor = (params or {}).get('cursor')
+        page_index = 0
+        if cursor is not None:
+            try:
+                page_index = int(cursor)
+            except (TypeError, ValueError):
+                page_index = -1
+            if not 0 <= page_index < len(pages):
+                return self._create_error_response(msg_id, ERROR_INVALID_PARAMS, f"Invalid cursor: {cursor}")
+
+        # Only the id differs between responses; the output matches json.dumps(asdict(McpResponse(...)))
+        return f'{{"jsonrpc": "2.0", "id": {json.dumps(msg_id)}, "result": {pages[page_index]}}}'
 
     def _handle_call_tool(self, msg_id: str, params: Dict[str, Any]) -> str:
         """Handle mcp.call_tool request"""
+        tool, arguments, error_response = self._resolve_tool_call(msg_id, params)
+        if error_response:
+            return error_response
+
+        profiled = self._begin_profile(tool, arguments)
+        access = _semp_statuses.set({}) if access_logger.isEnabledFor(logging.INFO) else None
+        start, result, response, error = time.perf_counter(), None, None, None
+        try:
+            # Dynamically invoke the tool
+            result = self._invoke_tool(tool, arguments)
+            response = self._create_tool_response(msg_id, result)
+            return response
+
+        except Exception as er:
+            error = er
+            logger.error(f"Error invoking tool {tool.name}: {er}")
+            response = self._create_error_response(msg_id, ERROR_INTERNAL, f"Error invoking tool: {str(er)}")
+            return response
+        finally:
+            if profiled is not None:
+                self.profiler.end(profiled)
+            if access is not None:
+                self._log_access(tool, arguments, time.perf_counter() - start, result, response, error)
+                _semp_statuses.reset(access)
+
+    def _log_access(self, tool: Tool, arguments: Any, seconds: float, result: Any,
+                    response: Optional[str], error: Optional[Exception]) -> None:
+        """Write one access log entry for a tool call; the writer thread serializes it.
+
+        status is ok, error, or partial for a fan-out on which some brokers failed; semp_status
+        holds the HTTP status of each broker's last SEMP response (absent when none was sent).
+        """
+        broker_alias = arguments.get('broker_alias') if isinstance(arguments, dict) else None
+        status = "error" if error is not None else "ok"
+        if error is None and isinstance(result, dict) and isinstance(arguments, dict) \
+                and self._fanout_targets(arguments):
+            summary = result.get('summary') or {}
+            if summary.get('succeeded', 0) < summary.get('requested', 0):
+                status = "partial" if summary['succeeded'] else "error"
+        entry = {
+            "tool": tool.name,
+            "broker": str(broker_alias or self.config.default_broker_alias),
+            "status": status,
+            "latency_ms": round(seconds * 1000, 3),
+            "bytes": 0 if response is None else len(response) if response.isascii() else len(response.encode("utf-8"))
+        }
+        semp_statuses = _semp_statuses.get()
+        if semp_statuses:
+            entry["semp_status"] = dict(semp_statuses)
+        if error is not None:
+            entry["error"] = str(error)[:200]
+        access_logger.info("access", extra={"access": entry})
+
+    def _begin_profile(self, tool: Tool, arguments: Any) -> Optional[ProfiledCall]:
+        """Start profiling a tool call (invocation and response encoding) when profiling selects it"""
+        if self.profiler is None:
+            return None
+        broker_alias = arguments.get('broker_alias') if isinstance(arguments, dict) else None
+        return self.profiler.begin(tool.name, str(broker_alias or self.config.default_broker_alias))
+
+    def _resolve_tool_call(self, msg_id: str, params: Dict[str, Any]) -> tuple:
+        """Look up the tool named in a call_tool request, returning (tool, arguments, error_response)"""
         tool_name = params.get('name')
         arguments = params.get('arguments', {})
 
+        if not self.wait_for_tools():
+            return None, None, self._registration_failed_response(msg_id)
         if not tool_name:
-            return self._create_error_response(msg_id, ERROR_INVALID_PARAMS, "Tool name not specified")
+            return None, None, self._create_error_response(msg_id, ERROR_INVALID_PARAMS, "Tool name not specified")
 
         tool = self.tools.get(tool_name)
         if not tool:
-            return self._create_error_response(msg_id, ERROR_METHOD_NOT_FOUND, f"Tool not found: {tool_name}")
+            return None, None, self._create_error_response(msg_id, ERROR_METHOD_NOT_FOUND, f"Tool not found: {tool_name}")
 
-        try:
-            # Dynamically invoke the tool
-            result = self._invoke_tool(tool, arguments)
+        if self.cassette is not None and self.cassette.mode == "record":
+            self.cassette.record_call(tool_name, arguments)
+        return tool, arguments, None
 
-            response = McpResponse(
-                id=msg_id,
-                result={
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": json.dumps(result, indent=2)
-                        }
-                    ]
-                }
-            )
+    def _create_tool_response(self, msg_id: str, result: Any) -> str:
+        """Wrap a tool result in an MCP response, walking the result only once per representation"""
+        if self.metrics is None:
+            return self._encode_tool_response(msg_id, result)
+        start = time.perf_counter()
+        try:
+            return self._encode_tool_response(msg_id, result)
+        finally:
+            self.metrics.observe("mcp_json_duration_seconds", (("operation", "encode_result"),),
+                                 time.perf_counter() - start)
 
-            return json.dumps(asdict(response))
+    def _encode_tool_response(self, msg_id: str, result: Any) -> str:
+        mode = self.config.structured_content
+        if mode != "false" and isinstance(result, dict):
+            if mode == "only":
+                # The result is encoded once, as JSON, rather than as an escaped string
+                content = [{"type": "text", "text": "The result is returned in structuredContent."}]
+            else:
+                content = [{"type": "text", "text": self.codec.dumps(result, pretty=self.config.json_pretty)}]
+            payload = {"content": content, "structuredContent": result}
+        elif isinstance(result, str):
+            # Text results (such as the Prometheus metrics dump) are returned as they are
+            payload = {"content": [{"type": "text", "text": result}]}
+        else:
+            payload = {"content": [{"type": "text", "text": self.codec.dumps(result, pretty=self.config.json_pretty)}]}
 
-        except Exception as er:
-            logger.error(f"Error invoking tool {tool_name}: {er}")
-            return self._create_error_response(msg_id, ERROR_INTERNAL, f"Error invoking tool: {str(er)}")
+        # Build the envelope directly; asdict() would deep-copy the whole result first
+        return self.codec.dumps({"jsonrpc": "2.0", "id": msg_id, "result": payload})
 
-    def _invoke_tool(self, tool: Tool, arguments: Dict[str, Any]) -> Dict[str, Any]:
-        """Dynamically invoke a tool by making the appropriate API request"""
+    def _prepare_request(self, tool: Tool, arguments: Dict[str, Any]) -> PreparedRequest:
+        """Resolve the target broker and build the HTTP request for a tool call; arguments are not modified"""
         # Determine the target broker
-        broker_alias = arguments.pop('broker_alias', self.config.default_broker_alias)
+        broker_alias = arguments.get('broker_alias', self.config.default_broker_alias)
         if not broker_alias:
             raise ValueError("Broker alias not specified and no default broker is configured.")
 
@@ -602,68 +3836,553 @@ class SolaceSempv2McpServer:
         if not broker_config:
             raise ValueError(f"Broker with alias '{broker_alias}' not found.")
 
-        # Prepare the URL with path parameters
-        url = self._prepare_url(broker_config.base_url, tool.path, arguments)
+        plan = tool.plan
+        if plan is None:
+            plan = tool.plan = RequestPlan.compile(tool)
 
-        # Prepare query parameters
-        query_params = self._prepare_query_params(tool.parameters, arguments)
+        params = plan.build_query_params(arguments)
+        projected = False
+        if tool.default_select and 'select' not in params:
+            params['select'] = ",".join(tool.default_select)
+            projected = True
 
-        # Prepare headers
-        headers = {"Content-Type": "application/json"}
+        return PreparedRequest(
+            broker_config=broker_config,
+            method=tool.method,
+            url=plan.build_url(broker_config.base_url, arguments),
+            params=params,
+            body=arguments.get('body') if plan.has_body else None,
+            tool=tool,
+            projected=projected
+        )
 
-        # Prepare request body if needed
-        body = None
-        if 'body' in arguments and tool.request_body:
-            body = arguments['body']
+    def _pagination_options(self, tool: Tool, arguments: Dict[str, Any]) -> Optional[PaginationOptions]:
+        """Return auto-pagination options if the caller asked for them on a cursor-capable tool"""
+        if tool.method != "GET" or ('max_pages' not in arguments and 'max_items' not in arguments):
+            return None
+        if 'cursor' not in self._input_schema(tool).get('properties', {}):
+            raise ValueError(f"Tool {tool.name} does not support automatic pagination")
 
-        # Prepare auth based on configured authentication method
-        auth = None
-        if broker_config.auth_method == "basic" and broker_config.username and broker_config.password:
-            auth = (broker_config.username, broker_config.password)
-        elif broker_config.auth_method == "bearer" and broker_config.bearer_token:
-            headers["Authorization"] = f"Bearer {broker_config.bearer_token}"
+        options = PaginationOptions(max_pages=self.config.pagination_max_pages)
+        for name in ('max_pages', 'max_items'):
+            if name in arguments:
+                try:
+                    value = int(arguments[name])
+                except (TypeError, ValueError):
+                    raise ValueError(f"{name} must be a positive integer")
+                if value < 1:
+                    raise ValueError(f"{name} must be a positive integer")
+                setattr(options, name, value)
+
+        # Never exceed the server-wide page limit
+        options.max_pages = min(options.max_pages, self.config.pagination_max_pages)
+        return options
+
+    def _fetch_pages(self, request: PreparedRequest, options: PaginationOptions,
+                     budget: Optional[ResponseBudget] = None) -> Dict[str, Any]:
+        """Follow SEMP paging cursors, streaming each page into one aggregated result"""
+        aggregator = PageAggregator(options, budget)
+        params = request.params
+
+        while True:
+            page = self._execute_request(request, params, budget.remaining if budget is not None else None)
+            cursor = aggregator.add_page(page)
+            if cursor is None:
+                return aggregator.result()
+            params = dict(request.params, cursor=cursor)
+
+    def _fanout_targets(self, arguments: Dict[str, Any]) -> Optional[List[str]]:
+        """Return the broker aliases for a fan-out call, or None for a single-broker call"""
+        broker_alias = arguments.get('broker_alias')
+        if broker_alias == FANOUT_ALL_BROKERS:
+            return list(self.config.broker_aliases)
+        if not isinstance(broker_alias, list):
+            return None
+
+        if not broker_alias:
+            raise ValueError("broker_alias list must not be empty.")
+        unknown = [alias for alias in broker_alias if alias not in self.config.brokers]
+        if unknown:
+            raise ValueError(f"Broker with alias '{unknown[0]}' not found.")
+        # Keep the caller's order but query each broker once
+        return list(dict.fromkeys(broker_alias))
+
+    def _fanout_result(self, outcomes: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """Build the combined fan-out result from per-broker outcomes"""
+        statuses = [outcome["status"] for outcome in outcomes.values()]
+        return {
+            "brokers": outcomes,
+            "summary": {
+                "requested": len(outcomes),
+                "succeeded": statuses.count("ok"),
+                "failed": statuses.count("error"),
+                "timedOut": statuses.count("timeout")
+            }
+        }
+
+    def _invoke_fanout(self, tool: Tool, arguments: Dict[str, Any], aliases: List[str]) -> Dict[str, Any]:
+        """Run one tool call on several brokers concurrently, keeping partial results"""
+        if self._fanout_executor is None:
+            self._fanout_executor = ThreadPoolExecutor(max_workers=self.config.fanout_workers,
+                                                       thread_name_prefix="mcp-fanout")
+
+        timeout = self.config.fanout_timeout
+        started: Dict[str, float] = {}
+
+        def invoke(alias: str) -> Dict[str, Any]:
+            # The broker's deadline starts when a worker picks the call up, not when it is queued
+            started[alias] = time.monotonic()
+            self._fanout_thread.active = True
+            try:
+                return self._invoke_tool(tool, dict(arguments, broker_alias=alias))
+            finally:
+                self._fanout_thread.active = False
+
+        # Queued calls wait as long as the workers make progress: one is only given up
+        # once no call of this fan-out has started or finished for the whole timeout
+        progress = time.monotonic()
+        # Each worker runs in a copy of this context, so SEMP statuses reach the call's access log entry
+        futures = {alias: self._fanout_executor.submit(contextvars.copy_context().run, invoke, alias)
+                   for alias in aliases}
+        outcomes = {}
+        pending = dict(futures)
+        while pending:
+            now = time.monotonic()
+            progress = max([progress] + list(started.values()))
+            deadlines = {}
+            for alias, future in list(pending.items()):
+                if future.done():
+                    progress = now
+                    del pending[alias]
+                    error = future.exception()
+                    outcomes[alias] = {"status": "error", "error": str(error)} if error is not None \
+                        else {"status": "ok", "result": future.result()}
+                    continue
+                deadline = started.get(alias, progress) + timeout
+                if deadline > now:
+                    deadlines[alias] = deadline
+                elif alias not in started and future.cancel():
+                    # Never started: every worker was stuck for the whole timeout
+                    del pending[alias]
+                    outcomes[alias] = {"status": "timeout",
+                                       "error": f"Not started within {timeout} seconds; all "
+                                                f"{self.config.fanout_workers} fan-out workers were busy"}
+                elif alias in started:
+                    # Still running; its worker is freed by the HTTP timeout and the result discarded
+                    del pending[alias]
+                    outcomes[alias] = {"status": "timeout", "error": f"No response within {timeout} seconds"}
+                else:
+                    # Picked up by a worker just as its queue wait ran out; its own deadline applies
+                    deadlines[alias] = now + timeout
+            if pending:
+                wait(pending.values(), timeout=min(deadlines.values()) - now, return_when=FIRST_COMPLETED)
 
-        # Make the request
+        return self._fanout_result({alias: outcomes[alias] for alias in aliases})
+
+    def _request_timeout(self) -> tuple:
+        """Return the (connect, read) timeout for a request made on the current thread"""
+        if not getattr(self._fanout_thread, "active", False):
+            return self.http_timeout
+        # A fan-out worker gives up reading once the fan-out would report a timeout anyway,
+        # so a hung broker holds a worker for at most about MCP_FANOUT_TIMEOUT per request
+        connect, read = self.http_timeout
+        return connect, min(read or self.config.fanout_timeout, self.config.fanout_timeout)
+
+    def _invoke_tool(self, tool: Tool, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """Dynamically invoke a tool by making the appropriate API request"""
+        if tool.handler is not None:
+            return tool.handler(arguments)
+
+        fanout = self._fanout_targets(arguments)
+        if fanout:
+            return self._invoke_fanout(tool, arguments, fanout)
+
+        request = self._prepare_request(tool, arguments)
+        pagination = self._pagination_options(tool, arguments)
+        budget = self._response_budget(tool)
+
+        # Make the request (headers and auth are configured once on the pooled session)
+        start = time.perf_counter()
         try:
-            response = self._make_request(tool.method, url, params=query_params, headers=headers, json=body, auth=auth)
-            return response
+            if pagination:
+                result = self._fetch_pages(request, pagination, budget)
+            else:
+                result = self._apply_budget(self._execute_request(request, request.params,
+                                                                  budget.max_bytes if budget is not None else None),
+                                            budget)
         except Exception as e:
+            self._record_tool_call(request, "error", time.perf_counter() - start)
             logger.error(f"API request failed: {e}")
             # Re-raising with a message that includes "API request failed" for test compatibility
             raise Exception(f"API request failed: {str(e)}")
+        self._record_tool_call(request, "ok", time.perf_counter() - start)
+        return result
 
-    def _prepare_url(self, base_url: str, path_template: str, arguments: Dict[str, Any]) -> str:
-        """Prepare the URL by replacing path parameters with values from arguments"""
-        url = base_url + path_template
+    def _record_tool_call(self, request: PreparedRequest, outcome: str, seconds: float) -> None:
+        """Count one single-broker tool call; a fan-out is recorded once per broker"""
+        if self.metrics is None:
+            return
+        labels = (("tool", request.tool.name), ("broker", request.broker_config.alias))
+        self.metrics.inc("mcp_tool_calls_total", labels + (("outcome", outcome),))
+        self.metrics.observe("mcp_tool_call_duration_seconds", labels, seconds)
 
-        # Replace path parameters
-        for arg_name, arg_value in arguments.items():
-            placeholder = f"{{{arg_name}}}"
-            if placeholder in url:
-                url = url.replace(placeholder, str(arg_value))
+    def _response_budget(self, tool: Tool) -> Optional[ResponseBudget]:
+        """Return a fresh response budget for one call of the tool, or None when results are unlimited"""
+        max_bytes = self.config.response_budget_rules.get(tool.name, self.config.response_budget)
+        return ResponseBudget(max_bytes, self.codec) if max_bytes else None
 
-        return url
+    def _apply_budget(self, result: Any, budget: Optional[ResponseBudget]) -> Any:
+        """Cut a single collection response to the budget; results that fit are returned unchanged"""
+        if budget is None or not isinstance(result, dict) or not isinstance(result.get('data'), list):
+            return result
 
-    def _prepare_query_params(self, parameters: List[Dict[str, Any]], arguments: Dict[str, Any]) -> Dict[str, Any]:
-        """Extract query parameters from arguments based on parameter definitions"""
-        query_params = {}
+        aggregator = PageAggregator(PaginationOptions(max_pages=1), budget)
+        aggregator.add_page(result)
+        if aggregator.truncation is None:
+            return result
+        logger.info(f"Truncated result to {aggregator.truncation['returnedItems']} items "
+                    f"({budget.used} of {budget.max_bytes} budget bytes)")
+        return aggregator.result(paginated=False)
 
-        for param in parameters:
-            if param.get('in') == 'query':
-                param_name = param.get('name')
-                if param_name in arguments:
-                    query_params[param_name] = arguments[param_name]
+    def _cache_ttl(self, tool: Optional[Tool]) -> float:
+        """Return the response cache TTL for a tool, or 0 when its responses must not be cached"""
+        if self.response_cache is None or tool is None or tool.method != "GET":
+            return 0.0
 
-        return query_params
+        ttl = self._cache_ttls.get(tool.name)
+        if ttl is None:
+            ttl = self.config.cache_ttl
+            # Most specific rule wins: tool name, then path, then tag
+            for kind, pattern, rule_ttl in sorted(self.config.cache_ttl_rules,
+                                                  key=lambda rule: CACHE_RULE_PRECEDENCE[rule[0]]):
+                if (kind == "tool" and pattern == tool.name) \
+                        or (kind == "path" and pattern in tool.path) \
+                        or (kind == "tag" and pattern in tool.tags):
+                    ttl = rule_ttl
+                    break
+            self._cache_ttls[tool.name] = ttl
+        return ttl
+
+    def _execute_request(self, request: PreparedRequest, params: Dict[str, Any],
+                         budget_bytes: Optional[int] = None) -> Dict[str, Any]:
+        """Send a prepared request, serving cacheable GETs from the response cache.
+
+        budget_bytes is what the call's response budget has left; a streamed body is read only that far.
+        """
+        ttl = self._cache_ttl(request.tool)
+        if not ttl:
+            return self._send_request(request, params, budget_bytes=budget_bytes)
+
+        key = ResponseCache.make_key(request.broker_config.alias, request.method, request.url, params)
+        hit, value, needs_refresh = self.response_cache.lookup(key)
+        if hit:
+            if needs_refresh and self.response_cache.begin_refresh(key):
+                if self._refresh_executor is None:
+                    self._refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="mcp-cache-refresh")
+                self._refresh_executor.submit(self._refresh_cache_entry, key, request, params, ttl)
+            return value
+
+        return self._send_request(request, params, cache_key=key, ttl=ttl, budget_bytes=budget_bytes)
 
-    def _make_request(self, method: str, url: str, **kwargs) -> Dict[str, Any]:
-        """Make an HTTP request to the API"""
-        logger.info(f"Making {method} request to {url}")
+    def _refresh_cache_entry(self, key: tuple, request: PreparedRequest, params: Dict[str, Any], ttl: float) -> None:
+        """Re-fetch a stale cache entry in the background"""
+        try:
+            self._send_request(request, params, cache_key=key, ttl=ttl)
+        except Exception as e:
+            logger.warning(f"Background cache refresh failed for {request.method} {request.url}: {e}")
+        finally:
+            self.response_cache.end_refresh(key)
+
+    def _send_request(self, request: PreparedRequest, params: Dict[str, Any], cache_key: Optional[tuple] = None,
+                      ttl: float = 0.0, budget_bytes: Optional[int] = None) -> Dict[str, Any]:
+        """Send a request, sharing one HTTP call between identical in-flight GETs"""
+        def fetch() -> Dict[str, Any]:
+            value = self._call_broker(request, params, budget_bytes)
+            value = self._trim_response(request, value)
+            if cache_key is not None and not self._read_partially(value):
+                self.response_cache.store(cache_key, value, ttl)
+            return value
+
+        if self.single_flight is None or request.method != "GET":
+            return fetch()
+
+        return self.single_flight.do(self._single_flight_key(request, params, budget_bytes), fetch)
+
+    @staticmethod
+    def _read_partially(value: Any) -> bool:
+        """Return True for a page whose reading stopped once the caller's response budget was spent"""
+        return isinstance(value, dict) and isinstance(value.get('meta'), dict) \
+            and value['meta'].get('truncation', {}).get('reason') == "budget"
+
+    @staticmethod
+    def _single_flight_key(request: PreparedRequest, params: Dict[str, Any], budget_bytes: Optional[int]) -> tuple:
+        """Key for sharing an in-flight request; calls with different budgets may read different parts of a page"""
+        key = ResponseCache.make_key(request.broker_config.alias, request.method, request.url, params, request.body)
+        return key if budget_bytes is None else key + (budget_bytes,)
+
+    def _call_broker(self, request: PreparedRequest, params: Dict[str, Any],
+                     budget_bytes: Optional[int] = None) -> Any:
+        """Send a request through the broker's circuit breaker, retrying transient failures of idempotent requests"""
+        breaker = self.circuit_breakers.get(request.broker_config.alias)
+        attempts = 1 + (self.config.retries if request.method in IDEMPOTENT_METHODS else 0)
+        if breaker is None and attempts == 1:
+            return self._make_request(request.broker_config, request.method, request.url,
+                                      params=params, json=request.body, keep_links=request.keep_links,
+                                      budget_bytes=budget_bytes)
+
+        for attempt in range(attempts):
+            if breaker is not None:
+                breaker.before_request()
+            try:
+                value = self._make_request(request.broker_config, request.method, request.url,
+                                           params=params, json=request.body, keep_links=request.keep_links,
+                                           budget_bytes=budget_bytes)
+            except Exception as e:
+                delay = self._after_failure(request, breaker, e, attempt, attempts)
+                time.sleep(delay)
+                continue
+            self._after_success(breaker, attempt)
+            return value
+
+    async def _call_broker_async(self, request: PreparedRequest, params: Dict[str, Any],
+                                 budget_bytes: Optional[int] = None) -> Any:
+        """asyncio variant of _call_broker()"""
+        breaker = self.circuit_breakers.get(request.broker_config.alias)
+        attempts = 1 + (self.config.retries if request.method in IDEMPOTENT_METHODS else 0)
+        if breaker is None and attempts == 1:
+            return await self._make_request_async(request.broker_config, request.method, request.url,
+                                                  params=params, body=request.body,
+                                                  keep_links=request.keep_links, budget_bytes=budget_bytes)
+
+        for attempt in range(attempts):
+            if breaker is not None:
+                breaker.before_request()
+            try:
+                value = await self._make_request_async(request.broker_config, request.method, request.url,
+                                                       params=params, body=request.body,
+                                                       keep_links=request.keep_links, budget_bytes=budget_bytes)
+            except Exception as e:
+                delay = self._after_failure(request, breaker, e, attempt, attempts)
+                await asyncio.sleep(delay)
+                continue
+            self._after_success(breaker, attempt)
+            return value
+
+    @staticmethod
+    def _classify_failure(error: Exception) -> tuple:
+        """Return (retryable, broker_failure, retry_after) for an exception raised by a broker request"""
+        # Only the modules that are loaded can have raised the error
+        requests, aiohttp, asyncio = (sys.modules.get(name) for name in ("requests", "aiohttp", "asyncio"))
+        status, headers = None, {}
+        response = getattr(error, 'response', None)
+        if requests is not None and isinstance(error, requests.exceptions.HTTPError) and response is not None:
+            status, headers = response.status_code, response.headers
+        elif isinstance(getattr(error, 'status', None), int):
+            # aiohttp.ClientResponseError
+            status, headers = error.status, getattr(error, 'headers', None) or {}
+
+        if status is None:
+            connection = isinstance(error, (ConnectionError, TimeoutError)) \
+                or (requests is not None and isinstance(error, (requests.exceptions.ConnectionError,
+                                                                requests.exceptions.Timeout,
+                                                                requests.exceptions.ChunkedEncodingError))) \
+                or (asyncio is not None and isinstance(error, asyncio.TimeoutError)) \
+                or (aiohttp is not None and isinstance(error, aiohttp.ClientConnectionError))
+            return connection, connection, None
+
+        retry_after = headers.get('Retry-After') if hasattr(headers, 'get') else None
+        retry_after = float(retry_after) if isinstance(retry_after, str) and retry_after.isdigit() else None
+        return status in TRANSIENT_STATUS_CODES, status >= 500, retry_after
+
+    def _after_failure(self, request: PreparedRequest, breaker: Optional[CircuitBreaker], error: Exception,
+                       attempt: int, attempts: int) -> float:
+        """Record a failed attempt; returns the backoff before the next one or raises if there is none"""
+        retryable, broker_failure, retry_after = self._classify_failure(error)
+        if breaker is not None:
+            breaker.record(broker_failure)
+        if not retryable or attempt + 1 >= attempts or (breaker is not None and breaker.state != breaker.CLOSED):
+            states = []
+            if attempts > 1:
+                states.append(f"attempt {attempt + 1} of {attempts}")
+                if retryable:
+                    with self._retry_lock:
+                        self.retry_stats["exhausted"] += 1
+            if breaker is not None:
+                states.append(f"circuit breaker {breaker.state}")
+            raise RuntimeError(f"{error} ({', '.join(states)})") from error
+
+        # Full jitter keeps retries from many callers from arriving in step
+        delay = random.uniform(0, min(self.config.retry_backoff_max, self.config.retry_backoff * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.config.retry_backoff_max))
+        with self._retry_lock:
+            self.retry_stats["retries"] += 1
+        logger.warning(f"{request.method} {request.url} failed ({error}); retry {attempt + 1} of "
+                       f"{attempts - 1} in {delay:.2f}s")
+        return delay
+
+    def _after_success(self, breaker: Optional[CircuitBreaker], attempt: int) -> None:
+        if breaker is not None:
+            breaker.record(False)
+        if attempt:
+            with self._retry_lock:
+                self.retry_stats["recovered"] += 1
+
+    def _trim_response(self, request: PreparedRequest, value: Any) -> Any:
+        """Drop SEMP links if configured and account for the bytes saved by trimming"""
+        strip_links = self.config.strip_links and not request.keep_links
+        if not isinstance(value, dict) or not (request.projected or strip_links):
+            return value
+
+        # Measuring the bytes saved means encoding the links and data again, so it is only done
+        # when metrics are enabled; links dropped by the streaming parser are always counted
+        measure = self.metrics is not None
+        links_bytes = 0
+        if strip_links and 'links' in value:
+            if measure:
+                links_bytes = len(self.codec.dumps(value['links']))
+            value = {key: item for key, item in value.items() if key != 'links'}
+
+        select_bytes = 0
+        if measure and request.projected and value.get('data'):
+            # Estimate: dropped fields are assumed to be as large as the kept ones on average
+            kept = len(request.tool.default_select)
+            dropped = request.tool.object_field_count - kept
+            select_bytes = len(self.codec.dumps(value['data'])) * dropped // kept
+
+        self._record_trimming(1, links_bytes, select_bytes)
+        if measure:
+            logger.info("Trimmed %s response: %d bytes of links removed, ~%d bytes saved by select",
+                        request.tool.name if request.tool else request.url, links_bytes, select_bytes)
+        return value
+
+    def _record_trimming(self, responses: int, links_bytes: int, select_bytes: int) -> None:
+        """Add trimmed responses and bytes to the trimming statistics"""
+        with self._trim_lock:
+            self.trim_stats["responses"] += responses
+            self.trim_stats["links_bytes_removed"] += links_bytes
+            self.trim_stats["select_bytes_saved_estimate"] += select_bytes
+
+    def _streams_body(self, content_length: Optional[Union[str, int]]) -> bool:
+        """Return True if a response body of this length is parsed incrementally.
+
+        Bodies of unknown length (chunked) are, as they may be large; empty bodies are not.
+        """
+        if content_length is None or not str(content_length).isdigit():
+            return True
+        length = int(content_length)
+        return (0 < self.config.streaming_threshold < length) or (0 < self.config.max_response_bytes < length)
+
+    def _streaming_parser(self, keep_links: bool = False, budget_bytes: Optional[int] = None) -> StreamingJsonParser:
+        # Links are dropped while parsing rather than decoded and removed afterwards
+        return StreamingJsonParser(max_bytes=self.config.max_response_bytes,
+                                   skip=('links',) if self.config.strip_links and not keep_links else (),
+                                   data_budget=budget_bytes, dumps=self.codec.dumps)
+
+    def _streamed_result(self, parser: StreamingJsonParser, url: str) -> Any:
+        """Finish an incremental parse and describe a body cut by the response budget or MCP_MAX_RESPONSE_BYTES"""
+        try:
+            value = parser.close()
+        except ValueError:
+            if parser.text is None:
+                raise
+            # Not JSON (an empty or plain text body), returned as the fully read path would
+            return {"text": parser.text}
+        if parser.skipped_bytes:
+            self._record_trimming(0, parser.skipped_bytes, 0)
+        logger.debug("Parsed %d response bytes from %s incrementally", parser.bytes_read, url)
+        if not parser.truncated:
+            return value
 
-        # Debug information - log all parameters
-        logger.debug(f"Request details for {method} {url}:")
+        data = value.get('data')
+        if parser.budget_spent:
+            # PageAggregator completes the description once it knows the rows kept across pages
+            logger.debug("Stopped reading %s after %d items; the response budget is spent", url, len(data))
+            value['meta'] = dict(value.get('meta') or {}, truncation={"reason": "budget"})
+            return value
+        logger.warning(f"Response from {url} exceeded MCP_MAX_RESPONSE_BYTES ({self.config.max_response_bytes}); "
+                       f"kept {len(data) if isinstance(data, list) else 0} items")
+        value['meta'] = dict(value.get('meta') or {}, truncation={
+            "reason": "max_response_bytes",
+            "maxResponseBytes": self.config.max_response_bytes,
+            "returnedItems": len(data) if isinstance(data, list) else 0,
+            "hint": "The broker response was too large to read in full. Request smaller pages with count, "
+                    "fewer fields with select, or narrow the result with where."
+        })
+        return value
 
-        # Log each parameter with special handling for sensitive data
+    def _make_request(self, broker_config: BrokerConfig, method: str, url: str, keep_links: bool = False,
+                      budget_bytes: Optional[int] = None, **kwargs) -> Dict[str, Any]:
+        """Make an HTTP request to the API over the broker's pooled session.
+
+        keep_links overrides MCP_STRIP_LINKS; budget_bytes stops a streamed body once its data rows exceed it.
+        """
+        # Messages on this path are formatted only if their level is enabled
+        logger.info("Making %s request to %s", method, url)
+        debug = logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            self._log_request_details(method, url, kwargs)
+
+        # Execute the request within the broker's rate and concurrency limits
+        if self.config.streaming_threshold or self.config.max_response_bytes:
+            # Defer reading the body until its size is known
+            kwargs['stream'] = True
+        limiter = self.broker_limiters.get(broker_config.alias)
+        if limiter is not None:
+            limiter.acquire()
+        # Held until the body has been read, so idle eviction cannot close it under a long request
+        session = self.session_pool.acquire(broker_config)
+        start, status, size = time.monotonic(), None, 0
+        try:
+            response = session.request(method, url, timeout=self._request_timeout(), **kwargs)
+            # Closing hands the connection back to the pool, or drops it if the body was not read in full,
+            # whether the body was parsed, cut short, or failed to parse or to arrive
+            with response:
+                status = response.status_code
+
+                if debug:
+                    logger.debug("Response status: %s", response.status_code)
+                    logger.debug("Response headers: %s", dict(response.headers))
+
+                if kwargs.get('stream') and response.ok \
+                        and self._streams_body(response.headers.get('Content-Length')):
+                    parser = self._streaming_parser(keep_links, budget_bytes)
+                    for chunk in response.iter_content(chunk_size=STREAMING_CHUNK_SIZE):
+                        size += len(chunk)
+                        if not parser.feed(chunk):
+                            # Stop reading; the rest of the body is discarded with the connection
+                            break
+                    return self._streamed_result(parser, url)
+
+                # Raise exception for error status codes
+                response.raise_for_status()
+
+                # Try to parse as JSON
+                decode_start = time.perf_counter()
+                try:
+                    value = self.codec.decode_response(response)
+                except json.JSONDecodeError:
+                    value = {"text": response.text}
+                size = len(response.content)
+                if self.metrics is not None:
+                    self.metrics.observe("mcp_json_duration_seconds", (("operation", "decode_response"),),
+                                         time.perf_counter() - decode_start)
+                return value
+        finally:
+            self.session_pool.release(broker_config, session)
+            elapsed = time.monotonic() - start
+            if limiter is not None:
+                limiter.release(elapsed, status)
+            if self.metrics is not None:
+                self._record_broker_request(broker_config.alias, status, elapsed, size)
+            semp_statuses = _semp_statuses.get()
+            if semp_statuses is not None:
+                semp_statuses[broker_config.alias] = status or "error"
+
+    @staticmethod
+    def _log_request_details(method: str, url: str, kwargs: Dict[str, Any]) -> None:
+        """Log the parameters of a request at DEBUG level, masking credentials"""
+        logger.debug("Request details for %s %s:", method, url)
         for param_name, param_value in kwargs.items():
             if param_name == 'auth':
                 continue
@@ -676,31 +4395,462 @@ class SolaceSempv2McpServer:
                         headers_debug['Authorization'] = f"{auth_parts[0]} ***"
                     else:
                         headers_debug['Authorization'] = "***"
-                logger.debug(f"  headers: {headers_debug}")
+                logger.debug("  headers: %s", headers_debug)
             elif param_name == 'json' and param_value:
-                # Print JSON structure but potentially mask sensitive values
-                logger.debug(f"  json: {json.dumps(param_value, indent=2)}")
+                logger.debug("  json: %s", json.dumps(param_value, indent=2))
             else:
-                logger.debug(f"  {param_name}: {param_value}")
+                logger.debug("  %s: %s", param_name, param_value)
 
-        # Execute the request
-        response = requests.request(method, url, **kwargs)
+    def _record_broker_request(self, alias: str, status: Optional[int], seconds: float, size: int) -> None:
+        """Count one SEMP HTTP request; a request that got no HTTP response is counted as status=error"""
+        self.metrics.inc("semp_requests_total", (("broker", alias), ("status", str(status or "error"))))
+        self.metrics.observe("semp_request_duration_seconds", (("broker", alias),), seconds)
+        if size:
+            self.metrics.inc("semp_response_bytes_total", (("broker", alias),), size)
 
-        # Log response details
-        logger.debug(f"Response status: {response.status_code}")
-        logger.debug(f"Response headers: {dict(response.headers)}")
+    def _write_response(self, response: str) -> None:
+        """Write one response line to stdout; writes are serialized across threads"""
+        with self._stdout_lock:
+            sys.stdout.write(response + "\n")
+            sys.stdout.flush()
 
-        # Raise exception for error status codes
-        response.raise_for_status()
+    # --- Asyncio execution engine ---
 
-        # Try to parse as JSON
+    async def handle_message_async(self, message_str: str) -> str:
+        """Handle an incoming MCP message on the asyncio engine"""
         try:
-            return response.json()
+            message = self._decode_message(message_str)
         except json.JSONDecodeError:
-            return {"text": response.text}
+            return self._create_error_response(None, ERROR_PARSE, "Parse error")
+
+        if not self._tools_ready.is_set() and not (isinstance(message, dict) and message.get('method') == "initialize"):
+            # Wait for background registration without blocking the event loop
+            await asyncio.get_running_loop().run_in_executor(None, self._tools_ready.wait)
+
+        # Only tool calls perform I/O; every other method is answered synchronously
+        if isinstance(message, dict) and message.get('jsonrpc') == '2.0' \
+                and message.get('method') in ("mcp.call_tool", "tools/call"):
+            start = time.perf_counter()
+            try:
+                response = await self._handle_call_tool_async(message.get('id'), message.get('params', {}))
+            except Exception as e:
+                logger.error(f"Error handling message: {e}")
+                response = self._create_error_response(None, ERROR_INTERNAL, f"Internal error: {str(e)}")
+            if self.metrics is not None:
+                self._record_message(message, response, time.perf_counter() - start)
+            return response
+
+        return self._handle_request(message)
+
+    async def _handle_call_tool_async(self, msg_id: str, params: Dict[str, Any]) -> str:
+        """Handle mcp.call_tool request on the asyncio engine"""
+        tool, arguments, error_response = self._resolve_tool_call(msg_id, params)
+        if error_response:
+            return error_response
+
+        access = _semp_statuses.set({}) if access_logger.isEnabledFor(logging.INFO) else None
+        start, result, response, error = time.perf_counter(), None, None, None
+        try:
+            result = await self._invoke_tool_async(tool, arguments)
+            response = self._create_tool_response(msg_id, result)
+            return response
+
+        except Exception as er:
+            error = er
+            logger.error(f"Error invoking tool {tool.name}: {er}")
+            response = self._create_error_response(msg_id, ERROR_INTERNAL, f"Error invoking tool: {str(er)}")
+            return response
+        finally:
+            if access is not None:
+                self._log_access(tool, arguments, time.perf_counter() - start, result, response, error)
+                _semp_statuses.reset(access)
+
+    async def _invoke_fanout_async(self, tool: Tool, arguments: Dict[str, Any], aliases: List[str]) -> Dict[str, Any]:
+        """Run one tool call on several brokers concurrently using the asyncio HTTP client"""
+        async def invoke(alias: str) -> Dict[str, Any]:
+            try:
+                result = await asyncio.wait_for(
+                    self._invoke_tool_async(tool, dict(arguments, broker_alias=alias)),
+                    timeout=self.config.fanout_timeout
+                )
+                return {"status": "ok", "result": result}
+            except asyncio.TimeoutError:
+                return {"status": "timeout", "error": f"No response within {self.config.fanout_timeout} seconds"}
+            except Exception as e:
+                return {"status": "error", "error": str(e)}
+
+        results = await asyncio.gather(*(invoke(alias) for alias in aliases))
+        return self._fanout_result(dict(zip(aliases, results)))
+
+    async def _invoke_tool_async(self, tool: Tool, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """Invoke a tool using the asyncio HTTP client"""
+        if tool.handler is not None:
+            return tool.handler(arguments)
+
+        fanout = self._fanout_targets(arguments)
+        if fanout:
+            return await self._invoke_fanout_async(tool, arguments, fanout)
+
+        request = self._prepare_request(tool, arguments)
+        pagination = self._pagination_options(tool, arguments)
+        budget = self._response_budget(tool)
+
+        start = time.perf_counter()
+        try:
+            if pagination:
+                result = await self._fetch_pages_async(request, pagination, budget)
+            else:
+                result = self._apply_budget(await self._execute_request_async(
+                    request, request.params, budget.max_bytes if budget is not None else None), budget)
+        except Exception as e:
+            self._record_tool_call(request, "error", time.perf_counter() - start)
+            logger.error(f"API request failed: {e}")
+            raise Exception(f"API request failed: {str(e)}")
+        self._record_tool_call(request, "ok", time.perf_counter() - start)
+        return result
+
+    async def _fetch_pages_async(self, request: PreparedRequest, options: PaginationOptions,
+                                 budget: Optional[ResponseBudget] = None) -> Dict[str, Any]:
+        """Follow SEMP paging cursors using the asyncio HTTP client"""
+        aggregator = PageAggregator(options, budget)
+        params = request.params
+
+        while True:
+            page = await self._execute_request_async(request, params,
+                                                     budget.remaining if budget is not None else None)
+            cursor = aggregator.add_page(page)
+            if cursor is None:
+                return aggregator.result()
+            params = dict(request.params, cursor=cursor)
+
+    async def _execute_request_async(self, request: PreparedRequest, params: Dict[str, Any],
+                                     budget_bytes: Optional[int] = None) -> Dict[str, Any]:
+        """Send a prepared request with the asyncio client, serving cacheable GETs from the response cache"""
+        ttl = self._cache_ttl(request.tool)
+        if not ttl:
+            return await self._send_request_async(request, params, budget_bytes=budget_bytes)
+
+        key = ResponseCache.make_key(request.broker_config.alias, request.method, request.url, params)
+        hit, value, needs_refresh = self.response_cache.lookup(key)
+        if hit:
+            if needs_refresh and self.response_cache.begin_refresh(key):
+                task = asyncio.create_task(self._refresh_cache_entry_async(key, request, params, ttl))
+                self._background_tasks.add(task)
+                task.add_done_callback(self._background_tasks.discard)
+            return value
+
+        return await self._send_request_async(request, params, cache_key=key, ttl=ttl, budget_bytes=budget_bytes)
+
+    async def _refresh_cache_entry_async(self, key: tuple, request: PreparedRequest,
+                                         params: Dict[str, Any], ttl: float) -> None:
+        """Re-fetch a stale cache entry in the background using the asyncio client"""
+        try:
+            await self._send_request_async(request, params, cache_key=key, ttl=ttl)
+        except Exception as e:
+            logger.warning(f"Background cache refresh failed for {request.method} {request.url}: {e}")
+        finally:
+            self.response_cache.end_refresh(key)
+
+    async def _send_request_async(self, request: PreparedRequest, params: Dict[str, Any],
+                                  cache_key: Optional[tuple] = None, ttl: float = 0.0,
+                                  budget_bytes: Optional[int] = None) -> Dict[str, Any]:
+        """Send a request with the asyncio client, sharing one HTTP call between identical in-flight GETs"""
+        async def fetch() -> Dict[str, Any]:
+            value = await self._call_broker_async(request, params, budget_bytes)
+            value = self._trim_response(request, value)
+            if cache_key is not None and not self._read_partially(value):
+                self.response_cache.store(cache_key, value, ttl)
+            return value
+
+        if self.single_flight is None or request.method != "GET":
+            return await fetch()
+
+        return await self.single_flight.do_async(self._single_flight_key(request, params, budget_bytes), fetch)
+
+    async def _make_request_async(self, broker_config: BrokerConfig, method: str, url: str,
+                                  params: Optional[Dict[str, Any]] = None, body: Any = None,
+                                  keep_links: bool = False, budget_bytes: Optional[int] = None) -> Dict[str, Any]:
+        """Make an HTTP request to the API over the broker's pooled aiohttp session"""
+        logger.info("Making %s request to %s", method, url)
+
+        if self.cassette is not None and self.cassette.mode == "replay":
+            return await self._replay_request_async(broker_config, method, url, params, body, keep_links, budget_bytes)
+        recording = self.cassette is not None
+
+        if self.async_session_pool is None:
+            self.async_session_pool = AsyncBrokerSessionPool(
+                pool_size=self.config.http_pool_size,
+                idle_timeout=self.config.http_pool_idle_timeout,
+                connect_timeout=self.config.http_connect_timeout,
+                read_timeout=self.config.http_read_timeout
+            )
+        session = await self.async_session_pool.get_session(broker_config)
+
+        limiter = self.broker_limiters.get(broker_config.alias)
+        if limiter is not None:
+            await limiter.acquire_async()
+        start, status, size = time.monotonic(), None, 0
+        try:
+            async with session.request(method, url, params=AsyncBrokerSessionPool.encode_params(params),
+                                       json=body) as response:
+                status = response.status
+                logger.debug("Response status: %s", response.status)
+                if recording:
+                    self.cassette.record_exchange(self._cassette_key(broker_config, method, url, params, body),
+                                                  status, response.headers.get('Content-Type'),
+                                                  time.monotonic() - start, await response.read())
+                response.raise_for_status()
+                if (self.config.streaming_threshold or self.config.max_response_bytes) and not recording \
+                        and self._streams_body(response.content_length):
+                    parser = self._streaming_parser(keep_links, budget_bytes)
+                    async for chunk in response.content.iter_chunked(STREAMING_CHUNK_SIZE):
+                        if not parser.feed(chunk):
+                            break
+                    size = parser.bytes_read
+                    return self._streamed_result(parser, url)
+                content = await response.read()
+                size = len(content)
+        except Exception as e:
+            if recording and status is None:
+                self.cassette.record_error(self._cassette_key(broker_config, method, url, params, body),
+                                           time.monotonic() - start, e)
+            raise
+        finally:
+            elapsed = time.monotonic() - start
+            if limiter is not None:
+                limiter.release(elapsed, status)
+            if self.metrics is not None:
+                self._record_broker_request(broker_config.alias, status, elapsed, size)
+            semp_statuses = _semp_statuses.get()
+            if semp_statuses is not None:
+                semp_statuses[broker_config.alias] = status or "error"
+
+        # Try to parse as JSON
+        decode_start = time.perf_counter()
+        try:
+            return self.codec.loads(content)
+        except ValueError:
+            return {"text": content.decode("utf-8", errors="replace")}
+        finally:
+            if self.metrics is not None:
+                self.metrics.observe("mcp_json_duration_seconds", (("operation", "decode_response"),),
+                                     time.perf_counter() - decode_start)
+
+    @staticmethod
+    def _cassette_key(broker_config: BrokerConfig, method: str, url: str,
+                      params: Optional[Dict[str, Any]], body: Any) -> tuple:
+        """Cassette key for a request from the asyncio engine, with the query encoded as requests would"""
+        encoded = AsyncBrokerSessionPool.encode_params(params)
+        if encoded:
+            url = f"{url}?{urllib.parse.urlencode(encoded)}"
+        return Cassette.request_key(broker_config, method, url, body)
+
+    async def _replay_request_async(self, broker_config: BrokerConfig, method: str, url: str,
+                                    params: Optional[Dict[str, Any]], body: Any,
+                                    keep_links: bool = False, budget_bytes: Optional[int] = None) -> Dict[str, Any]:
+        """Serve a request from the cassette on the asyncio engine, after its scaled recorded latency"""
+        entry = self.cassette.replay(self._cassette_key(broker_config, method, url, params, body))
+        limiter = self.broker_limiters.get(broker_config.alias)
+        if limiter is not None:
+            await limiter.acquire_async()
+        start, status, size = time.monotonic(), None, 0
+        try:
+            await asyncio.sleep(self.cassette.delay(entry))
+            response = self.cassette.build_response(entry, url)
+            status = response.status_code
+            response.raise_for_status()
+            content = response.content
+            size = len(content)
+        finally:
+            elapsed = time.monotonic() - start
+            if limiter is not None:
+                limiter.release(elapsed, status)
+            if self.metrics is not None:
+                self._record_broker_request(broker_config.alias, status, elapsed, size)
+            semp_statuses = _semp_statuses.get()
+            if semp_statuses is not None:
+                semp_statuses[broker_config.alias] = status or "error"
+
+        if (self.config.streaming_threshold or self.config.max_response_bytes) and self._streams_body(size):
+            parser = self._streaming_parser(keep_links, budget_bytes)
+            parser.feed(content)
+            return self._streamed_result(parser, url)
+        try:
+            return self.codec.loads(content)
+        except ValueError:
+            return {"text": content.decode("utf-8", errors="replace")}
+
+    async def run_async(self) -> None:
+        """Run the MCP server on the asyncio engine, reading from stdin and writing to stdout"""
+        logger.info("Starting Solace SEMPv2 MCP Server (asyncio engine)")
+        if self._tools_ready.is_set():
+            logger.info(f"Loaded {len(self.tools)} tools from OpenAPI spec")
+
+        loop = asyncio.get_running_loop()
+        in_flight = asyncio.Semaphore(self.config.dispatch_max_in_flight)
+        pending = set()
+        self.start_metrics_exporters()
+        if self.poller is not None:
+            self.poller.start()
+
+        async def process(line: str) -> None:
+            try:
+                # The event loop is single-threaded, so each write is already atomic
+                self._write_response(await self.handle_message_async(line))
+            finally:
+                in_flight.release()
+
+        try:
+            while True:
+                # A single reader thread keeps stdin handling portable across pipes, files and ttys
+                line = await loop.run_in_executor(None, sys.stdin.readline)
+                if not line:
+                    break
+                line = line.strip()
+                if not line:
+                    continue
+
+                await in_flight.acquire()
+                task = asyncio.create_task(process(line))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        finally:
+            self.stop_metrics_exporters()
+            if self.poller is not None:
+                self.poller.stop()
+            if self.async_session_pool is not None:
+                logger.info(f"Async HTTP pool statistics: {json.dumps(self.async_session_pool.stats())}")
+                await self.async_session_pool.close_all()
+            if self.cassette is not None:
+                self.cassette.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return runtime statistics for the server"""
+        stats = {
+            "http_pool": self.session_pool.stats()
+        }
+        if self.async_session_pool is not None:
+            stats["async_http_pool"] = self.async_session_pool.stats()
+        if self.response_cache is not None:
+            stats["cache"] = self.response_cache.stats()
+        if self.single_flight is not None:
+            stats["single_flight"] = self.single_flight.stats()
+        if self.config.auto_select or self.config.strip_links:
+            with self._trim_lock:
+                stats["response_trimming"] = dict(self.trim_stats)
+        if self.config.retries:
+            with self._retry_lock:
+                stats["retries"] = dict(self.retry_stats)
+        if self.circuit_breakers:
+            stats["circuit_breakers"] = {alias: breaker.stats() for alias, breaker in self.circuit_breakers.items()}
+        if self.profiler is not None:
+            stats["profiling"] = self.profiler.stats()
+        if self.cassette is not None:
+            stats["cassette"] = self.cassette.stats()
+        if self.poller is not None:
+            stats["polling"] = self.poller.stats()
+        if self.broker_limiters:
+            stats["broker_limits"] = {alias: limiter.stats() for alias, limiter in self.broker_limiters.items()}
+        if _log_queue_handler is not None:
+            stats["logging"] = {"queued": _log_queue_handler.queue.qsize(), "dropped": dropped_log_records()}
+        return stats
+
+    def start_metrics_exporters(self) -> None:
+        """Serve /metrics on MCP_METRICS_PORT and write MCP_METRICS_FILE periodically, as configured"""
+        if self.config.metrics_port and self._metrics_http_server is None:
+            # Only imported when the endpoint is enabled
+            from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+            server = self
+
+            class MetricsHandler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    if self.path.split('?')[0] not in ("/", "/metrics"):
+                        self.send_error(404)
+                        return
+                    body = server.render_metrics().encode("utf-8")
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, format, *args):
+                    # The default writes to stderr; keep scrapes in the server log instead
+                    logger.debug(f"Metrics endpoint: {format % args}")
+
+            # Bound to loopback only: the metrics name brokers and tools
+            self._metrics_http_server = ThreadingHTTPServer(("127.0.0.1", self.config.metrics_port), MetricsHandler)
+            self._metrics_http_server.daemon_threads = True
+            threading.Thread(target=self._metrics_http_server.serve_forever, name="mcp-metrics-http",
+                             daemon=True).start()
+            logger.info(f"Serving metrics on http://127.0.0.1:{self.config.metrics_port}/metrics")
+
+        if self.config.metrics_file and self._metrics_file_stop is None:
+            self._metrics_file_stop = threading.Event()
+
+            def write_periodically(stop: threading.Event) -> None:
+                while not stop.wait(self.config.metrics_file_interval):
+                    self.write_metrics_file()
+
+            threading.Thread(target=write_periodically, args=(self._metrics_file_stop,), name="mcp-metrics-file",
+                             daemon=True).start()
+            logger.info(f"Writing metrics to {self.config.metrics_file} "
+                        f"every {self.config.metrics_file_interval} seconds")
+
+    def write_metrics_file(self) -> None:
+        """Write the Prometheus text dump to MCP_METRICS_FILE atomically"""
+        path = self.config.metrics_file
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding="utf-8") as file:
+                file.write(self.render_metrics())
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Failed to write metrics file {path}: {e}")
+
+    def stop_metrics_exporters(self) -> None:
+        """Stop the metrics endpoint and write the metrics file a final time"""
+        if self._metrics_http_server is not None:
+            self._metrics_http_server.shutdown()
+            self._metrics_http_server.server_close()
+            self._metrics_http_server = None
+        if self._metrics_file_stop is not None:
+            self._metrics_file_stop.set()
+            self._metrics_file_stop = None
+            self.write_metrics_file()
+
+    def close(self) -> None:
+        """Release network resources held by the server"""
+        self.stop_metrics_exporters()
+        if self.poller is not None:
+            self.poller.stop()
+        for executor in (self._fanout_executor, self._refresh_executor):
+            if executor is not None:
+                executor.shutdown(wait=False)
+        self._fanout_executor = None
+        self._refresh_executor = None
+        self.session_pool.close_all()
+        if self.cassette is not None:
+            self.cassette.close()
+
+    def dry_run(self) -> None:
+        """Print the tool set produced by the current filter settings and how long filtering took"""
+        for tool in sorted(self.tools.values(), key=lambda t: (t.path, t.method)):
+            if tool.handler is not None:
+                continue
+            print(f"{tool.method:<7} {tool.path}  {tool.name}")
+
+        stats = self.registration_stats
+        print(f"{stats['registered']} tools registered, {stats['filtered']} operations filtered out; "
+              f"filtering took {stats['filter_ms']} ms")
 
     def _create_error_response(self, msg_id: Optional[str], code: int, message: str) -> str:
         """Create an MCP error response"""
+        if self.metrics is not None:
+            self.metrics.inc("mcp_errors_total", (("code", str(code)),))
         error = McpError(
             id=msg_id,
             error={
@@ -714,15 +4864,30 @@ class SolaceSempv2McpServer:
     def run(self) -> None:
         """Run the MCP server, reading from stdin and writing to stdout"""
         logger.info("Starting Solace SEMPv2 MCP Server")
-        logger.info(f"Loaded {len(self.tools)} tools from OpenAPI spec")
+        if self._tools_ready.is_set():
+            logger.info(f"Loaded {len(self.tools)} tools from OpenAPI spec")
 
-        # Print server info
-        server_info = {
-            "name": "solace-sempv2-mcp",
-            "version": MCP_VERSION,
-            "tools": list(self.tools.keys())
-        }
-        logger.info(f"Server info: {json.dumps(server_info)}")
+            # Print server info
+            server_info = {
+                "name": "solace-sempv2-mcp",
+                "version": MCP_VERSION,
+                "tools": list(self.tools.keys())
+            }
+            logger.info(f"Server info: {json.dumps(server_info)}")
+        self.start_metrics_exporters()
+        if self.poller is not None:
+            self.poller.start()
+
+        dispatcher = None
+        if self.config.dispatch_mode == "concurrent":
+            dispatcher = ConcurrentDispatcher(
+                self,
+                self._write_response,
+                max_workers=self.config.dispatch_workers,
+                max_in_flight=self.config.dispatch_max_in_flight
+            )
+            logger.info(f"Concurrent dispatch enabled with {self.config.dispatch_workers} workers, "
+                        f"max {self.config.dispatch_max_in_flight} in-flight requests")
 
         try:
             # Process messages from stdin
@@ -731,22 +4896,43 @@ class SolaceSempv2McpServer:
                 if not line:
                     continue
 
-                response = self.handle_message(line)
-                sys.stdout.write(response + "\n")
-                sys.stdout.flush()
+                if dispatcher:
+                    dispatcher.dispatch(line)
+                else:
+                    self._write_response(self.handle_message(line))
 
         except KeyboardInterrupt:
             logger.info("Server shutting down")
             sys.exit(0)
+        finally:
+            if dispatcher:
+                # Let in-flight tool calls finish and write their responses
+                dispatcher.shutdown()
+            logger.info(f"HTTP pool statistics: {json.dumps(self.session_pool.stats())}")
+            self.close()
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Solace SEMPv2 monitoring MCP server")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Print the tools selected by the MCP_API_* filters and exit")
+    args = parser.parse_args()
+
     try:
         # Create configuration object
         config = ServerConfig()
 
-        # Create and run the server
-        server = SolaceSempv2McpServer(config)
-        server.run()
+        if args.dry_run:
+            # Always filter the spec itself rather than reading a cached registry
+            config.registry_cache_dir = ""
+            SolaceSempv2McpServer(config).dry_run()
+            sys.exit(0)
+
+        # Create and run the server; initialize is answered while the tools are still being registered
+        server = SolaceSempv2McpServer(config, background_registration=True)
+        if config.engine == "async":
+            asyncio.run(server.run_async())
+        else:
+            server.run()
     except Exception as e:
         logger.critical(f"Server startup failed: {e}")
         sys.exit(1)
@@ -83,8 +83,41 @@ DUMMY_OAS_SPEC = {
             "get": {
                 "operationId": "getMsgVpnQueues",
                 "summary": "Get all queues across message VPNs",
+                "description": "Get a list of Queue objects.\n\n\nAttribute|Identifying|Deprecated\n:---|:---:|:---:\n"
+                               "msgVpnName|x|\nqueueName|x|\nvirtualRouter||x\n",
                 "tags": ["msgVpns", "queues", "read"],
-                "responses": {"200": {"description": "Success"}}
+                "parameters": [
+                    {"name": "count", "in": "query", "type": "integer"},
+                    {"name": "cursor", "in": "query", "type": "string"},
+                    {"name": "where", "in": "query", "type": "array", "items": {"type": "string"}},
+                    {"name": "select", "in": "query", "type": "array", "items": {"type": "string"},
+                     "collectionFormat": "csv"}
+                ],
+                "responses": {"200": {"description": "Success",
+                                      "schema": {"$ref": "#/definitions/MsgVpnQueuesResponse"}}}
+            }
+        }
+    },
+    "definitions": {
+        "MsgVpnQueuesResponse": {
+            "type": "object",
+            "properties": {
+                "data": {"type": "array", "items": {"$ref": "#/definitions/MsgVpnQueue"}},
+                "links": {"type": "array", "items": {"type": "object"}},
+                "meta": {"type": "object"}
+            }
+        },
+        "MsgVpnQueue": {
+            "type": "object",
+            "properties": {
+                "accessType": {"type": "string"},
+                "bindCount": {"type": "integer"},
+                "deletedMsgCount": {"type": "integer"},
+                "msgSpoolUsage": {"type": "integer"},
+                "msgVpnName": {"type": "string"},
+                "queueName": {"type": "string"},
+                "redeliveredMsgCount": {"type": "integer"},
+                "virtualRouter": {"type": "string"}
             }
         }
     }
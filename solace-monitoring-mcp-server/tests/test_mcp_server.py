@@ -11,14 +11,22 @@ These tests verify the functionality of the SolaceSempv2McpServer class, includi
 """
 
 import unittest
+import io
 import os
 import json
+import threading
+import time
+import asyncio
+import tempfile
+import shutil
 import requests
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 
 from solace_sempv2_mcp_server import (
     SolaceSempv2McpServer, ServerConfig, LoggingConfig, 
-    Tool, McpResponse, McpError, setup_logging
+    Tool, McpResponse, McpError, setup_logging, ConcurrentDispatcher,
+    AsyncBrokerSessionPool, ResponseCache, JsonCodec, StreamingJsonParser, BrokerLimiter, MetricsRegistry, Cassette,
+    DroppingQueueHandler, RingBuffer, PageAggregator, PaginationOptions, PatternMatcher, orjson
 )
 
 # --- Test Fixtures ---
@@ -54,9 +62,50 @@ class BaseTestCase(unittest.TestCase):
         os.environ["MCP_API_EXCLUDE_TAGS"] = ""
         os.environ["MCP_API_INCLUDE_PATHS"] = ""
         os.environ["MCP_API_EXCLUDE_PATHS"] = ""
+        os.environ["MCP_API_INCLUDE_TOOLS"] = ""
+        os.environ["MCP_API_EXCLUDE_TOOLS"] = ""
         os.environ["MCP_LOG_DISABLE"] = "true"  # Disable logging during tests
         os.environ["MCP_LOG_FILE"] = ""
         os.environ["MCP_LOG_LEVEL"] = "INFO"
+        os.environ["MCP_LOG_QUEUE"] = "true"
+        os.environ["MCP_LOG_QUEUE_SIZE"] = "10000"
+        os.environ["MCP_ACCESS_LOG"] = ""
+        os.environ["MCP_REGISTRY_CACHE"] = "false"  # Always build the registry from the spec
+        os.environ["MCP_LEAN_REGISTRY"] = "false"
+        os.environ["MCP_ENGINE"] = "sync"
+        os.environ["MCP_JSON_CODEC"] = "json"  # Mocked responses only implement .json()
+        os.environ["MCP_JSON_PRETTY"] = "false"
+        os.environ["MCP_STRUCTURED_CONTENT"] = "false"
+        os.environ["MCP_AUTO_SELECT"] = "false"
+        os.environ["MCP_SELECT_PROFILE"] = ""
+        os.environ["MCP_STRIP_LINKS"] = "false"
+        os.environ["MCP_RESPONSE_BUDGET"] = "0"
+        os.environ["MCP_RESPONSE_BUDGET_RULES"] = ""
+        os.environ["MCP_STREAMING_THRESHOLD"] = "0"  # Mocked responses have no body to stream
+        os.environ["MCP_MAX_RESPONSE_BYTES"] = "0"
+        os.environ["MCP_BROKER_RATE_LIMIT"] = "0"
+        os.environ["MCP_BROKER_MAX_CONCURRENCY"] = "0"
+        os.environ["MCP_HTTP_CONNECT_TIMEOUT"] = "5"
+        os.environ["MCP_HTTP_READ_TIMEOUT"] = "30"
+        os.environ["MCP_RETRIES"] = "0"
+        os.environ["MCP_RETRY_BACKOFF"] = "0"  # No real waiting in tests that enable retries
+        os.environ["MCP_CIRCUIT_BREAKER_THRESHOLD"] = "0"
+        os.environ["MCP_CIRCUIT_BREAKER_COOLDOWN"] = "30"
+        os.environ["MCP_METRICS"] = "false"
+        os.environ["MCP_METRICS_PORT"] = "0"
+        os.environ["MCP_METRICS_FILE"] = ""
+        os.environ["MCP_POLL_PATHS"] = ""
+        os.environ["MCP_POLL_INTERVAL"] = "10"
+        os.environ["MCP_POLL_HISTORY"] = "360"
+        os.environ["MCP_POLL_FIELDS"] = ""
+        os.environ["MCP_PROFILE_DIR"] = ""
+        os.environ["MCP_PROFILE_SAMPLE_RATE"] = "0"
+        os.environ["MCP_PROFILE_SLOW_MS"] = "0"
+        os.environ["MCP_PROFILE_FORMAT"] = "collapsed"
+        os.environ["MCP_PROFILE_INTERVAL_MS"] = "1"
+        os.environ["MCP_CASSETTE_MODE"] = "off"
+        os.environ["MCP_CASSETTE"] = ""
+        os.environ["MCP_CASSETTE_TIME_SCALE"] = "1"
         
     def tearDown(self):
         """Tear down after test methods."""
@@ -280,11 +329,57 @@ class TestToolRegistration(BaseTestCase):
         self.assertIn("getBrokerConfig", server.tools)
         self.assertIn("getMsgVpnQueues", server.tools)
 
+    def test_filter_tool_glob(self):
+        """Test including tools by glob pattern alongside exact names."""
+        os.environ["MCP_API_INCLUDE_TOOLS"] = "get*s,deleteItem"
+        server = self.mock_server_setup(mock_load_spec=True)
+
+        self.assertEqual(sorted(server.tools), ["deleteItem", "getItems", "getMsgVpnQueues"])
+
+    def test_filter_path_glob_and_regex(self):
+        """Test that path globs match the whole path and 're:' patterns match anywhere."""
+        os.environ["MCP_API_INCLUDE_PATHS"] = "/items/*"
+        server = self.mock_server_setup(mock_load_spec=True)
+        self.assertEqual(sorted(server.tools), ["deleteItem", "getItemById"])
+
+        os.environ["MCP_API_INCLUDE_PATHS"] = ""
+        os.environ["MCP_API_EXCLUDE_PATHS"] = r"re:^/(config|msgVpns)/"
+        server = self.mock_server_setup(mock_load_spec=True)
+        self.assertEqual(sorted(server.tools), ["createItem", "deleteItem", "getItemById", "getItems"])
+
+    def test_filter_invalid_regex(self):
+        """Test that an invalid regex is a configuration error naming the pattern."""
+        os.environ["MCP_API_EXCLUDE_TOOLS"] = "getItems,re:get(Items"
+        with self.assertRaisesRegex(ValueError, r"'re:get\(Items'"):
+            self.mock_server_setup(mock_load_spec=True)
+
+    def test_filter_regexes_keep_flags_and_backreferences(self):
+        """Test that each regex keeps its own inline flags and group numbers next to other patterns."""
+        matcher = PatternMatcher(["get*", r"re:^(create)Item$", r"re:(?i)^DELETE", r"re:^(\w)\w*\1$"],
+                                 substring=False)
+        self.assertTrue(matcher.matches("deleteItem"))
+        self.assertTrue(matcher.matches("getItems"))
+        self.assertTrue(matcher.matches("abca"))
+        self.assertFalse(matcher.matches("abcd"))
+
+    def test_dry_run_report(self):
+        """Test that the dry run prints the selected tools and the filtering time."""
+        os.environ["MCP_API_INCLUDE_METHODS"] = "GET"
+        server = self.mock_server_setup(mock_load_spec=True)
+
+        with patch('sys.stdout', new_callable=io.StringIO) as stdout:
+            server.dry_run()
+
+        lines = stdout.getvalue().splitlines()
+        self.assertEqual(len(lines), 5)
+        self.assertIn("getItemById", lines[2])
+        self.assertTrue(lines[-1].startswith("4 tools registered, 2 operations filtered out; filtering took"))
+
 
 class TestApiInvocation(BaseTestCase):
     """Tests for API invocation functionality."""
     
-    @patch('requests.request')
+    @patch('requests.Session.request')
     def test_invoke_get_no_params(self, mock_request):
         """Test invoking a simple GET tool with no parameters."""
         # Setup mock
@@ -306,7 +401,7 @@ class TestApiInvocation(BaseTestCase):
         
         self.assertEqual(result, {"data": {"name": "broker"}})
     
-    @patch('requests.request')
+    @patch('requests.Session.request')
     def test_invoke_get_with_path_param(self, mock_request):
         """Test invoking a GET tool with a path parameter."""
         # Setup mock
@@ -328,7 +423,7 @@ class TestApiInvocation(BaseTestCase):
         
         self.assertEqual(result, {"data": {"id": "item123"}})
     
-    @patch('requests.request')
+    @patch('requests.Session.request')
     def test_invoke_post_with_body(self, mock_request):
         """Test invoking a POST tool with a request body."""
         # Setup mock
@@ -359,7 +454,7 @@ class TestApiInvocation(BaseTestCase):
         
         self.assertEqual(result, {"data": {"id": "newItem"}})
     
-    @patch('requests.request')
+    @patch('requests.Session.request')
     def test_invoke_with_bearer_auth(self, mock_request):
         """Test invoking a tool with bearer token authentication."""
         # Setup for bearer auth
@@ -382,11 +477,13 @@ class TestApiInvocation(BaseTestCase):
         # Verify request was made correctly
         call_kwargs = self.verify_request_basics(
             mock_request, "GET", "http://sample-solace:8080/config/broker")
-        self.assertEqual(call_kwargs["headers"]["Authorization"], "Bearer my-token")
+        session = server.session_pool.get_session(server.config.brokers["default"])
+        self.assertEqual(session.headers["Authorization"], "Bearer my-token")
+        self.assertIsNone(session.auth)
         
         self.assertEqual(result, {"data": {"name": "broker"}})
     
-    @patch('requests.request')
+    @patch('requests.Session.request')
     def test_invoke_api_error(self, mock_request):
         """Test handling HTTP errors when invoking a tool."""
         # Setup for HTTP error
@@ -404,37 +501,2070 @@ class TestApiInvocation(BaseTestCase):
         
         self.assertIn("API request failed", str(context.exception))
 
+    def test_path_values_are_url_encoded(self):
+        """Test that path parameter values containing '/' or '#' are encoded."""
+        server = self.mock_server_setup(mock_load_spec=True)
+
+        request = server._prepare_request(server.tools["getItemById"], {"itemId": "q/orders#1"})
 
-class TestMcpHandlers(BaseTestCase):
-    """Tests for MCP message handlers."""
-    
-    def test_handle_initialize(self):
-        """Test handling an initialize request."""
+        self.assertEqual(request.url, "http://sample-solace:8080/items/q%2Forders%231")
+
+    def test_missing_path_parameter(self):
+        """Test that a missing path parameter is reported instead of sent as a placeholder."""
         server = self.mock_server_setup(mock_load_spec=True)
-        
-        msg_id = "test-id"
-        response_str = server._handle_initialize(msg_id, {})
-        response = json.loads(response_str)
-        
-        self.assertEqual(response["id"], msg_id)
-        self.assertEqual(response["jsonrpc"], "2.0")
-        self.assertTrue("result" in response)
-        self.assertEqual(response["result"]["protocolVersion"], "2024-11-05")
-    
-    def test_handle_list_tools(self):
-        """Test handling a list_tools request."""
+
+        with self.assertRaises(ValueError):
+            server._prepare_request(server.tools["getItemById"], {})
+
+    def test_prepare_request_does_not_modify_arguments(self):
+        """Test that the caller's arguments are left untouched."""
         server = self.mock_server_setup(mock_load_spec=True)
-        
-        msg_id = "test-id"
-        response_str = server._handle_list_tools(msg_id)
-        response = json.loads(response_str)
-        
-        self.assertEqual(response["id"], msg_id)
-        self.assertTrue("result" in response)
-        self.assertTrue("tools" in response["result"])
-        self.assertEqual(len(response["result"]["tools"]), 6)  # Should match number of tools registered
-    
-    @patch('requests.request')
+        arguments = {"broker_alias": "default", "count": 5, "where": ["a==1", "b==2"], "max_pages": 2}
+
+        request = server._prepare_request(server.tools["getMsgVpnQueues"], arguments)
+
+        self.assertEqual(arguments, {"broker_alias": "default", "count": 5, "where": ["a==1", "b==2"], "max_pages": 2})
+        # Array query parameters use the swagger default csv collection format
+        self.assertEqual(request.params, {"count": 5, "where": "a==1,b==2"})
+
+
+class TestSessionPool(BaseTestCase):
+    """Tests for the per-broker keep-alive session pool."""
+
+    @patch('requests.Session.request')
+    def test_session_reused_across_calls(self, mock_request):
+        """Test that repeated calls to a broker share one session."""
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {"data": {}}
+        mock_request.return_value = mock_response
+
+        server = self.mock_server_setup(mock_load_spec=True)
+        tool = server.tools["getBrokerConfig"]
+        server._invoke_tool(tool, {})
+        server._invoke_tool(tool, {})
+
+        stats = server.session_pool.stats()
+        self.assertEqual(mock_request.call_count, 2)
+        self.assertEqual(stats["sessions_created"], 1)
+        self.assertEqual(stats["sessions_active"], 1)
+        self.assertEqual(stats["brokers"]["default"]["requests"], 2)
+
+    def test_basic_auth_configured_on_session(self):
+        """Test that basic auth is applied once when the session is created."""
+        server = self.mock_server_setup(mock_load_spec=True)
+        session = server.session_pool.get_session(server.config.brokers["default"])
+
+        self.assertEqual(session.auth, ("test_user", "test_pass"))
+        self.assertEqual(session.headers["Content-Type"], "application/json")
+        self.assertIs(server.session_pool.get_session(server.config.brokers["default"]), session)
+
+    def test_idle_session_eviction(self):
+        """Test that sessions idle longer than the timeout are replaced."""
+        os.environ["MCP_HTTP_POOL_IDLE_TIMEOUT"] = "30"
+        try:
+            server = self.mock_server_setup(mock_load_spec=True)
+        finally:
+            del os.environ["MCP_HTTP_POOL_IDLE_TIMEOUT"]
+        broker = server.config.brokers["default"]
+
+        with patch('solace_sempv2_mcp_server.time.monotonic', return_value=1000.0):
+            first = server.session_pool.get_session(broker)
+        with patch('solace_sempv2_mcp_server.time.monotonic', return_value=1031.0):
+            second = server.session_pool.get_session(broker)
+
+        self.assertIsNot(first, second)
+        stats = server.session_pool.stats()
+        self.assertEqual(stats["sessions_created"], 2)
+        self.assertEqual(stats["sessions_evicted"], 1)
+
+    def test_session_in_use_not_evicted(self):
+        """Test that a session held by a long request survives the idle timeout and idles from its release."""
+        os.environ["MCP_HTTP_POOL_IDLE_TIMEOUT"] = "30"
+        try:
+            server = self.mock_server_setup(mock_load_spec=True)
+        finally:
+            del os.environ["MCP_HTTP_POOL_IDLE_TIMEOUT"]
+        pool, broker = server.session_pool, server.config.brokers["default"]
+
+        with patch('solace_sempv2_mcp_server.time.monotonic', return_value=1000.0):
+            held = pool.acquire(broker)
+        with patch('solace_sempv2_mcp_server.time.monotonic', return_value=1100.0):
+            self.assertIs(pool.get_session(broker), held)
+            pool.release(broker, held)
+        with patch('solace_sempv2_mcp_server.time.monotonic', return_value=1120.0):
+            self.assertIs(pool.get_session(broker), held)
+
+        self.assertEqual(pool.stats()["sessions_evicted"], 0)
+        self.assertEqual(pool._sessions["default"].in_use, 0)
+
+
+class TestConcurrentDispatch(BaseTestCase):
+    """Tests for the concurrent stdio request dispatcher."""
+
+    def test_slow_call_does_not_block_list_tools(self):
+        """Test that tools/list is answered while a tools/call is still running."""
+        server = self.mock_server_setup(mock_load_spec=True)
+        release = threading.Event()
+        started = threading.Event()
+
+        def slow_invoke(tool, arguments):
+            started.set()
+            release.wait(5)
+            return {"data": {"name": "broker"}}
+
+        server._invoke_tool = slow_invoke
+        written = []
+        dispatcher = ConcurrentDispatcher(server, written.append, max_workers=2, max_in_flight=2)
+
+        dispatcher.dispatch(json.dumps({"jsonrpc": "2.0", "id": 1, "method": "tools/call",
+                                        "params": {"name": "getBrokerConfig", "arguments": {}}}))
+        self.assertTrue(started.wait(5))
+        dispatcher.dispatch(json.dumps({"jsonrpc": "2.0", "id": 2, "method": "tools/list"}))
+
+        self.assertEqual(len(written), 1)
+        self.assertEqual(json.loads(written[0])["id"], 2)
+
+        release.set()
+        dispatcher.shutdown()
+
+        self.assertEqual([json.loads(r)["id"] for r in written], [2, 1])
+        self.assertIn("content", json.loads(written[1])["result"])
+
+    def test_parse_error_is_reported(self):
+        """Test that malformed input yields a parse error without reaching the pool."""
+        server = self.mock_server_setup(mock_load_spec=True)
+        written = []
+        dispatcher = ConcurrentDispatcher(server, written.append)
+
+        dispatcher.dispatch("{not json")
+        dispatcher.shutdown()
+
+        self.assertEqual(json.loads(written[0])["error"]["code"], -32700)
+
+
+class TestAsyncEngine(BaseTestCase):
+    """Tests for the asyncio execution engine."""
+
+    def test_handle_message_async_call_tool(self):
+        """Test that tools/call is routed through the async request path."""
+        server = self.mock_server_setup(mock_load_spec=True)
+        server._make_request_async = AsyncMock(return_value={"data": {"id": "item123"}})
+
+        message = json.dumps({"jsonrpc": "2.0", "id": 7, "method": "tools/call",
+                              "params": {"name": "getItemById", "arguments": {"itemId": "item123"}}})
+        response = json.loads(asyncio.run(server.handle_message_async(message)))
+
+        self.assertEqual(response["id"], 7)
+        self.assertIn("item123", response["result"]["content"][0]["text"])
+        call_args = server._make_request_async.call_args[0]
+        self.assertEqual(call_args[1:], ("GET", "http://sample-solace:8080/items/item123"))
+
+    def test_handle_message_async_other_methods(self):
+        """Test that non-tool methods behave as on the synchronous engine."""
+        server = self.mock_server_setup(mock_load_spec=True)
+        message = json.dumps({"jsonrpc": "2.0", "id": 1, "method": "tools/list"})
+
+        self.assertEqual(asyncio.run(server.handle_message_async(message)), server.handle_message(message))
+
+    def test_handle_message_async_api_error(self):
+        """Test that HTTP failures become tool errors."""
+        server = self.mock_server_setup(mock_load_spec=True)
+        server._make_request_async = AsyncMock(side_effect=RuntimeError("boom"))
+
+        message = json.dumps({"jsonrpc": "2.0", "id": 3, "method": "tools/call",
+                              "params": {"name": "getBrokerConfig", "arguments": {}}})
+        response = json.loads(asyncio.run(server.handle_message_async(message)))
+
+        self.assertIn("API request failed: boom", response["error"]["message"])
+
+    def test_encode_params(self):
+        """Test query parameter encoding for aiohttp."""
+        encoded = AsyncBrokerSessionPool.encode_params(
+            {"count": 10, "where": ["a==1", "b==2"], "flag": True, "cursor": None})
+        self.assertEqual(encoded, [("count", "10"), ("where", "a==1"), ("where", "b==2"), ("flag", "true")])
+
+    def test_session_of_previous_loop_closed(self):
+        """Test that a session replaced because the event loop changed is closed, on its own loop if it runs."""
+        pool = AsyncBrokerSessionPool()
+        broker = self.mock_server_setup(mock_load_spec=True).config.brokers["default"]
+        other_loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=other_loop.run_forever, daemon=True)
+        thread.start()
+        self.addCleanup(other_loop.close)
+        self.addCleanup(thread.join)
+        self.addCleanup(other_loop.call_soon_threadsafe, other_loop.stop)
+
+        first = asyncio.run(pool.get_session(broker))
+        second = asyncio.run_coroutine_threadsafe(pool.get_session(broker), other_loop).result(5)
+        self.assertTrue(first.closed)
+        third = asyncio.run(pool.get_session(broker))
+        asyncio.run_coroutine_threadsafe(asyncio.sleep(0), other_loop).result(5)
+
+        self.assertTrue(second.closed)
+        self.assertFalse(third.closed)
+        self.assertEqual(pool.stats()["sessions_created"], 3)
+        asyncio.run(pool.close_all())
+
+
+class TestPagination(BaseTestCase):
+    """Tests for server-side SEMP cursor pagination."""
+
+    @staticmethod
+    def make_page(start, size, cursor=None):
+        page = {
+            "data": [{"queueName": f"q{i}"} for i in range(start, start + size)],
+            "links": [{"uri": f"/queues/q{i}"} for i in range(start, start + size)],
+            "meta": {"count": 10, "responseCode": 200}
+        }
+        if cursor:
+            page["meta"]["paging"] = {"cursorQuery": cursor, "nextPageUri": f"http://broker/queues?cursor={cursor}"}
+        return page
+
+    def test_schema_exposes_pagination_arguments(self):
+        """Test that only cursor-capable tools get max_pages/max_items."""
+        server = self.mock_server_setup(mock_load_spec=True)
+
+        self.assertIn("max_items", server.tools["getMsgVpnQueues"].input_schema["properties"])
+        self.assertIn("max_pages", server.tools["getMsgVpnQueues"].input_schema["properties"])
+        self.assertNotIn("max_items", server.tools["getItems"].input_schema["properties"])
+
+    def test_follows_cursors_until_last_page(self):
+        """Test that all pages are merged when no item limit is reached."""
+        server = self.mock_server_setup(mock_load_spec=True)
+        server._make_request = MagicMock(side_effect=[
+            self.make_page(0, 3, "c1"), self.make_page(3, 3, "c2"), self.make_page(6, 2)])
+
+        result = server._invoke_tool(server.tools["getMsgVpnQueues"], {"count": 3, "max_pages": 10})
+
+        self.assertEqual(len(result["data"]), 8)
+        self.assertEqual(len(result["links"]), 8)
+        self.assertTrue(result["meta"]["pagination"]["complete"])
+        self.assertNotIn("paging", result["meta"])
+        cursors = [c.kwargs["params"].get("cursor") for c in server._make_request.call_args_list]
+        self.assertEqual(cursors, [None, "c1", "c2"])
+
+    def test_stops_early_at_max_items(self):
+        """Test that fetching stops once enough items are collected."""
+        server = self.mock_server_setup(mock_load_spec=True)
+        server._make_request = MagicMock(side_effect=[
+            self.make_page(0, 3, "c1"), self.make_page(3, 3, "c2"), self.make_page(6, 3, "c3")])
+
+        result = server._invoke_tool(server.tools["getMsgVpnQueues"], {"max_items": 5})
+
+        self.assertEqual(server._make_request.call_count, 2)
+        self.assertEqual([q["queueName"] for q in result["data"]], ["q0", "q1", "q2", "q3", "q4"])
+        self.assertFalse(result["meta"]["pagination"]["complete"])
+        self.assertEqual(result["meta"]["pagination"]["stopReason"], "max_items")
+        # Following c2 would skip q5, the row dropped from the second page
+        self.assertNotIn("paging", result["meta"])
+        self.assertEqual(result["meta"]["truncation"],
+                         {"reason": "max_items", "returnedItems": 5, "omittedItems": 1, "totalItems": 10})
+
+    def test_max_items_on_page_boundary_keeps_cursor(self):
+        """Test that the cursor is kept when max_items ends exactly at the end of a page."""
+        server = self.mock_server_setup(mock_load_spec=True)
+        server._make_request = MagicMock(side_effect=[self.make_page(0, 3, "c1"), self.make_page(3, 3, "c2")])
+
+        result = server._invoke_tool(server.tools["getMsgVpnQueues"], {"max_items": 6})
+
+        self.assertEqual(result["meta"]["pagination"]["stopReason"], "max_items")
+        self.assertEqual(result["meta"]["paging"]["cursorQuery"], "c2")
+        self.assertNotIn("truncation", result["meta"])
+
+    def test_max_items_inside_last_page_not_complete(self):
+        """Test that rows dropped from the last page are reported rather than called complete."""
+        aggregator = PageAggregator(PaginationOptions(max_items=3, max_pages=10))
+
+        self.assertIsNone(aggregator.add_page({"data": [1, 2, 3, 4, 5], "meta": {}}))
+
+        result = aggregator.result()
+        self.assertEqual(result["data"], [1, 2, 3])
+        self.assertEqual(result["meta"]["pagination"], {"pages": 1, "items": 3, "complete": False,
+                                                        "stopReason": "max_items"})
+        self.assertEqual(result["meta"]["truncation"]["omittedItems"], 2)
+
+        aggregator = PageAggregator(PaginationOptions(max_items=3, max_pages=10))
+        aggregator.add_page({"data": [1, 2, 3], "meta": {}})
+        self.assertTrue(aggregator.result()["meta"]["pagination"]["complete"])
+
+    def test_stops_at_max_pages(self):
+        """Test that fetching stops after max_pages pages."""
+        server = self.mock_server_setup(mock_load_spec=True)
+        server._make_request = MagicMock(side_effect=[self.make_page(0, 2, "c1"), self.make_page(2, 2, "c2")])
+
+        result = server._invoke_tool(server.tools["getMsgVpnQueues"], {"max_pages": 2})
+
+        self.assertEqual(len(result["data"]), 4)
+        self.assertEqual(result["meta"]["pagination"]["stopReason"], "max_pages")
+
+    def test_invalid_limit_rejected(self):
+        """Test that non-positive limits are rejected."""
+        server = self.mock_server_setup(mock_load_spec=True)
+
+        with self.assertRaises(ValueError):
+            server._invoke_tool(server.tools["getMsgVpnQueues"], {"max_items": 0})
+
+
+class TestBrokerFanout(BaseTestCase):
+    """Tests for running one tool call across several brokers."""
+
+    FANOUT_ENV = {
+        "SOLACE_BROKERS_ALIAS": "a,b,c",
+        "SOLACE_BROKER_DEFAULT": "a",
+        "SOLACE_SEMPV2_BASE_URL_A": "http://broker-a:8080",
+        "SOLACE_SEMPV2_BASE_URL_B": "http://broker-b:8080",
+        "SOLACE_SEMPV2_BASE_URL_C": "http://broker-c:8080",
+        "MCP_FANOUT_TIMEOUT": "0.5",
+    }
+
+    def setUp(self):
+        super().setUp()
+        os.environ.update(self.FANOUT_ENV)
+        self.release = threading.Event()
+
+    def tearDown(self):
+        self.release.set()
+        for name in self.FANOUT_ENV:
+            os.environ.pop(name, None)
+        super().tearDown()
+
+    def fake_request(self, broker_config, method, url, **kwargs):
+        if broker_config.alias == "b":
+            raise requests.exceptions.HTTPError("503 Server Error")
+        if broker_config.alias == "c":
+            self.release.wait(5)
+        return {"data": {"url": url}}
+
+    def test_schema_accepts_wildcard_and_list(self):
+        """Test that broker_alias accepts '*' and lists of aliases."""
+        server = self.mock_server_setup(mock_load_spec=True)
+        schema = server.tools["getBrokerConfig"].input_schema["properties"]["broker_alias"]
+
+        self.assertIn("*", schema["anyOf"][0]["enum"])
+        self.assertEqual(schema["anyOf"][1]["items"]["enum"], ["a", "b", "c"])
+
+    def test_fanout_all_brokers_with_partial_results(self):
+        """Test that '*' queries every broker and reports errors and timeouts per broker."""
+        server = self.mock_server_setup(mock_load_spec=True)
+        server._make_request = self.fake_request
+
+        result = server._invoke_tool(server.tools["getBrokerConfig"], {"broker_alias": "*"})
+
+        self.assertEqual(result["brokers"]["a"]["status"], "ok")
+        self.assertEqual(result["brokers"]["a"]["result"]["data"]["url"], "http://broker-a:8080/config/broker")
+        self.assertEqual(result["brokers"]["b"]["status"], "error")
+        self.assertIn("503", result["brokers"]["b"]["error"])
+        self.assertEqual(result["brokers"]["c"]["status"], "timeout")
+        self.assertEqual(result["summary"], {"requested": 3, "succeeded": 1, "failed": 1, "timedOut": 1})
+        server.close()
+
+    def test_fanout_deadline_starts_when_call_runs(self):
+        """Test that waiting for a worker does not count against a broker's timeout."""
+        os.environ["MCP_FANOUT_WORKERS"] = "1"
+        self.addCleanup(os.environ.pop, "MCP_FANOUT_WORKERS", None)
+        server = self.mock_server_setup(mock_load_spec=True)
+        timeouts = []
+
+        def slow_request(broker_config, method, url, **kwargs):
+            timeouts.append(server._request_timeout())
+            time.sleep(0.3)
+            return {"data": {}}
+        server._make_request = slow_request
+
+        result = server._invoke_tool(server.tools["getBrokerConfig"], {"broker_alias": "*"})
+
+        self.assertEqual(result["summary"]["succeeded"], 3)
+        # Requests on fan-out workers stop reading when the fan-out gives up on them
+        self.assertEqual(timeouts, [(5.0, 0.5)] * 3)
+        self.assertEqual(server._request_timeout(), (5.0, 30.0))
+        server.close()
+
+    def test_fanout_reports_calls_never_started(self):
+        """Test that a call still queued behind a hung broker is cancelled and reported."""
+        os.environ["MCP_FANOUT_WORKERS"] = "1"
+        self.addCleanup(os.environ.pop, "MCP_FANOUT_WORKERS", None)
+        server = self.mock_server_setup(mock_load_spec=True)
+        server._make_request = MagicMock(side_effect=self.fake_request)
+
+        result = server._invoke_tool(server.tools["getBrokerConfig"], {"broker_alias": ["c", "a"]})
+
+        self.assertEqual(result["brokers"]["c"]["status"], "timeout")
+        self.assertEqual(result["brokers"]["a"]["status"], "timeout")
+        self.assertIn("fan-out workers were busy", result["brokers"]["a"]["error"])
+        self.release.set()
+        server.close()
+        self.assertEqual([call.args[0].alias for call in server._make_request.call_args_list], ["c"])
+
+    def test_fanout_list_of_aliases(self):
+        """Test that a list selects a subset of brokers."""
+        server = self.mock_server_setup(mock_load_spec=True)
+        server._make_request = self.fake_request
+
+        result = server._invoke_tool(server.tools["getItemById"], {"broker_alias": ["a", "b"], "itemId": "x"})
+
+        self.assertEqual(sorted(result["brokers"]), ["a", "b"])
+        self.assertEqual(result["summary"]["succeeded"], 1)
+        server.close()
+
+    def test_fanout_unknown_alias(self):
+        """Test that unknown aliases are rejected before any request is made."""
+        server = self.mock_server_setup(mock_load_spec=True)
+        server._make_request = MagicMock()
+
+        with self.assertRaises(ValueError):
+            server._invoke_tool(server.tools["getBrokerConfig"], {"broker_alias": ["a", "zzz"]})
+        server._make_request.assert_not_called()
+
+    def test_fanout_async_engine(self):
+        """Test fan-out on the asyncio engine."""
+        server = self.mock_server_setup(mock_load_spec=True)
+
+        async def fake_request_async(broker_config, method, url, **kwargs):
+            if broker_config.alias == "c":
+                await asyncio.sleep(5)
+            return self.fake_request(broker_config, method, url, **kwargs)
+
+        server._make_request_async = fake_request_async
+        result = asyncio.run(server._invoke_tool_async(server.tools["getBrokerConfig"], {"broker_alias": "*"}))
+
+        self.assertEqual(result["summary"], {"requested": 3, "succeeded": 1, "failed": 1, "timedOut": 1})
+
+
+class TestBrokerLimiter(BaseTestCase):
+    """Tests for per-broker rate limiting and adaptive concurrency."""
+
+    def test_concurrency_limit_and_fair_order(self):
+        """Test that no more than the limit run at once and waiters are admitted in arrival order."""
+        limiter = BrokerLimiter("a", rate=0, burst=0, max_concurrency=2, latency_target=0)
+        lock, running, peak, order = threading.Lock(), [0], [0], []
+
+        def call(index):
+            limiter.acquire()
+            with lock:
+                order.append(index)
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            threading.Event().wait(0.02)
+            with lock:
+                running[0] -= 1
+            limiter.release(0.02, 200)
+
+        threads = []
+        for index in range(8):
+            thread = threading.Thread(target=call, args=(index,))
+            thread.start()
+            threads.append(thread)
+            # Let each thread queue up before the next one arrives
+            threading.Event().wait(0.005)
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(peak[0], 2)
+        self.assertEqual(order, list(range(8)))
+        stats = limiter.stats()
+        self.assertEqual((stats["in_flight"], stats["queue_depth"], stats["admitted"]), (0, 0, 8))
+        self.assertGreater(stats["delayed"], 0)
+
+    def test_aimd_adjusts_limit(self):
+        """Test that overload halves the limit and successes grow it back."""
+        limiter = BrokerLimiter("a", rate=0, burst=0, max_concurrency=8, latency_target=1.0)
+
+        limiter.acquire()
+        limiter.release(0.01, 503)
+        self.assertEqual(limiter.stats()["concurrency_limit"], 4)
+
+        # A slow response counts as overload too
+        limiter._decreased = 0.0
+        limiter.acquire()
+        limiter.release(1.5, 200)
+        self.assertEqual(limiter.stats()["concurrency_limit"], 2)
+
+        # Additive increase: 1/limit per success, about one step per limit's worth of successes
+        for _ in range(30):
+            limiter.acquire()
+            limiter.release(0.01, 200)
+        self.assertEqual(limiter.stats()["concurrency_limit"], 8)
+        self.assertEqual(limiter.stats()["limit_decreases"], 2)
+
+    def test_token_bucket_paces_requests(self):
+        """Test that requests beyond the burst wait for tokens."""
+        limiter = BrokerLimiter("a", rate=100, burst=1, max_concurrency=0, latency_target=0)
+        start = time.monotonic()
+        for _ in range(5):
+            limiter.acquire()
+            limiter.release(0.0, 200)
+        self.assertGreaterEqual(time.monotonic() - start, 0.035)
+        self.assertIsNone(limiter.stats()["concurrency_limit"])
+
+    def test_async_acquire(self):
+        """Test that asyncio requests wait for a free slot."""
+        limiter = BrokerLimiter("a", rate=0, burst=0, max_concurrency=1, latency_target=0)
+        order = []
+
+        async def call(index):
+            await limiter.acquire_async()
+            order.append(("start", index))
+            await asyncio.sleep(0.01)
+            order.append(("end", index))
+            limiter.release(0.01, 200)
+
+        async def main():
+            await asyncio.gather(call(0), call(1))
+
+        asyncio.run(main())
+        self.assertEqual(order, [("start", 0), ("end", 0), ("start", 1), ("end", 1)])
+
+    @patch('requests.Session.request')
+    def test_server_limits_per_broker(self, mock_request):
+        """Test that each broker gets its own limiter and 503s lower its limit."""
+        os.environ.update({"SOLACE_BROKERS_ALIAS": "a,b", "SOLACE_SEMPV2_BASE_URL_A": "http://broker-a:8080",
+                           "SOLACE_SEMPV2_BASE_URL_B": "http://broker-b:8080", "MCP_BROKER_MAX_CONCURRENCY": "4",
+                           "SOLACE_SEMPV2_MAX_CONCURRENCY_B": "0"})
+        try:
+            server = self.mock_server_setup(mock_load_spec=True)
+        finally:
+            for name in ("SOLACE_BROKERS_ALIAS", "SOLACE_SEMPV2_BASE_URL_A", "SOLACE_SEMPV2_BASE_URL_B",
+                         "SOLACE_SEMPV2_MAX_CONCURRENCY_B"):
+                os.environ.pop(name)
+        mock_response = MagicMock(status_code=503)
+        mock_response.raise_for_status.side_effect = requests.exceptions.HTTPError("503 Server Error")
+        mock_request.return_value = mock_response
+
+        with self.assertRaises(Exception):
+            server._invoke_tool(server.tools["getBrokerConfig"], {"broker_alias": "a"})
+
+        self.assertEqual(list(server.broker_limiters), ["a"])
+        limits = server.get_stats()["broker_limits"]["a"]
+        self.assertEqual((limits["concurrency_limit"], limits["max_concurrency"], limits["in_flight"]), (2, 4, 0))
+
+
+class TestResilience(BaseTestCase):
+    """Tests for retries with backoff and the per-broker circuit breaker."""
+
+    @staticmethod
+    def http_error(status):
+        return requests.exceptions.HTTPError(f"{status} Server Error",
+                                             response=MagicMock(status_code=status, headers={}))
+
+    def test_transient_failure_retried(self):
+        """Test that a connection error is retried and the retry's result returned."""
+        os.environ["MCP_RETRIES"] = "2"
+        server = self.mock_server_setup(mock_load_spec=True)
+        server._make_request = MagicMock(side_effect=[requests.exceptions.ConnectionError("refused"),
+                                                      {"data": {"name": "broker"}}])
+
+        result = server._invoke_tool(server.tools["getBrokerConfig"], {})
+
+        self.assertEqual(result, {"data": {"name": "broker"}})
+        self.assertEqual(server.get_stats()["retries"], {"retries": 1, "recovered": 1, "exhausted": 0})
+
+    def test_retries_exhausted_and_client_errors_not_retried(self):
+        """Test that retries stop after the limit and 4xx responses are not retried."""
+        os.environ["MCP_RETRIES"] = "2"
+        server = self.mock_server_setup(mock_load_spec=True)
+        server._make_request = MagicMock(side_effect=self.http_error(503))
+
+        with self.assertRaises(Exception) as context:
+            server._invoke_tool(server.tools["getBrokerConfig"], {})
+        self.assertIn("attempt 3 of 3", str(context.exception))
+        self.assertEqual(server._make_request.call_count, 3)
+
+        server._make_request = MagicMock(side_effect=self.http_error(404))
+        with self.assertRaises(Exception):
+            server._invoke_tool(server.tools["getBrokerConfig"], {})
+        self.assertEqual(server._make_request.call_count, 1)
+        self.assertEqual(server.get_stats()["retries"]["exhausted"], 1)
+
+    def test_circuit_breaker_opens_and_probes(self):
+        """Test that the breaker fails fast when open and closes after a successful probe."""
+        os.environ["MCP_CIRCUIT_BREAKER_THRESHOLD"] = "2"
+        os.environ["MCP_CIRCUIT_BREAKER_COOLDOWN"] = "0.05"
+        server = self.mock_server_setup(mock_load_spec=True)
+        tool = server.tools["getBrokerConfig"]
+        server._make_request = MagicMock(side_effect=requests.exceptions.ConnectionError("timed out"))
+
+        for _ in range(2):
+            with self.assertRaises(Exception):
+                server._invoke_tool(tool, {})
+        with self.assertRaises(Exception) as context:
+            server._invoke_tool(tool, {})
+        self.assertIn("circuit breaker is open", str(context.exception))
+        self.assertEqual(server._make_request.call_count, 2)
+
+        time.sleep(0.06)
+        server._make_request = MagicMock(return_value={"data": {}})
+        self.assertEqual(server._invoke_tool(tool, {}), {"data": {}})
+        self.assertEqual(server.get_stats()["circuit_breakers"]["default"],
+                         {"state": "closed", "consecutive_failures": 0, "times_opened": 1, "requests_rejected": 1})
+
+    @patch('requests.Session.request')
+    def test_hung_broker_times_out_and_opens_circuit(self, mock_request):
+        """Test that requests carry the connect/read timeout and that timeouts open the breaker."""
+        os.environ["MCP_HTTP_CONNECT_TIMEOUT"] = "2"
+        os.environ["MCP_HTTP_READ_TIMEOUT"] = "7"
+        os.environ["MCP_CIRCUIT_BREAKER_THRESHOLD"] = "2"
+        server = self.mock_server_setup(mock_load_spec=True)
+        mock_request.side_effect = requests.exceptions.ReadTimeout("Read timed out. (read timeout=7)")
+
+        for _ in range(2):
+            with self.assertRaises(Exception):
+                server._invoke_tool(server.tools["getBrokerConfig"], {})
+        self.assertEqual(mock_request.call_args.kwargs["timeout"], (2.0, 7.0))
+        self.assertEqual(server.circuit_breakers["default"].state, "open")
+        with self.assertRaises(Exception) as context:
+            server._invoke_tool(server.tools["getBrokerConfig"], {})
+        self.assertIn("circuit breaker is open", str(context.exception))
+        self.assertEqual(mock_request.call_count, 2)
+
+    def test_failed_probe_reopens_circuit(self):
+        """Test that a failing half-open probe opens the circuit again."""
+        os.environ["MCP_CIRCUIT_BREAKER_THRESHOLD"] = "1"
+        os.environ["MCP_CIRCUIT_BREAKER_COOLDOWN"] = "0.05"
+        server = self.mock_server_setup(mock_load_spec=True)
+        server._make_request = MagicMock(side_effect=self.http_error(503))
+
+        with self.assertRaises(Exception) as context:
+            server._invoke_tool(server.tools["getBrokerConfig"], {})
+        self.assertIn("circuit breaker open", str(context.exception))
+        time.sleep(0.06)
+        with self.assertRaises(Exception):
+            server._invoke_tool(server.tools["getBrokerConfig"], {})
+        self.assertEqual(server._make_request.call_count, 2)
+        self.assertEqual(server.circuit_breakers["default"].state, "open")
+
+    def test_async_retry(self):
+        """Test that the asyncio engine retries transient failures as well."""
+        os.environ["MCP_RETRIES"] = "1"
+        server = self.mock_server_setup(mock_load_spec=True)
+        server._make_request_async = AsyncMock(side_effect=[self.http_error(502), {"data": {"ok": True}}])
+
+        result = asyncio.run(server._invoke_tool_async(server.tools["getBrokerConfig"], {}))
+
+        self.assertEqual(result, {"data": {"ok": True}})
+        self.assertEqual(server._make_request_async.await_count, 2)
+
+
+class TestMetrics(BaseTestCase):
+    """Tests for the metrics registry and its exporters."""
+
+    @staticmethod
+    def call_message(name, arguments=None):
+        return json.dumps({"jsonrpc": "2.0", "id": 1, "method": "tools/call",
+                           "params": {"name": name, "arguments": arguments or {}}})
+
+    def test_disabled_by_default(self):
+        """Test that no metrics are recorded and no tool is added unless metrics are enabled."""
+        server = self.mock_server_setup(mock_load_spec=True)
+        self.assertIsNone(server.metrics)
+        self.assertNotIn("server_metrics", server.tools)
+
+    def test_histogram_rendering_and_stats_gauges(self):
+        """Test cumulative buckets in the text format and flattening of per-broker statistics."""
+        registry = MetricsRegistry(buckets=(0.1, 1.0))
+        labels = (("tool", "getQueue"), ("broker", "a"))
+        for seconds in (0.05, 0.5, 0.5, 2.0):
+            registry.observe("mcp_tool_call_duration_seconds", labels, seconds)
+
+        text = registry.render()
+        self.assertIn('mcp_tool_call_duration_seconds_bucket{tool="getQueue",broker="a",le="0.1"} 1', text)
+        self.assertIn('mcp_tool_call_duration_seconds_bucket{tool="getQueue",broker="a",le="1.0"} 3', text)
+        self.assertIn('mcp_tool_call_duration_seconds_bucket{tool="getQueue",broker="a",le="+Inf"} 4', text)
+        self.assertIn('mcp_tool_call_duration_seconds_count{tool="getQueue",broker="a"} 4', text)
+        self.assertEqual(registry.snapshot()["histograms"]["mcp_tool_call_duration_seconds"][0]["p50"], 1.0)
+
+        gauges = MetricsRegistry.stats_gauges({
+            "http_pool": {"requests_sent": 3, "brokers": {"a": {"requests": 3}}},
+            "circuit_breakers": {"a": {"state": "open", "times_opened": 1}},
+            "broker_limits": {"a": {"rate_limit": None}}
+        })
+        self.assertEqual(gauges["mcp_http_pool_requests_sent"], {(): 3})
+        self.assertEqual(gauges["mcp_http_pool_brokers_requests"], {(("broker", "a"),): 3})
+        self.assertEqual(gauges["mcp_circuit_breakers_state"], {(("broker", "a"), ("value", "open")): 1})
+        self.assertNotIn("mcp_broker_limits_rate_limit", gauges)
+
+    @patch('requests.Session.request')
+    def test_tool_call_metrics(self, mock_request):
+        """Test that a tool call records message, tool, SEMP request, byte and JSON timing metrics."""
+        os.environ["MCP_METRICS"] = "true"
+        mock_response = MagicMock(status_code=200, content=b'{"data":{"name":"broker"}}')
+        mock_response.json.return_value = {"data": {"name": "broker"}}
+        mock_request.return_value = mock_response
+        server = self.mock_server_setup(mock_load_spec=True)
+
+        server.handle_message(self.call_message("getBrokerConfig"))
+        text = server.render_metrics()
+
+        self.assertIn('mcp_messages_total{method="tools/call"} 1', text)
+        self.assertIn('mcp_tool_calls_total{tool="getBrokerConfig",broker="default",outcome="ok"} 1', text)
+        self.assertIn('mcp_tool_call_duration_seconds_count{tool="getBrokerConfig",broker="default"} 1', text)
+        self.assertIn('semp_requests_total{broker="default",status="200"} 1', text)
+        self.assertIn('semp_response_bytes_total{broker="default"} 26', text)
+        self.assertIn('mcp_json_duration_seconds_count{operation="encode_result"} 1', text)
+        self.assertIn('mcp_http_pool_requests_sent', text)
+
+    @patch('requests.Session.request')
+    def test_error_counts_by_status(self, mock_request):
+        """Test that failed calls are counted by HTTP status, tool outcome and JSON-RPC error code."""
+        os.environ["MCP_METRICS"] = "true"
+        mock_response = MagicMock(status_code=503)
+        mock_response.raise_for_status.side_effect = requests.exceptions.HTTPError("503 Server Error")
+        mock_request.return_value = mock_response
+        server = self.mock_server_setup(mock_load_spec=True)
+
+        server.handle_message(self.call_message("getBrokerConfig"))
+        server.handle_message("not json")
+        text = server.render_metrics()
+
+        self.assertIn('semp_requests_total{broker="default",status="503"} 1', text)
+        self.assertIn('mcp_tool_calls_total{tool="getBrokerConfig",broker="default",outcome="error"} 1', text)
+        self.assertIn('mcp_errors_total{code="-32603"} 1', text)
+        self.assertIn('mcp_errors_total{code="-32700"} 1', text)
+
+    def test_server_metrics_tool(self):
+        """Test that server_metrics is listed and returns the text format or JSON."""
+        os.environ["MCP_METRICS"] = "true"
+        server = self.mock_server_setup(mock_load_spec=True)
+
+        listed = json.loads(server.handle_message(json.dumps({"jsonrpc": "2.0", "id": 1, "method": "tools/list"})))
+        self.assertIn("server_metrics", [tool["name"] for tool in listed["result"]["tools"]])
+
+        response = json.loads(server.handle_message(self.call_message("server_metrics")))
+        self.assertIn("# TYPE mcp_messages_total counter", response["result"]["content"][0]["text"])
+
+        response = json.loads(server.handle_message(self.call_message("server_metrics", {"format": "json"})))
+        payload = json.loads(response["result"]["content"][0]["text"])
+        counts = {entry["labels"]["method"]: entry["value"]
+                  for entry in payload["metrics"]["counters"]["mcp_messages_total"]}
+        self.assertEqual(counts, {"tools/list": 1, "tools/call": 1})
+        self.assertIn("http_pool", payload["stats"])
+
+    def test_metrics_file_and_endpoint(self):
+        """Test the loopback /metrics endpoint and the metrics file written on close."""
+        import socket
+        import urllib.request
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            port = probe.getsockname()[1]
+        metrics_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, metrics_dir, True)
+        os.environ["MCP_METRICS_PORT"] = str(port)
+        os.environ["MCP_METRICS_FILE"] = os.path.join(metrics_dir, "metrics.prom")
+        server = self.mock_server_setup(mock_load_spec=True)
+        server.start_metrics_exporters()
+        try:
+            server.handle_message(json.dumps({"jsonrpc": "2.0", "id": 1, "method": "initialize"}))
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as response:
+                self.assertIn('mcp_messages_total{method="initialize"} 1', response.read().decode("utf-8"))
+        finally:
+            server.close()
+
+        with open(os.environ["MCP_METRICS_FILE"]) as file:
+            self.assertIn("mcp_tools_registered", file.read())
+
+
+class TestProfiling(BaseTestCase):
+    """Tests for the opt-in tool call profiler."""
+
+    CALL = json.dumps({"jsonrpc": "2.0", "id": 1, "method": "tools/call",
+                       "params": {"name": "getBrokerConfig", "arguments": {}}})
+
+    def setUp(self):
+        super().setUp()
+        self.profile_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.profile_dir, True)
+        os.environ["MCP_PROFILE_DIR"] = self.profile_dir
+
+    def slow_server(self, seconds):
+        server = self.mock_server_setup(mock_load_spec=True)
+
+        def slow_request(*args, **kwargs):
+            time.sleep(seconds)
+            return {"data": {"name": "broker"}}
+        server._make_request = MagicMock(side_effect=slow_request)
+        return server
+
+    def test_disabled_without_directory(self):
+        """Test that no profiler is created unless MCP_PROFILE_DIR is set."""
+        os.environ["MCP_PROFILE_DIR"] = ""
+        os.environ["MCP_PROFILE_SLOW_MS"] = "1"
+        server = self.mock_server_setup(mock_load_spec=True)
+        self.assertIsNone(server.profiler)
+        self.assertNotIn("profiling", server.get_stats())
+
+    def test_disabled_on_async_engine(self):
+        """Test that the asyncio engine refuses to profile rather than mixing up concurrent calls."""
+        os.environ["MCP_ENGINE"] = "async"
+        os.environ["MCP_PROFILE_SLOW_MS"] = "1"
+        with patch('solace_sempv2_mcp_server.logger') as mock_logger:
+            ServerConfig().validate()
+        self.assertTrue(any("MCP_ENGINE=async" in call.args[0] for call in mock_logger.warning.call_args_list))
+        self.assertIsNone(self.mock_server_setup(mock_load_spec=True).profiler)
+
+    def test_slow_call_written_as_collapsed_stacks(self):
+        """Test that a call above the threshold is written with the tool and broker in the file name."""
+        os.environ["MCP_PROFILE_SLOW_MS"] = "20"
+        server = self.slow_server(0.05)
+
+        server.handle_message(self.CALL)
+
+        files = os.listdir(self.profile_dir)
+        self.assertEqual(len(files), 1)
+        self.assertRegex(files[0], r"-\d+ms-getBrokerConfig-default-1\.collapsed$")
+        with open(os.path.join(self.profile_dir, files[0])) as file:
+            lines = file.read().splitlines()
+        self.assertTrue(lines)
+        self.assertTrue(all(line.rsplit(" ", 1)[1].isdigit() for line in lines))
+        self.assertTrue(any("_handle_call_tool" in line and "slow_request" in line for line in lines))
+
+    def test_fast_call_not_written(self):
+        """Test that calls below the threshold are profiled but not written."""
+        os.environ["MCP_PROFILE_SLOW_MS"] = "10000"
+        server = self.slow_server(0)
+
+        server.handle_message(self.CALL)
+
+        self.assertEqual(os.listdir(self.profile_dir), [])
+        self.assertEqual(server.get_stats()["profiling"], {"calls_profiled": 1, "profiles_written": 0})
+
+    def test_sampled_call_written_as_pstats(self):
+        """Test that a sampled call is written in the pstats format."""
+        import pstats
+        os.environ["MCP_PROFILE_SAMPLE_RATE"] = "1"
+        os.environ["MCP_PROFILE_FORMAT"] = "pstats"
+        server = self.slow_server(0)
+
+        server.handle_message(self.CALL)
+
+        files = os.listdir(self.profile_dir)
+        self.assertEqual(len(files), 1)
+        stats = pstats.Stats(os.path.join(self.profile_dir, files[0]))
+        self.assertIn("_invoke_tool", {function for _, _, function in stats.stats})
+
+    def test_invalid_settings(self):
+        """Test that invalid profiling settings are rejected."""
+        os.environ["MCP_PROFILE_FORMAT"] = "svg"
+        with self.assertRaises(ValueError):
+            ServerConfig()
+        os.environ["MCP_PROFILE_FORMAT"] = "collapsed"
+        os.environ["MCP_PROFILE_SAMPLE_RATE"] = "2"
+        with self.assertRaises(ValueError):
+            ServerConfig()
+
+
+class TestLoggingPipeline(BaseTestCase):
+    """Tests for level-guarded hot path logging, the queued log writer and the access log."""
+
+    def setUp(self):
+        super().setUp()
+        self.log_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.log_dir, True)
+        # Runs after the files are written out, and puts the tests' disabled logging back
+        self.addCleanup(self.restore_logging)
+
+    def restore_logging(self):
+        self.reset_env_vars()
+        setup_logging()
+
+    def read_lines(self, name):
+        setup_logging()  # Stops the writer thread once the queued records are written
+        with open(os.path.join(self.log_dir, name)) as file:
+            return file.read().splitlines()
+
+    @patch('requests.Session.request')
+    def test_debug_details_skipped_at_info(self, mock_request):
+        """Test that request details and response headers are only built when DEBUG is enabled."""
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {"data": {"name": "broker"}}
+        mock_request.return_value = mock_response
+        os.environ["MCP_LOG_DISABLE"] = "false"
+        os.environ["MCP_LOG_FILE"] = os.path.join(self.log_dir, "server.log")
+        setup_logging()
+        server = self.mock_server_setup(mock_load_spec=True)
+
+        with patch.object(server, '_log_request_details') as details:
+            server._invoke_tool(server.tools["getBrokerConfig"], {})
+            details.assert_not_called()
+            self.assertNotIn("headers", {call[0] for call in mock_response.mock_calls})
+
+            os.environ["MCP_LOG_LEVEL"] = "DEBUG"
+            setup_logging()
+            server._invoke_tool(server.tools["getBrokerConfig"], {})
+            details.assert_called_once()
+        self.assertTrue(any("Response headers" in line for line in self.read_lines("server.log")))
+
+    def test_queued_records_keep_message_at_log_time(self):
+        """Test that queued records are written by the writer thread with the arguments as they were logged."""
+        import logging
+        os.environ["MCP_LOG_DISABLE"] = "false"
+        os.environ["MCP_LOG_FILE"] = os.path.join(self.log_dir, "server.log")
+        setup_logging()
+        written_by = []
+        emit = logging.FileHandler.emit
+
+        def record_thread(handler, record):
+            written_by.append(threading.current_thread())
+            emit(handler, record)
+
+        logger = logging.getLogger("solace-sempv2-mcp")
+        brokers = ["broker_a"]
+        with patch.object(logger, "propagate", False), patch.object(logging.FileHandler, "emit", record_thread):
+            logger.info("Calling %s", brokers)
+            brokers.append("broker_b")
+            lines = self.read_lines("server.log")
+
+        self.assertEqual(len(lines), 1)
+        self.assertTrue(lines[0].endswith(" - INFO - Calling ['broker_a']"))
+        self.assertEqual(len(written_by), 1)
+        self.assertIsNot(written_by[0], threading.current_thread())
+
+    def test_full_queue_drops_records(self):
+        """Test that a record is dropped and counted instead of blocking when the queue is full."""
+        import logging
+        import queue
+        handler = DroppingQueueHandler(queue.Queue(maxsize=1))
+        record = logging.LogRecord("test", logging.INFO, __file__, 1, "message", None, None)
+        handler.emit(record)
+        handler.emit(record)
+        self.assertEqual(handler.queue.qsize(), 1)
+        self.assertEqual(handler.dropped, 1)
+
+    def test_access_log_entries(self):
+        """Test one JSON line per tool call, written even with the server log disabled."""
+        os.environ["MCP_ACCESS_LOG"] = os.path.join(self.log_dir, "access.log")
+        setup_logging()
+        server = self.mock_server_setup(mock_load_spec=True)
+        server._make_request = MagicMock(side_effect=[{"data": {"name": "broker"}}, ValueError("broker down")])
+        call = json.dumps({"jsonrpc": "2.0", "id": 1, "method": "tools/call",
+                           "params": {"name": "getBrokerConfig", "arguments": {}}})
+
+        response = server.handle_message(call)
+        server.handle_message(call)
+
+        entries = [json.loads(line) for line in self.read_lines("access.log")]
+        self.assertEqual(len(entries), 2)
+        self.assertEqual({key: entries[0][key] for key in ("tool", "broker", "status", "bytes")},
+                         {"tool": "getBrokerConfig", "broker": "default", "status": "ok", "bytes": len(response)})
+        self.assertRegex(entries[0]["ts"], r"^\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d\.\d{3}Z$")
+        self.assertGreaterEqual(entries[0]["latency_ms"], 0)
+        self.assertEqual(entries[1]["status"], "error")
+        self.assertIn("broker down", entries[1]["error"])
+
+    @patch('requests.Session.request')
+    def test_access_log_semp_status_and_partial_fanout(self, mock_request):
+        """Test that entries carry each broker's SEMP HTTP status and that a fan-out with failures is partial."""
+        os.environ.update(TestBrokerFanout.FANOUT_ENV, SOLACE_BROKERS_ALIAS="a,b")
+        self.addCleanup(lambda: [os.environ.pop(name, None) for name in TestBrokerFanout.FANOUT_ENV])
+        os.environ["MCP_ACCESS_LOG"] = os.path.join(self.log_dir, "access.log")
+        setup_logging()
+
+        def broker_response(method, url, **kwargs):
+            response = MagicMock(status_code=200 if "broker-a" in url else 503)
+            response.json.return_value = {"data": {"name": "broker"}}
+            if response.status_code != 200:
+                response.raise_for_status.side_effect = requests.exceptions.HTTPError("503 Server Error")
+            return response
+        mock_request.side_effect = broker_response
+        server = self.mock_server_setup(mock_load_spec=True)
+
+        for broker_alias in ("a", "*"):
+            server.handle_message(json.dumps({"jsonrpc": "2.0", "id": 1, "method": "tools/call", "params": {
+                "name": "getBrokerConfig", "arguments": {"broker_alias": broker_alias}}}))
+
+        single, fanout = [json.loads(line) for line in self.read_lines("access.log")]
+        self.assertEqual((single["status"], single["semp_status"]), ("ok", {"a": 200}))
+        self.assertEqual((fanout["status"], fanout["semp_status"]), ("partial", {"a": 200, "b": 503}))
+
+
+class TestPolling(BaseTestCase):
+    """Tests for the background poller and the polled_metrics tools."""
+
+    def setUp(self):
+        super().setUp()
+        os.environ["MCP_POLL_PATHS"] = "/msgVpns/default,/msgVpns/default/queues?count=100"
+
+    def call(self, server, tool, arguments):
+        response = json.loads(server.handle_message(json.dumps(
+            {"jsonrpc": "2.0", "id": 1, "method": "tools/call", "params": {"name": tool, "arguments": arguments}})))
+        return json.loads(response["result"]["content"][0]["text"])
+
+    def test_ring_buffer_keeps_latest_samples(self):
+        """Test that the ring buffer overwrites its oldest samples and summarizes the rest."""
+        buffer = RingBuffer(3)
+        for second in range(5):
+            buffer.append(100.0 + second, second * 10)
+        self.assertEqual(buffer.samples(), [(102.0, 20.0), (103.0, 30.0), (104.0, 40.0)])
+        self.assertEqual(buffer.samples(since=103.5), [(104.0, 40.0)])
+        summary = buffer.summary(counter=True)
+        self.assertEqual((summary["first"], summary["last"], summary["min"], summary["max"], summary["avg"]),
+                         (20, 40, 20, 40, 30.0))
+        self.assertEqual(summary["delta"], 20)
+        self.assertEqual(summary["rate_per_second"], 10.0)
+        self.assertNotIn("delta", buffer.summary())
+
+    def test_ring_buffer_counter_reset(self):
+        """Test that a counter reset is not reported as a decrease."""
+        buffer = RingBuffer(5)
+        for second, value in enumerate((100, 150, 10, 40)):
+            buffer.append(float(second), value)
+        summary = buffer.summary(counter=True)
+        self.assertEqual((summary["delta"], summary["resets"]), (90, 1))
+        self.assertEqual(summary["rate_per_second"], 30.0)
+
+    def test_count_gauge_not_summarized_as_counter(self):
+        """Test that a *Count gauge that goes down has no delta, resets or rate."""
+        server = self.mock_server_setup(mock_load_spec=True)
+        now = time.time()
+        for age, count in ((30, 1000), (20, 900), (10, 950), (0, 800)):
+            server.poller.ingest("default", "/msgVpns/default", {"data": {
+                "txUnackedMsgCount": count, "bindCount": 2, "dataRxMsgCount": 1000 - count,
+                "counter": {"controlRxMsgCount": count}}}, now - age)
+
+        fields = server.poller.query()["series"]["default"]["/msgVpns/default"]["default"]
+        gauge = fields["txUnackedMsgCount"]
+        self.assertEqual((gauge["last"], gauge["min"], gauge["max"]), (800, 800, 1000))
+        for key in ("delta", "resets", "rate_per_second", "first", "avg"):
+            self.assertNotIn(key, gauge)
+        self.assertNotIn("delta", fields["bindCount"])
+        self.assertIn("rate_per_second", fields["dataRxMsgCount"])
+        self.assertEqual(fields["counter.controlRxMsgCount"]["resets"], 2)
+
+    def test_poll_fetches_each_path_on_each_broker(self):
+        """Test that a poll requests every path, keeps matching numeric fields and names objects."""
+        os.environ["SOLACE_SEMPV2_BASE_URL"] = "http://sample-solace:8080/SEMP/v2/monitor"
+        os.environ["MCP_STRIP_LINKS"] = "true"
+        server = self.mock_server_setup(mock_load_spec=True)
+        base = "http://sample-solace:8080/SEMP/v2/monitor"
+        responses = {
+            f"{base}/msgVpns/default": {
+                "data": {"msgVpnName": "default", "authorizationProfileName": "default", "rxMsgCount": 5,
+                         "enabled": True, "counter": {"txMsgCount": 7}}},
+            f"{base}/msgVpns/default/queues": {
+                "data": [{"msgVpnName": "default", "queueName": "orders/eu", "partitionClientName": "",
+                          "spooledMsgCount": 3, "bindCount": 1}],
+                "links": [{"uri": f"{base}/msgVpns/default/queues/orders%2Feu"}]}
+        }
+        server._make_request = MagicMock(side_effect=lambda broker, method, url, **kwargs: responses[url])
+
+        server.poller.poll()
+
+        self.assertEqual(server._make_request.call_args_list[1].kwargs["params"], {"count": "100"})
+        self.assertEqual(sorted(key[2:] for key in server.poller.series), [
+            ("default", "counter.txMsgCount"), ("default", "rxMsgCount"),
+            ("default/orders/eu", "bindCount"), ("default/orders/eu", "spooledMsgCount")])
+        self.assertEqual(server.get_stats()["polling"]["series"], 4)
+
+    def test_tools_answer_from_memory(self):
+        """Test rates, deltas and samples over a window without contacting the broker."""
+        server = self.mock_server_setup(mock_load_spec=True)
+        server._make_request = MagicMock(side_effect=AssertionError("the broker must not be called"))
+        now = time.time()
+        for age, count in ((120, 0), (20, 100), (10, 150), (0, 300)):
+            server.poller.ingest("default", "/msgVpns/default",
+                                 {"data": {"msgVpnName": "default", "rxMsgCount": count, "txMsgRate": 5}}, now - age)
+
+        result = self.call(server, "polled_metrics", {"fields": ["rxMsgCount"], "window_seconds": 30})
+        summary = result["series"]["default"]["/msgVpns/default"]["default"]["rxMsgCount"]
+        self.assertEqual((summary["samples"], summary["min"], summary["max"], summary["delta"]), (3, 100, 300, 200))
+        self.assertAlmostEqual(summary["rate_per_second"], 10.0, places=3)
+        self.assertAlmostEqual(summary["avg"], 550 / 3, places=3)
+
+        samples = self.call(server, "polled_metric_samples", {"object": "def*", "fields": ["*Rate"],
+                                                              "max_samples": 2})
+        series = samples["series"]["default"]["/msgVpns/default"]["default"]["txMsgRate"]
+        self.assertEqual([value for _, value in series], [5, 5])
+        gauge = self.call(server, "polled_metrics", {"fields": ["txMsgRate"]})
+        self.assertNotIn("delta", gauge["series"]["default"]["/msgVpns/default"]["default"]["txMsgRate"])
+
+    def test_poll_failures_reported(self):
+        """Test that a failed poll is counted and reported alongside the existing series."""
+        server = self.mock_server_setup(mock_load_spec=True)
+        server._make_request = MagicMock(side_effect=requests.exceptions.ConnectionError("broker down"))
+
+        server.poller.poll()
+
+        result = server.poller.query()
+        self.assertIn("broker down", result["poll_errors"]["default"]["/msgVpns/default"])
+        self.assertEqual(server.get_stats()["polling"]["failures"], 2)
+
+    def test_stale_series_evicted_and_disabled_by_default(self):
+        """Test that series of vanished objects are dropped and that polling is off without paths."""
+        server = self.mock_server_setup(mock_load_spec=True)
+        queues = "/msgVpns/default/queues?count=100"
+        server.poller.ingest("default", queues, {"data": [{"bindCount": 1}],
+                                                 "links": [{"uri": "http://sample-solace:8080/msgVpns/default/queues/gone"}]},
+                             time.time() - 10 * 360 - 1)
+        server._make_request = MagicMock(return_value={"data": {"msgVpnName": "default", "rxMsgCount": 1}})
+        server.poller.poll()
+        self.assertNotIn("default/gone", {key[2] for key in server.poller.series})
+        self.assertEqual(server.poller.stats()["evicted"], 1)
+
+        os.environ["MCP_POLL_PATHS"] = ""
+        server = self.mock_server_setup(mock_load_spec=True)
+        self.assertIsNone(server.poller)
+        self.assertNotIn("polled_metrics", server.tools)
+
+        os.environ["MCP_POLL_PATHS"] = "msgVpns"
+        with self.assertRaises(ValueError):
+            ServerConfig()
+
+
+class TestCassette(BaseTestCase):
+    """Tests for recording SEMP traffic to a cassette and replaying it offline."""
+
+    CALL = json.dumps({"jsonrpc": "2.0", "id": 1, "method": "tools/call",
+                       "params": {"name": "getBrokerConfig", "arguments": {}}})
+    BODY = {"data": {"msgVpnName": "default", "sempPassword": "s3cret", "invalidTokenCount": 3}}
+
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, True)
+
+    def write_cassette(self, name, *entries):
+        path = os.path.join(self.directory, name)
+        with open(path, "w") as file:
+            for entry in ({"type": "cassette", "version": 1},) + entries:
+                file.write(json.dumps(entry) + "\n")
+        return path
+
+    def replay_server(self, path, time_scale="0"):
+        os.environ["MCP_CASSETTE_MODE"] = "replay"
+        os.environ["MCP_CASSETTE"] = path
+        os.environ["MCP_CASSETTE_TIME_SCALE"] = time_scale
+        return self.mock_server_setup(mock_load_spec=True)
+
+    @staticmethod
+    def http_response(request, body):
+        response = requests.Response()
+        response.status_code = 200
+        response.headers["Content-Type"] = "application/json"
+        response.raw = io.BytesIO(json.dumps(body).encode())
+        response.request = request
+        return response
+
+    def record(self, path):
+        os.environ["MCP_CASSETTE_MODE"] = "record"
+        os.environ["MCP_CASSETTE"] = path
+        server = self.mock_server_setup(mock_load_spec=True)
+        with patch('requests.adapters.HTTPAdapter.send',
+                   side_effect=lambda request, **kwargs: self.http_response(request, self.BODY)):
+            response = json.loads(server.handle_message(self.CALL))
+        server.close()
+        return response
+
+    def test_record_redacts_secrets(self):
+        """Test that exchanges and tool calls are recorded without credentials."""
+        path = os.path.join(self.directory, "session.jsonl")
+        response = self.record(path)
+
+        self.assertIn("s3cret", response["result"]["content"][0]["text"])
+        with open(path) as file:
+            text = file.read()
+        self.assertNotIn("s3cret", text)
+        self.assertNotIn("test_pass", text)
+        header, call, exchange = [json.loads(line) for line in text.splitlines()]
+        self.assertEqual(header["type"], "cassette")
+        self.assertEqual((call["type"], call["tool"], call["arguments"]), ("call", "getBrokerConfig", {}))
+        self.assertEqual((exchange["broker"], exchange["method"], exchange["path"], exchange["status"]),
+                         ("default", "GET", "/config/broker", 200))
+        self.assertEqual(exchange["json"]["data"]["sempPassword"], "<redacted>")
+        self.assertEqual(exchange["json"]["data"]["invalidTokenCount"], 3)
+
+    def test_replay_without_network(self):
+        """Test that a recorded gzip cassette is replayed without contacting the broker."""
+        path = os.path.join(self.directory, "session.jsonl.gz")
+        self.record(path)
+
+        server = self.replay_server(path)
+        with patch('requests.adapters.HTTPAdapter.send', side_effect=AssertionError("network used")):
+            response = json.loads(server.handle_message(self.CALL))
+
+        result = json.loads(response["result"]["content"][0]["text"])
+        self.assertEqual(result["data"]["msgVpnName"], "default")
+        self.assertEqual(server.get_stats()["cassette"]["replayed"], 1)
+        self.assertEqual([call["tool"] for call in server.cassette.calls], ["getBrokerConfig"])
+
+    def test_replay_in_order_then_repeat_last(self):
+        """Test that repeated requests get the recorded responses in order, then the last one again."""
+        exchanges = [{"type": "http", "broker": "default", "method": "GET", "path": "/config/broker",
+                      "body": None, "status": status, "latency": 0, "json": {"data": {"n": n}}}
+                     for n, status in enumerate((503, 200))]
+        server = self.replay_server(self.write_cassette("retry.jsonl", *exchanges))
+        tool = server.tools["getBrokerConfig"]
+
+        with self.assertRaises(Exception):
+            server._invoke_tool(tool, {})
+        self.assertEqual(server._invoke_tool(tool, {})["data"], {"n": 1})
+        self.assertEqual(server._invoke_tool(tool, {})["data"], {"n": 1})
+
+    def test_replay_scales_recorded_latency(self):
+        """Test that replayed responses wait out the recorded latency times the time scale."""
+        path = self.write_cassette("slow.jsonl", {"type": "http", "broker": "default", "method": "GET",
+                                                  "path": "/config/broker", "body": None, "status": 200,
+                                                  "latency": 0.4, "json": {"data": {}}})
+        server = self.replay_server(path, time_scale="0.25")
+
+        start = time.monotonic()
+        server._invoke_tool(server.tools["getBrokerConfig"], {})
+        elapsed = time.monotonic() - start
+        self.assertGreaterEqual(elapsed, 0.1)
+        self.assertLess(elapsed, 0.4)
+
+    def test_replay_miss_is_an_error(self):
+        """Test that a request missing from the cassette fails on both engines instead of going to the network."""
+        server = self.replay_server(self.write_cassette("empty.jsonl"))
+
+        for response in (server.handle_message(self.CALL), asyncio.run(server.handle_message_async(self.CALL))):
+            self.assertIn("No recorded response for GET /config/broker", json.loads(response)["error"]["message"])
+        self.assertEqual(server.get_stats()["cassette"]["misses"], 2)
+
+    def test_async_replay(self):
+        """Test that the asyncio engine replays from the cassette without needing aiohttp sessions."""
+        path = self.write_cassette("items.jsonl", {"type": "http", "broker": "default", "method": "GET",
+                                                   "path": "/items/item123", "body": None, "status": 200,
+                                                   "latency": 0, "json": {"data": {"id": "item123"}}})
+        server = self.replay_server(path)
+
+        result = asyncio.run(server._invoke_tool_async(server.tools["getItemById"], {"itemId": "item123"}))
+
+        self.assertEqual(result["data"], {"id": "item123"})
+        self.assertIsNone(server.async_session_pool)
+
+    def test_request_key_normalizes_query(self):
+        """Test that requests are matched on a path relative to the broker, with the query sorted."""
+        broker = self.mock_server_setup(mock_load_spec=True).config.brokers["default"]
+        key = Cassette.request_key(broker, "get", "http://sample-solace:8080/queues?where=a%3D%3D1&count=10")
+        self.assertEqual(key, ("default", "GET", "/queues?count=10&where=a%3D%3D1", None))
+        self.assertEqual(Cassette.request_key(broker, "POST", "http://sample-solace:8080/x", b'{"b":1,"a":2}')[3],
+                         '{"a":2,"b":1}')
+
+
+class TestResponseCache(BaseTestCase):
+    """Tests for the SEMP GET response cache."""
+
+    CACHE_ENV = ("MCP_CACHE_TTL", "MCP_CACHE_TTL_RULES", "MCP_CACHE_STALE_WHILE_REVALIDATE")
+
+    def tearDown(self):
+        for name in self.CACHE_ENV:
+            os.environ.pop(name, None)
+        super().tearDown()
+
+    def cached_server(self, **env):
+        os.environ.update(env)
+        server = self.mock_server_setup(mock_load_spec=True)
+        server._make_request = MagicMock(side_effect=lambda *args, **kwargs: {"data": {"n": server._make_request.call_count}})
+        return server
+
+    def test_cache_disabled_by_default(self):
+        """Test that no cache is created without a TTL."""
+        server = self.mock_server_setup(mock_load_spec=True)
+        self.assertIsNone(server.response_cache)
+
+    def test_repeated_get_served_from_cache(self):
+        """Test that an identical GET within the TTL does not reach the broker."""
+        server = self.cached_server(MCP_CACHE_TTL="60")
+        tool = server.tools["getItemById"]
+
+        first = server._invoke_tool(tool, {"itemId": "a"})
+        second = server._invoke_tool(tool, {"itemId": "a"})
+        server._invoke_tool(tool, {"itemId": "b"})
+
+        self.assertEqual(first, second)
+        self.assertEqual(server._make_request.call_count, 2)
+        stats = server.get_stats()["cache"]
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 2))
+
+    def test_post_not_cached(self):
+        """Test that only GET tools are cacheable."""
+        server = self.cached_server(MCP_CACHE_TTL="60")
+        tool = server.tools["createItem"]
+
+        server._invoke_tool(tool, {"body": {"name": "x"}})
+        server._invoke_tool(tool, {"body": {"name": "x"}})
+
+        self.assertEqual(server._make_request.call_count, 2)
+
+    def test_ttl_rules_precedence(self):
+        """Test that tool rules beat path rules, which beat tag rules and the default."""
+        server = self.cached_server(MCP_CACHE_TTL="5",
+                                    MCP_CACHE_TTL_RULES="tag:read=10,path:/items=20,tool:getItemById=30")
+
+        self.assertEqual(server._cache_ttl(server.tools["getItemById"]), 30)
+        self.assertEqual(server._cache_ttl(server.tools["getItems"]), 20)
+        self.assertEqual(server._cache_ttl(server.tools["getBrokerConfig"]), 10)
+        self.assertEqual(server._cache_ttl(server.tools["createItem"]), 0)
+
+    def test_invalid_ttl_rule(self):
+        """Test that malformed TTL rules are rejected."""
+        os.environ["MCP_CACHE_TTL_RULES"] = "queue=5"
+        with self.assertRaises(ValueError):
+            ServerConfig()
+
+    def test_expiry_and_stale_while_revalidate(self):
+        """Test that stale entries are served while a background refresh runs."""
+        server = self.cached_server(MCP_CACHE_TTL="10", MCP_CACHE_STALE_WHILE_REVALIDATE="30")
+        tool = server.tools["getBrokerConfig"]
+
+        with patch('solace_sempv2_mcp_server.time.monotonic', return_value=100.0):
+            self.assertEqual(server._invoke_tool(tool, {})["data"]["n"], 1)
+        with patch('solace_sempv2_mcp_server.time.monotonic', return_value=115.0):
+            self.assertEqual(server._invoke_tool(tool, {})["data"]["n"], 1)
+            server._refresh_executor.shutdown(wait=True)
+            server._refresh_executor = None
+            self.assertEqual(server._invoke_tool(tool, {})["data"]["n"], 2)
+        with patch('solace_sempv2_mcp_server.time.monotonic', return_value=200.0):
+            self.assertEqual(server._invoke_tool(tool, {})["data"]["n"], 3)
+
+        stats = server.get_stats()["cache"]
+        self.assertEqual(stats["stale_hits"], 1)
+        self.assertEqual(stats["background_refreshes"], 1)
+
+    def test_lru_eviction_by_size(self):
+        """Test that least recently used entries are evicted to respect the byte limit."""
+        cache = ResponseCache(max_bytes=70)
+        cache.store(("a",), {"data": "x" * 20}, 60)
+        cache.store(("b",), {"data": "y" * 20}, 60)
+        cache.lookup(("a",))
+        cache.store(("c",), {"data": "z" * 20}, 60)
+
+        self.assertTrue(cache.lookup(("a",))[0])
+        self.assertFalse(cache.lookup(("b",))[0])
+        self.assertTrue(cache.lookup(("c",))[0])
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+
+class TestSingleFlight(BaseTestCase):
+    """Tests for coalescing identical in-flight requests."""
+
+    def run_concurrently(self, server, tool, arguments, callers=5):
+        """Invoke a tool from several threads once all of them are waiting on the broker."""
+        gate = threading.Event()
+        results, errors = [], []
+
+        def fake_request(*args, **kwargs):
+            gate.wait(5)
+            if tool.name == "getItems":
+                raise requests.exceptions.HTTPError("500 Server Error")
+            return {"data": {"id": "shared"}}
+
+        server._make_request = MagicMock(side_effect=fake_request)
+
+        def call():
+            try:
+                results.append(server._invoke_tool(tool, dict(arguments)))
+            except Exception as e:
+                errors.append(str(e))
+
+        threads = [threading.Thread(target=call) for _ in range(callers)]
+        for thread in threads:
+            thread.start()
+        # Give every caller time to join the in-flight request before it completes
+        threading.Event().wait(0.2)
+        gate.set()
+        for thread in threads:
+            thread.join(5)
+        return results, errors
+
+    def test_identical_gets_share_one_request(self):
+        """Test that concurrent identical GETs produce one broker call."""
+        server = self.mock_server_setup(mock_load_spec=True)
+        results, errors = self.run_concurrently(server, server.tools["getItemById"], {"itemId": "x"})
+
+        self.assertEqual(server._make_request.call_count, 1)
+        self.assertEqual(len(results), 5)
+        self.assertFalse(errors)
+        self.assertEqual(server.get_stats()["single_flight"]["requests_coalesced"], 4)
+
+    def test_errors_are_shared(self):
+        """Test that every waiter sees the leader's failure."""
+        server = self.mock_server_setup(mock_load_spec=True)
+        results, errors = self.run_concurrently(server, server.tools["getItems"], {})
+
+        self.assertEqual(server._make_request.call_count, 1)
+        self.assertEqual(len(errors), 5)
+        self.assertTrue(all("500 Server Error" in e for e in errors))
+
+    def test_post_requests_not_coalesced(self):
+        """Test that non-GET requests are always sent individually."""
+        server = self.mock_server_setup(mock_load_spec=True)
+        results, errors = self.run_concurrently(server, server.tools["createItem"], {"body": {"name": "x"}}, callers=3)
+
+        self.assertEqual(server._make_request.call_count, 3)
+
+    def test_disabled(self):
+        """Test that MCP_SINGLE_FLIGHT=false sends every request."""
+        os.environ["MCP_SINGLE_FLIGHT"] = "false"
+        try:
+            server = self.mock_server_setup(mock_load_spec=True)
+        finally:
+            del os.environ["MCP_SINGLE_FLIGHT"]
+        self.run_concurrently(server, server.tools["getItemById"], {"itemId": "x"}, callers=3)
+
+        self.assertEqual(server._make_request.call_count, 3)
+
+    def test_async_identical_gets_share_one_request(self):
+        """Test coalescing on the asyncio engine."""
+        server = self.mock_server_setup(mock_load_spec=True)
+        calls = []
+
+        async def fake_request_async(*args, **kwargs):
+            calls.append(args)
+            await asyncio.sleep(0.05)
+            return {"data": {"id": "shared"}}
+
+        server._make_request_async = fake_request_async
+
+        async def run():
+            tool = server.tools["getItemById"]
+            return await asyncio.gather(*(server._invoke_tool_async(tool, {"itemId": "x"}) for _ in range(4)))
+
+        results = asyncio.run(run())
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(results), 4)
+
+
+class TestRegistryCache(BaseTestCase):
+    """Tests for the on-disk compiled tool registry cache."""
+
+    def setUp(self):
+        super().setUp()
+        self.cache_dir = tempfile.mkdtemp()
+        os.environ["MCP_REGISTRY_CACHE"] = "true"
+        os.environ["MCP_REGISTRY_CACHE_DIR"] = self.cache_dir
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        os.environ.pop("MCP_REGISTRY_CACHE_DIR", None)
+        super().tearDown()
+
+    def test_warm_start_skips_spec_parsing(self):
+        """Test that a second start loads tools from the cache without parsing the spec."""
+        cold = self.mock_server_setup()
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+
+        with patch.object(SolaceSempv2McpServer, '_load_openapi_spec') as mock_load:
+            warm = self.mock_server_setup()
+            mock_load.assert_not_called()
+
+        self.assertIsNone(warm.openapi_spec)
+        self.assertEqual(list(warm.tools), list(cold.tools))
+        for name, tool in cold.tools.items():
+            self.assertEqual(warm.tools[name], tool)
+
+    def test_filter_change_misses_cache(self):
+        """Test that different filter settings produce a separate cache entry."""
+        self.mock_server_setup()
+        os.environ["MCP_API_INCLUDE_METHODS"] = "GET"
+
+        with patch.object(SolaceSempv2McpServer, '_load_openapi_spec', return_value=DUMMY_OAS_SPEC) as mock_load:
+            server = self.mock_server_setup()
+            mock_load.assert_called_once()
+
+        self.assertEqual(len(server.tools), 4)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 2)
+
+    def test_spec_change_misses_cache(self):
+        """Test that editing the spec file invalidates the cache."""
+        self.mock_server_setup()
+        spec = json.loads(json.dumps(DUMMY_OAS_SPEC))
+        del spec["paths"]["/config/broker"]
+        with open(self.test_spec_file, 'w') as f:
+            json.dump(spec, f)
+
+        server = self.mock_server_setup()
+
+        self.assertNotIn("getBrokerConfig", server.tools)
+
+    def test_corrupt_entry_is_rebuilt(self):
+        """Test that an unreadable cache file falls back to parsing the spec."""
+        self.mock_server_setup()
+        for name in os.listdir(self.cache_dir):
+            with open(os.path.join(self.cache_dir, name), 'w') as f:
+                f.write("{broken")
+
+        server = self.mock_server_setup()
+
+        self.assertEqual(len(server.tools), 6)
+
+
+class TestLeanRegistry(BaseTestCase):
+    """Tests for the memory-lean registry mode."""
+
+    def setUp(self):
+        super().setUp()
+        os.environ["MCP_LEAN_REGISTRY"] = "true"
+
+    def test_schemas_built_on_first_use(self):
+        """Test that input schemas are deferred and the raw spec is released."""
+        server = self.mock_server_setup(mock_load_spec=True)
+
+        self.assertIsNone(server.openapi_spec)
+        self.assertTrue(all(tool.input_schema is None for tool in server.tools.values()))
+
+        response = json.loads(server.handle_message(json.dumps(
+            {"jsonrpc": "2.0", "id": 1, "method": "tools/list"})))
+        listed = {tool["name"]: tool["inputSchema"] for tool in response["result"]["tools"]}
+
+        os.environ["MCP_LEAN_REGISTRY"] = "false"
+        os.environ["MCP_ENGINE"] = "sync"
+        eager = self.mock_server_setup(mock_load_spec=True)
+        for name, tool in eager.tools.items():
+            self.assertEqual(listed[name], tool.input_schema)
+
+        # Memoized on the tool after the first build
+        schema = server.tools["getMsgVpnQueues"].input_schema
+        self.assertIs(server._input_schema(server.tools["getMsgVpnQueues"]), schema)
+
+    def test_tool_call_builds_only_its_schema(self):
+        """Test that calling a tool does not build schemas for other tools."""
+        server = self.mock_server_setup(mock_load_spec=True)
+        server._make_request = MagicMock(return_value={"data": [], "meta": {"responseCode": 200}})
+
+        server._handle_call_tool("1", {"name": "getMsgVpnQueues",
+                                       "arguments": {"msgVpnName": "default", "max_pages": 2}})
+
+        self.assertIn("max_pages", server.tools["getMsgVpnQueues"].input_schema["properties"])
+        self.assertIsNone(server.tools["getBrokerConfig"].input_schema)
+
+    def test_registry_cache_keeps_schemas_deferred(self):
+        """Test that the registry cache stores and restores lean tools."""
+        cache_dir = tempfile.mkdtemp()
+        os.environ["MCP_REGISTRY_CACHE"] = "true"
+        os.environ["MCP_REGISTRY_CACHE_DIR"] = cache_dir
+        try:
+            self.mock_server_setup(mock_load_spec=True)
+            warm = self.mock_server_setup()
+        finally:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+            os.environ.pop("MCP_REGISTRY_CACHE_DIR", None)
+
+        tool = warm.tools["getMsgVpnQueues"]
+        self.assertIsNone(tool.input_schema)
+        self.assertIn("cursor", warm._input_schema(tool)["properties"])
+
+
+class TestStartup(BaseTestCase):
+    """Tests for lazy imports and background tool registration."""
+
+    INITIALIZE = json.dumps({"jsonrpc": "2.0", "id": 1, "method": "initialize", "params": {}})
+    LIST = json.dumps({"jsonrpc": "2.0", "id": 2, "method": "tools/list"})
+
+    def test_import_defers_heavy_modules(self):
+        """Test that importing the module does not load requests, asyncio or dotenv."""
+        import subprocess
+        import sys
+        server_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        output = subprocess.run(
+            [sys.executable, "-c", "import sys, solace_monitoring_mcp_server; "
+                                   "print([m for m in ('requests', 'asyncio', 'dotenv') if m in sys.modules])"],
+            cwd=server_dir, capture_output=True, text=True, check=True
+        ).stdout
+        self.assertEqual(output.strip(), "[]")
+
+    def test_deferred_module_imported_once(self):
+        """Test that the first use of a deferred module replaces it with the real module."""
+        import subprocess
+        import sys
+        server_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        output = subprocess.run(
+            [sys.executable, "-c", "import sys, solace_monitoring_mcp_server as m; deferred = m.requests; "
+                                   "deferred.Session; print(m.requests is sys.modules['requests'], "
+                                   "deferred._module is sys.modules['requests'])"],
+            cwd=server_dir, capture_output=True, text=True, check=True
+        ).stdout
+        self.assertEqual(output.strip(), "True True")
+
+    def test_initialize_answered_during_registration(self):
+        """Test that initialize is answered while tools are registered, and tools/list waits for them."""
+        gate = threading.Event()
+        load_spec = lambda path: gate.wait(5) and DUMMY_OAS_SPEC
+        with patch.object(SolaceSempv2McpServer, '_load_openapi_spec', side_effect=load_spec):
+            server = SolaceSempv2McpServer(ServerConfig(), background_registration=True)
+
+            self.assertIn("result", json.loads(server.handle_message(self.INITIALIZE)))
+            self.assertFalse(server.wait_for_tools(timeout=0.01))
+
+            listed = []
+            lister = threading.Thread(target=lambda: listed.append(server.handle_message(self.LIST)))
+            lister.start()
+            lister.join(0.05)
+            self.assertTrue(lister.is_alive())
+
+            gate.set()
+            lister.join(5)
+
+        self.assertEqual(len(json.loads(listed[0])["result"]["tools"]), 6)
+        self.assertTrue(server.wait_for_tools())
+
+    def test_background_registration_failure(self):
+        """Test that a failed background registration is reported to tools/list and tools/call."""
+        os.environ["OPENAPI_SPEC"] = "missing-spec.json"
+        server = SolaceSempv2McpServer(ServerConfig(), background_registration=True)
+        call = json.dumps({"jsonrpc": "2.0", "id": 3, "method": "tools/call",
+                           "params": {"name": "getBrokerConfig", "arguments": {}}})
+
+        for message in (self.LIST, call):
+            error = json.loads(server.handle_message(message))["error"]
+            self.assertIn("Tool registration failed", error["message"])
+        self.assertIn("result", json.loads(server.handle_message(self.INITIALIZE)))
+        self.assertIsNotNone(server.registration_error)
+
+
+class TestJsonCodec(BaseTestCase):
+    """Tests for the JSON codec and tool result encoding."""
+
+    RESULT = {"data": [{"queueName": "q/\u00e9", "bindCount": 1}], "meta": {"responseCode": 200}}
+
+    def test_stdlib_codec(self):
+        """Test compact and pretty encoding with the stdlib codec."""
+        codec = JsonCodec("json")
+        self.assertEqual(codec.name, "json")
+        self.assertEqual(codec.dumps({"a": [1, 2]}), '{"a":[1,2]}')
+        self.assertIn("\n", codec.dumps({"a": [1, 2]}, pretty=True))
+        self.assertEqual(codec.loads(b'{"a": 1}'), {"a": 1})
+
+    @unittest.skipUnless(orjson, "orjson is not installed")
+    def test_orjson_codec(self):
+        """Test that orjson is used when available and falls back for unsupported values."""
+        codec = JsonCodec("auto")
+        self.assertEqual(codec.name, "orjson")
+        self.assertEqual(json.loads(codec.dumps(self.RESULT)), self.RESULT)
+        self.assertEqual(json.loads(codec.dumps({1: "a"})), {"1": "a"})
+        self.assertEqual(codec.decode_response(MagicMock(content=b'{"data": []}')), {"data": []})
+        with self.assertRaises(json.JSONDecodeError):
+            codec.loads("{broken")
+
+    def test_tool_response_is_compact_by_default(self):
+        """Test that the text content is compact JSON unless pretty printing is enabled."""
+        server = self.mock_server_setup(mock_load_spec=True)
+        text = json.loads(server._create_tool_response(1, self.RESULT))["result"]["content"][0]["text"]
+        self.assertNotIn("\n", text)
+        self.assertEqual(json.loads(text), self.RESULT)
+
+        os.environ["MCP_JSON_PRETTY"] = "true"
+        server = self.mock_server_setup(mock_load_spec=True)
+        text = json.loads(server._create_tool_response(1, self.RESULT))["result"]["content"][0]["text"]
+        self.assertIn("\n", text)
+        self.assertEqual(json.loads(text), self.RESULT)
+
+    def test_structured_content(self):
+        """Test that results can be returned as structuredContent."""
+        os.environ["MCP_STRUCTURED_CONTENT"] = "true"
+        server = self.mock_server_setup(mock_load_spec=True)
+        result = json.loads(server._create_tool_response(1, self.RESULT))["result"]
+        self.assertEqual(result["structuredContent"], self.RESULT)
+        self.assertEqual(json.loads(result["content"][0]["text"]), self.RESULT)
+
+        os.environ["MCP_STRUCTURED_CONTENT"] = "only"
+        server = self.mock_server_setup(mock_load_spec=True)
+        result = json.loads(server._create_tool_response(1, self.RESULT))["result"]
+        self.assertEqual(result["structuredContent"], self.RESULT)
+        self.assertNotIn("queueName", result["content"][0]["text"])
+
+    def test_orjson_codec_requires_package(self):
+        """Test that forcing orjson without the package is a configuration error."""
+        os.environ["MCP_JSON_CODEC"] = "orjson"
+        with patch('solace_sempv2_mcp_server.orjson', None):
+            with self.assertRaises(ValueError):
+                ServerConfig()
+
+
+class TestResponseTrimming(BaseTestCase):
+    """Tests for default select projections and link stripping."""
+
+    def test_default_select_from_definitions(self):
+        """Test that the built-in profile projects to identifying and key fields."""
+        os.environ["MCP_AUTO_SELECT"] = "true"
+        server = self.mock_server_setup(mock_load_spec=True)
+        tool = server.tools["getMsgVpnQueues"]
+
+        self.assertEqual(tool.default_select, ["accessType", "bindCount", "msgSpoolUsage", "msgVpnName", "queueName"])
+        self.assertEqual(tool.object_field_count, 8)
+        self.assertIsNone(server.tools["getItems"].default_select)
+
+        request = server._prepare_request(tool, {"count": 10})
+        self.assertEqual(request.params["select"], "accessType,bindCount,msgSpoolUsage,msgVpnName,queueName")
+        self.assertTrue(request.projected)
+
+        # An explicit select from the caller wins
+        request = server._prepare_request(tool, {"select": ["*"]})
+        self.assertEqual(request.params["select"], "*")
+        self.assertFalse(request.projected)
+
+    def test_select_profile_file(self):
+        """Test that a profile file can override the projection for a tool."""
+        profile_path = os.path.join(tempfile.mkdtemp(), "profile.json")
+        with open(profile_path, 'w') as f:
+            json.dump({"default": ["*Name"], "tools": {"getMsgVpnQueues": ["deleted*"]}}, f)
+        os.environ["MCP_AUTO_SELECT"] = "true"
+        os.environ["MCP_SELECT_PROFILE"] = profile_path
+        try:
+            server = self.mock_server_setup(mock_load_spec=True)
+        finally:
+            shutil.rmtree(os.path.dirname(profile_path))
+
+        self.assertEqual(server.tools["getMsgVpnQueues"].default_select,
+                         ["deletedMsgCount", "msgVpnName", "queueName"])
+
+    def test_invalid_select_profile(self):
+        """Test that an unreadable profile is a configuration error."""
+        os.environ["MCP_AUTO_SELECT"] = "true"
+        os.environ["MCP_SELECT_PROFILE"] = "/nonexistent/profile.json"
+        with self.assertRaises(ValueError):
+            ServerConfig()
+
+    def test_strip_links_and_bytes_saved(self):
+        """Test that links are removed and the saved bytes are accounted for."""
+        os.environ["MCP_AUTO_SELECT"] = "true"
+        os.environ["MCP_STRIP_LINKS"] = "true"
+        os.environ["MCP_METRICS"] = "true"
+        server = self.mock_server_setup(mock_load_spec=True)
+        server._make_request = MagicMock(return_value={
+            "data": [{"queueName": "q1", "msgVpnName": "default"}],
+            "links": [{"uri": "http://broker/SEMP/v2/monitor/msgVpns/default/queues/q1"}],
+            "meta": {"responseCode": 200}
+        })
+
+        result = server._invoke_tool(server.tools["getMsgVpnQueues"], {})
+
+        self.assertNotIn("links", result)
+        self.assertEqual(result["data"], [{"queueName": "q1", "msgVpnName": "default"}])
+        stats = server.get_stats()["response_trimming"]
+        self.assertEqual(stats["responses"], 1)
+        self.assertEqual(stats["links_bytes_removed"], len(server.codec.dumps(
+            [{"uri": "http://broker/SEMP/v2/monitor/msgVpns/default/queues/q1"}])))
+        self.assertGreater(stats["select_bytes_saved_estimate"], 0)
+
+    def test_bytes_saved_not_measured_without_metrics(self):
+        """Test that trimmed parts are not encoded again when metrics are off."""
+        os.environ["MCP_AUTO_SELECT"] = "true"
+        os.environ["MCP_STRIP_LINKS"] = "true"
+        server = self.mock_server_setup(mock_load_spec=True)
+        server._make_request = MagicMock(return_value={
+            "data": [{"queueName": "q1", "msgVpnName": "default"}],
+            "links": [{"uri": "http://broker/SEMP/v2/monitor/msgVpns/default/queues/q1"}]
+        })
+
+        with patch.object(server.codec, "dumps", wraps=server.codec.dumps) as dumps:
+            result = server._invoke_tool(server.tools["getMsgVpnQueues"], {})
+
+        self.assertNotIn("links", result)
+        dumps.assert_not_called()
+        self.assertEqual(server.get_stats()["response_trimming"]["responses"], 1)
+
+
+class TestResponseBudget(BaseTestCase):
+    """Tests for cutting tool results to a response size budget."""
+
+    # Each row of TestPagination.make_page takes 38 bytes of the budget (data and link)
+
+    def test_budget_stops_fetching_pages(self):
+        """Test that no further pages are read once the budget is spent."""
+        os.environ["MCP_RESPONSE_BUDGET"] = "130"
+        server = self.mock_server_setup(mock_load_spec=True)
+        server._make_request = MagicMock(side_effect=[
+            TestPagination.make_page(0, 3, "c1"), TestPagination.make_page(3, 3, "c2"),
+            TestPagination.make_page(6, 3, "c3")])
+
+        result = server._invoke_tool(server.tools["getMsgVpnQueues"], {"count": 3, "max_pages": 10})
+
+        self.assertEqual(server._make_request.call_count, 2)
+        self.assertEqual(len(result["data"]), 3)
+        self.assertEqual(len(result["links"]), 3)
+        self.assertEqual(result["meta"]["pagination"]["stopReason"], "budget")
+        # The cut fell on a page boundary, so the cursor of the dropped page continues the listing
+        self.assertEqual(result["meta"]["truncation"], {
+            "reason": "budget", "budgetBytes": 130, "returnedItems": 3, "omittedItems": 3,
+            "totalItems": 10, "cursor": "c1"})
+        self.assertNotIn("paging", result["meta"])
+
+    def test_budget_truncates_single_response(self):
+        """Test that a single page is cut between rows and a hint is added."""
+        os.environ["MCP_RESPONSE_BUDGET"] = "100"
+        server = self.mock_server_setup(mock_load_spec=True)
+        server._make_request = MagicMock(return_value=TestPagination.make_page(0, 3, "c1"))
+
+        result = server._invoke_tool(server.tools["getMsgVpnQueues"], {})
+
+        self.assertEqual([q["queueName"] for q in result["data"]], ["q0", "q1"])
+        self.assertEqual(len(result["links"]), 2)
+        truncation = result["meta"]["truncation"]
+        self.assertEqual((truncation["returnedItems"], truncation["omittedItems"]), (2, 1))
+        self.assertIn("count=2", truncation["hint"])
+        self.assertNotIn("cursor", truncation)
+        self.assertNotIn("paging", result["meta"])
+        self.assertNotIn("pagination", result["meta"])
+
+    def test_result_within_budget_unchanged(self):
+        """Test that results that fit are returned as received."""
+        os.environ["MCP_RESPONSE_BUDGET"] = "1000"
+        server = self.mock_server_setup(mock_load_spec=True)
+        page = TestPagination.make_page(0, 3, "c1")
+        server._make_request = MagicMock(return_value=page)
+
+        self.assertIs(server._invoke_tool(server.tools["getMsgVpnQueues"], {}), page)
+
+    def test_budget_rules_and_token_units(self):
+        """Test per-tool budgets and token-denominated values."""
+        os.environ["MCP_RESPONSE_BUDGET"] = "50t"
+        os.environ["MCP_RESPONSE_BUDGET_RULES"] = "getItems=0,getMsgVpnQueues=2000"
+        server = self.mock_server_setup(mock_load_spec=True)
+
+        self.assertEqual(server.config.response_budget, 200)
+        self.assertIsNone(server._response_budget(server.tools["getItems"]))
+        self.assertEqual(server._response_budget(server.tools["getMsgVpnQueues"]).max_bytes, 2000)
+        self.assertEqual(server._response_budget(server.tools["getItemById"]).max_bytes, 200)
+
+        os.environ["MCP_RESPONSE_BUDGET_RULES"] = "getItems"
+        with self.assertRaises(ValueError):
+            ServerConfig()
+        os.environ["MCP_RESPONSE_BUDGET_RULES"] = ""
+        os.environ["MCP_RESPONSE_BUDGET"] = "10kb"
+        with self.assertRaises(ValueError):
+            ServerConfig()
+
+
+class TestStreamingParser(BaseTestCase):
+    """Tests for incremental parsing of large response bodies."""
+
+    BODY = {
+        "data": [{"queueName": f"q{i}", "msgVpnName": "default", "bindCount": i, "owner": None}
+                 for i in range(50)],
+        "links": [{"uri": f"http://broker/queues/q{i}"} for i in range(50)],
+        "meta": {"count": 50, "responseCode": 200}
+    }
+
+    @staticmethod
+    def feed(parser, body, chunk_size):
+        for start in range(0, len(body), chunk_size):
+            if not parser.feed(body[start:start + chunk_size]):
+                break
+        return parser.close()
+
+    def test_any_chunking_gives_same_result(self):
+        """Test that values split across chunk boundaries are decoded correctly."""
+        for indent in (None, 2):
+            body = json.dumps(self.BODY, indent=indent).encode("utf-8")
+            for chunk_size in (1, 7, 100, len(body)):
+                self.assertEqual(self.feed(StreamingJsonParser(), body, chunk_size), self.BODY)
+
+        # Multi-byte characters and numbers split between chunks
+        self.assertEqual(self.feed(StreamingJsonParser(), '{"data":[12345,"été"]}'.encode("utf-8"), 1),
+                         {"data": [12345, "été"]})
+
+    def test_keys_interned_and_links_skipped(self):
+        """Test that element keys are shared and skipped arrays are only counted."""
+        body = json.dumps(self.BODY).encode("utf-8")
+        parser = StreamingJsonParser(skip=("links",))
+        result = self.feed(parser, body, 64)
+
+        self.assertNotIn("links", result)
+        self.assertEqual(result["data"], self.BODY["data"])
+        first, last = result["data"][0], result["data"][-1]
+        self.assertTrue(all(a is b for a, b in zip(first, last)))
+        self.assertEqual(parser.skipped_bytes, sum(len(json.dumps(link)) for link in self.BODY["links"]))
+
+    def test_max_bytes_stops_reading(self):
+        """Test that the parser stops at the memory cap and keeps the complete elements."""
+        body = json.dumps(self.BODY).encode("utf-8")
+        parser = StreamingJsonParser(max_bytes=1000)
+        result = self.feed(parser, body, 100)
+
+        self.assertTrue(parser.truncated)
+        self.assertEqual(parser.bytes_read, 1000)
+        self.assertEqual(result["data"], self.BODY["data"][:len(result["data"])])
+        self.assertGreater(len(result["data"]), 0)
+
+    def test_invalid_body_rejected(self):
+        """Test that a malformed or incomplete body is an error."""
+        for body in (b'{"data":[1 2]}', b'{"data":[1,2'):
+            with self.assertRaises(ValueError):
+                self.feed(StreamingJsonParser(), body, 4)
+
+    @patch('requests.Session.request')
+    def test_large_response_streamed_and_capped(self, mock_request):
+        """Test that large bodies are read incrementally and cut at MCP_MAX_RESPONSE_BYTES."""
+        os.environ["MCP_STREAMING_THRESHOLD"] = "100"
+        os.environ["MCP_MAX_RESPONSE_BYTES"] = "1000"
+        body = json.dumps(self.BODY).encode("utf-8")
+        mock_response = MagicMock(ok=True, status_code=200, headers={"Content-Length": str(len(body))})
+        mock_response.iter_content.side_effect = lambda chunk_size: iter([body[:600], body[600:1200], body[1200:]])
+        mock_request.return_value = mock_response
+        server = self.mock_server_setup(mock_load_spec=True)
+
+        result = server._invoke_tool(server.tools["getMsgVpnQueues"], {"max_pages": 5})
+
+        self.assertTrue(mock_request.call_args.kwargs["stream"])
+        mock_response.json.assert_not_called()
+        mock_response.__exit__.assert_called_once()
+        self.assertEqual(result["data"], self.BODY["data"][:len(result["data"])])
+        self.assertEqual(result["meta"]["pagination"]["stopReason"], "max_response_bytes")
+        self.assertEqual(result["meta"]["truncation"]["returnedItems"], len(result["data"]))
+
+    @patch('requests.Session.request')
+    def test_budget_stops_reading_large_page(self, mock_request):
+        """Test that a streamed page is read only until its rows exceed the response budget."""
+        os.environ["MCP_STREAMING_THRESHOLD"] = "100"
+        os.environ["MCP_RESPONSE_BUDGET"] = "300"
+        body = json.dumps(self.BODY).encode("utf-8")
+        chunks = [body[start:start + 100] for start in range(0, len(body), 100)]
+        read = []
+
+        def iter_content(chunk_size):
+            for chunk in chunks:
+                read.append(chunk)
+                yield chunk
+
+        mock_response = MagicMock(ok=True, status_code=200, headers={"Content-Length": str(len(body))})
+        mock_response.iter_content.side_effect = iter_content
+        mock_request.return_value = mock_response
+        server = self.mock_server_setup(mock_load_spec=True)
+
+        result = server._invoke_tool(server.tools["getMsgVpnQueues"], {})
+
+        self.assertLess(len(read), len(chunks) // 2)
+        sizes = [len(server.codec.dumps(row)) + 1 for row in self.BODY["data"]]
+        kept = max(count for count in range(len(sizes) + 1) if sum(sizes[:count]) <= 300)
+        self.assertEqual(result["data"], self.BODY["data"][:kept])
+        truncation = result["meta"]["truncation"]
+        self.assertEqual((truncation["reason"], truncation["returnedItems"]), ("budget", kept))
+        # The rest of the page was never read, so its size is unknown
+        self.assertNotIn("omittedItems", truncation)
+        self.assertIn("hint", truncation)
+
+
+    class RawBody(io.BytesIO):
+        """A response stream that records whether its connection was handed back"""
+        released = False
+
+        def release_conn(self):
+            self.released = True
+
+    def http_response(self, status, body, headers=None):
+        """Build a real requests response that reads `body` from a stream"""
+        response = requests.Response()
+        response.status_code = status
+        response.headers.update(headers or {})
+        response.raw = self.RawBody(body)
+        return response
+
+    @patch('requests.Session.request')
+    def test_default_threshold_handles_empty_text_and_chunked_bodies(self, mock_request):
+        """Test bodies without a usable Content-Length at the default threshold, and that each response is closed."""
+        del os.environ["MCP_STREAMING_THRESHOLD"]
+        server = self.mock_server_setup(mock_load_spec=True)
+        broker = server.config.brokers["default"]
+        cases = [
+            (self.http_response(204, b""), {"text": ""}),
+            (self.http_response(200, b"Service Unavailable", {"Content-Type": "text/plain"}),
+             {"text": "Service Unavailable"}),
+            (self.http_response(200, json.dumps(self.BODY).encode("utf-8"), {"Transfer-Encoding": "chunked"}),
+             self.BODY),
+            (self.http_response(200, b'{"data": []}', {"Content-Length": "12"}), {"data": []}),
+        ]
+        for response, expected in cases:
+            mock_request.return_value = response
+            self.assertEqual(server._make_request(broker, "GET", "http://sample-solace:8080/msgVpns"), expected)
+            self.assertTrue(response.raw.released)
+
+        failed = self.http_response(503, b"busy", {"Content-Length": "4"})
+        mock_request.return_value = failed
+        with self.assertRaises(requests.exceptions.HTTPError):
+            server._make_request(broker, "GET", "http://sample-solace:8080/msgVpns")
+        self.assertTrue(failed.raw.released)
+
+    @patch('requests.Session.request')
+    def test_streamed_poll_keeps_links_for_object_names(self, mock_request):
+        """Test that a chunked polled collection is named from its links despite MCP_STRIP_LINKS."""
+        del os.environ["MCP_STREAMING_THRESHOLD"]
+        os.environ["MCP_STRIP_LINKS"] = "true"
+        os.environ["MCP_POLL_PATHS"] = "/msgVpns/default/queues"
+        body = {
+            "data": [{"queueName": name, "msgVpnName": "default", "bindCount": 1} for name in ("q1", "q2")],
+            "links": [{"uri": f"http://sample-solace:8080/msgVpns/default/queues/{name}"} for name in ("q1", "q2")]
+        }
+        mock_request.return_value = self.http_response(200, json.dumps(body).encode("utf-8"),
+                                                       {"Transfer-Encoding": "chunked"})
+        server = self.mock_server_setup(mock_load_spec=True)
+
+        server.poller.poll()
+
+        self.assertTrue(mock_request.call_args.kwargs["stream"])
+        self.assertEqual(sorted(key[2] for key in server.poller.series), ["default/q1", "default/q2"])
+
+
+class TestMcpHandlers(BaseTestCase):
+    """Tests for MCP message handlers."""
+    
+    def test_handle_initialize(self):
+        """Test handling an initialize request."""
+        server = self.mock_server_setup(mock_load_spec=True)
+        
+        msg_id = "test-id"
+        response_str = server._handle_initialize(msg_id, {})
+        response = json.loads(response_str)
+        
+        self.assertEqual(response["id"], msg_id)
+        self.assertEqual(response["jsonrpc"], "2.0")
+        self.assertTrue("result" in response)
+        self.assertEqual(response["result"]["protocolVersion"], "2024-11-05")
+    
+    def test_handle_list_tools(self):
+        """Test handling a list_tools request."""
+        server = self.mock_server_setup(mock_load_spec=True)
+        
+        msg_id = "test-id"
+        response_str = server._handle_list_tools(msg_id)
+        response = json.loads(response_str)
+        
+        self.assertEqual(response["id"], msg_id)
+        self.assertTrue("result" in response)
+        self.assertTrue("tools" in response["result"])
+        self.assertEqual(len(response["result"]["tools"]), 6)  # Should match number of tools registered
+    
+    def test_list_tools_serialized_once(self):
+        """Test that tools/list reuses the serialized registry and only swaps the id."""
+        server = self.mock_server_setup(mock_load_spec=True)
+        expected = {"tools": [{"name": t.name, "description": t.description,
+                               "inputSchema": t.input_schema, "tags": t.tags} for t in server.tools.values()]}
+
+        with patch.object(server, '_input_schema', wraps=server._input_schema) as mock_schema:
+            first = json.loads(server._handle_list_tools("a"))
+            second = json.loads(server._handle_list_tools(7))
+            self.assertEqual(mock_schema.call_count, len(server.tools))
+
+        self.assertEqual((first["id"], second["id"]), ("a", 7))
+        self.assertEqual(first["result"], expected)
+        self.assertEqual(second["result"], expected)
+
+    def test_list_tools_pagination(self):
+        """Test that tools/list pages follow nextCursor until every tool is returned."""
+        os.environ["MCP_TOOLS_LIST_PAGE_SIZE"] = "4"
+        try:
+            server = self.mock_server_setup(mock_load_spec=True)
+        finally:
+            os.environ.pop("MCP_TOOLS_LIST_PAGE_SIZE")
+
+        names, params, pages = [], {}, 0
+        while True:
+            message = {"jsonrpc": "2.0", "id": pages, "method": "tools/list", "params": params}
+            result = json.loads(server.handle_message(json.dumps(message)))["result"]
+            names.extend(tool["name"] for tool in result["tools"])
+            pages += 1
+            if "nextCursor" not in result:
+                break
+            params = {"cursor": result["nextCursor"]}
+
+        self.assertEqual(pages, 2)
+        self.assertEqual(names, list(server.tools))
+
+        response = json.loads(server._handle_list_tools(1, {"cursor": "bogus"}))
+        self.assertEqual(response["error"]["code"], -32602)
+
+    @patch('requests.Session.request')
     def test_handle_call_tool(self, mock_request):
         """Test handling a call_tool request."""
         # Setup mock